@@ -42,7 +42,7 @@ export async function POST(request: NextRequest) {
 
     // Check if media exists
     const media = await querySingle(
-      "SELECT id, type, minio_key, provider_id FROM media WHERE id = $1",
+      "SELECT id, type, minio_key, provider_id, file_size FROM media WHERE id = $1",
       [mediaId]
     );
 
@@ -76,7 +76,7 @@ export async function POST(request: NextRequest) {
     const fileUrl = await getPresignedUrl(bucket, media.minio_key, 3600);
 
     // Enqueue job to Redis/Celery (Bull fallback)
-    const job = await enqueueOCRJob(mediaId, ocrJobId, fileUrl, "pdf", providerId || undefined);
+    const job = await enqueueOCRJob(mediaId, ocrJobId, fileUrl, "pdf", providerId || undefined, media.file_size);
 
     return NextResponse.json(
       {
@@ -86,6 +86,7 @@ export async function POST(request: NextRequest) {
           status: "pending",
           mediaId,
           jobQueueId: job?.id,
+          sizeClass: job?.data?.sizeClass,
           createdAt: new Date(),
           providerId: providerId,
         },
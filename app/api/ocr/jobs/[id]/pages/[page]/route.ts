@@ -0,0 +1,79 @@
+import { gunzipSync } from "zlib"
+import { NextRequest, NextResponse } from "next/server"
+import { getAdminSessionFromRequest, getProviderSessionFromRequest, isProvidersFeatureEnabled } from "@/lib/auth"
+import { querySingle } from "@/lib/db"
+import { getObjectRange } from "@/lib/minio"
+
+type PageSummary = {
+  page: number
+  chars: number
+  source: string
+  candidates: number
+  // [part, offset, length] of the page's gzip member in the page text parts
+  text_range?: [number, number, number]
+}
+
+type PageTextRef = {
+  storage: "minio"
+  bucket: string
+  parts: string[]
+}
+
+export async function GET(request: NextRequest, { params }: { params: { id: string; page: string } }) {
+  if (!isProvidersFeatureEnabled()) {
+    return NextResponse.json({ error: "Providers feature disabled" }, { status: 503 })
+  }
+
+  const pageNumber = Number(params.page)
+  if (!Number.isInteger(pageNumber) || pageNumber < 1) {
+    return NextResponse.json({ error: "Página inválida" }, { status: 400 })
+  }
+
+  // Only the reference and the requested page summary are read from the result JSONB
+  const job = await querySingle<{
+    provider_id: string | null
+    page_text: PageTextRef | null
+    page: PageSummary | null
+  }>(
+    `SELECT provider_id::text,
+            result->'page_text' AS page_text,
+            result->'pages'->($2::int - 1) AS page
+     FROM ocr_jobs
+     WHERE id = $1`,
+    [params.id, pageNumber],
+  )
+
+  if (!job) {
+    return NextResponse.json({ error: "Job no encontrado" }, { status: 404 })
+  }
+
+  const admin = await getAdminSessionFromRequest(request)
+  const providerSession = await getProviderSessionFromRequest(request)
+  // Jobs without a provider are visible to admins only
+  if (!admin && (!job.provider_id || providerSession?.providerId !== job.provider_id)) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  if (!job.page || job.page.page !== pageNumber) {
+    return NextResponse.json({ error: "Página no encontrada" }, { status: 404 })
+  }
+
+  if (!job.page_text || !job.page.text_range) {
+    return NextResponse.json({ error: "Texto de la página no disponible" }, { status: 404 })
+  }
+
+  const [part, offset, length] = job.page.text_range
+  const key = job.page_text.parts[part]
+  if (!key) {
+    return NextResponse.json({ error: "Texto de la página no disponible" }, { status: 404 })
+  }
+
+  const compressed = await getObjectRange(job.page_text.bucket, key, offset, length)
+
+  return NextResponse.json({
+    page: pageNumber,
+    source: job.page.source,
+    chars: job.page.chars,
+    text: gunzipSync(compressed).toString("utf-8"),
+  })
+}
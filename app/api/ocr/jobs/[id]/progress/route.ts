@@ -0,0 +1,76 @@
+import { NextRequest, NextResponse } from "next/server"
+import { getAdminSessionFromRequest, getProviderSessionFromRequest, isProvidersFeatureEnabled } from "@/lib/auth"
+import { querySingle } from "@/lib/db"
+import { getOCRJobProgress, type OCRJobProgress } from "@/lib/jobs"
+
+/**
+ * Progress of an OCR job for polling. Running jobs are answered from the
+ * Redis hash the worker updates; Postgres is only read when there is none
+ * or Redis cannot be reached.
+ */
+export async function GET(request: NextRequest, { params }: { params: { id: string } }) {
+  if (!isProvidersFeatureEnabled()) {
+    return NextResponse.json({ error: "Providers feature disabled" }, { status: 503 })
+  }
+
+  const jobId = params.id
+  let progress: OCRJobProgress | null = null
+  try {
+    progress = await getOCRJobProgress(jobId)
+  } catch (err) {
+    console.error("OCR progress unavailable from Redis, reading the job from Postgres:", err)
+  }
+
+  let providerId = progress?.providerId ?? null
+  let fallback: { status: string; provider_id: string | null; candidates_found: number | null; total_pages: number | null } | null = null
+
+  if (!progress) {
+    fallback = await querySingle<{
+      status: string
+      provider_id: string | null
+      candidates_found: number | null
+      total_pages: number | null
+    }>(
+      `SELECT status, provider_id::text,
+              (result->>'candidates_found')::int AS candidates_found,
+              (result->>'total_pages')::int AS total_pages
+       FROM ocr_jobs
+       WHERE id = $1`,
+      [jobId],
+    )
+
+    if (!fallback) {
+      return NextResponse.json({ error: "Job no encontrado" }, { status: 404 })
+    }
+    providerId = fallback.provider_id
+  }
+
+  const admin = await getAdminSessionFromRequest(request)
+  const providerSession = await getProviderSessionFromRequest(request)
+  // Jobs without a provider are visible to admins only
+  if (!admin && (!providerId || providerSession?.providerId !== providerId)) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  if (progress) {
+    return NextResponse.json({
+      id: jobId,
+      status: progress.status,
+      pagesDone: progress.pagesDone,
+      totalPages: progress.totalPages,
+      candidates: progress.candidates,
+      etaSeconds: progress.etaSeconds,
+      updatedAt: progress.updatedAt,
+    })
+  }
+
+  return NextResponse.json({
+    id: jobId,
+    status: fallback!.status,
+    pagesDone: fallback!.status === "done" ? fallback!.total_pages : null,
+    totalPages: fallback!.total_pages,
+    candidates: fallback!.candidates_found,
+    etaSeconds: null,
+    updatedAt: null,
+  })
+}
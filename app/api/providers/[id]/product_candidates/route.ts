@@ -28,6 +28,8 @@ export async function GET(request: NextRequest, { params }: { params: { id: stri
     extracted_sku: string | null
     created_at: string
     resolved: boolean
+    resolved_product_id: string | null
+    match_score: number | null
   }>(
     `SELECT pc.id::text,
             pc.ocr_job_id::text,
@@ -37,7 +39,9 @@ export async function GET(request: NextRequest, { params }: { params: { id: stri
             pc.extracted_price::float8,
             pc.extracted_sku,
             pc.created_at,
-            pc.resolved
+            pc.resolved,
+            pc.resolved_product_id::text,
+            pc.match_score::float8
      FROM product_candidates pc
      LEFT JOIN ocr_jobs oj ON oj.id = pc.ocr_job_id
      WHERE COALESCE(pc.provider_id, oj.provider_id) = $1
@@ -0,0 +1,24 @@
+-- Content-addressed OCR result cache (idempotent)
+
+-- Whole documents: PDF content hash -> ordered page hashes
+CREATE TABLE IF NOT EXISTS ocr_document_cache (
+  content_hash TEXT NOT NULL,
+  extractor_version TEXT NOT NULL,
+  page_hashes TEXT[] NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  last_used_at TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (content_hash, extractor_version)
+);
+
+-- Single pages: page content hash -> extracted text and parsed candidates
+CREATE TABLE IF NOT EXISTS ocr_page_cache (
+  page_hash TEXT NOT NULL,
+  extractor_version TEXT NOT NULL,
+  text TEXT NOT NULL,
+  candidates JSONB NOT NULL DEFAULT '[]'::jsonb,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (page_hash, extractor_version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ocr_document_cache_last_used_at ON ocr_document_cache(last_used_at);
+CREATE INDEX IF NOT EXISTS idx_ocr_page_cache_created_at ON ocr_page_cache(created_at);
@@ -0,0 +1,11 @@
+-- Suggested catalog matches for OCR product candidates (idempotent)
+
+-- resolved_product_id is filled with a suggestion while resolved stays false
+ALTER TABLE product_candidates
+  ADD COLUMN IF NOT EXISTS match_score NUMERIC(5, 4);
+
+CREATE INDEX IF NOT EXISTS idx_product_candidates_resolved_product_id ON product_candidates(resolved_product_id);
+
+-- Incremental refresh of the worker's match index
+CREATE INDEX IF NOT EXISTS idx_products_provider_updated_at ON products(provider_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_product_variants_updated_at ON product_variants(updated_at);
@@ -0,0 +1,14 @@
+-- Resumable OCR jobs: per-job checkpoints and idempotent candidate writes (idempotent)
+
+-- Pages done, candidates flushed and page summaries as of the last commit
+ALTER TABLE ocr_jobs
+  ADD COLUMN IF NOT EXISTS checkpoint JSONB;
+
+-- Where in the document each candidate came from
+ALTER TABLE product_candidates
+  ADD COLUMN IF NOT EXISTS page_number INTEGER,
+  ADD COLUMN IF NOT EXISTS page_position INTEGER;
+
+-- A retried job can never write the same candidate twice
+CREATE UNIQUE INDEX IF NOT EXISTS idx_product_candidates_job_page_position
+  ON product_candidates(ocr_job_id, page_number, page_position);
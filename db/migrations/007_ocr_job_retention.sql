@@ -0,0 +1,5 @@
+-- Batched OCR job retention (idempotent)
+
+-- cleanup_old_jobs walks finished jobs per status in (created_at, id) order
+CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status_created_at
+  ON ocr_jobs(status, created_at, id);
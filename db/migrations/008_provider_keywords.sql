@@ -0,0 +1,14 @@
+-- Per-provider product keywords for OCR candidate filtering and categorization (idempotent)
+
+-- Extend the built-in keyword lists: 'indicator' keywords mark product text,
+-- 'category' keywords assign their category ('' for indicators)
+CREATE TABLE IF NOT EXISTS provider_keywords (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  provider_id UUID NOT NULL REFERENCES providers(id) ON DELETE CASCADE,
+  kind TEXT NOT NULL CHECK (kind IN ('indicator', 'category')),
+  category TEXT NOT NULL DEFAULT '',
+  keyword TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  updated_at TIMESTAMPTZ DEFAULT now(),
+  UNIQUE (provider_id, kind, category, keyword)
+);
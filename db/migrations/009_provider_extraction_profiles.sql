@@ -0,0 +1,15 @@
+-- Per-provider OCR extraction profiles (idempotent)
+
+-- heuristic overrides OCR_CANDIDATE_HEURISTIC when set. settings keys, all
+-- optional: line_price_pattern, sku_pattern, price_patterns, min_line_length,
+-- title_length, confidence_threshold, decimal_separator, price_tolerance,
+-- similarity_threshold, page_min_chars, page_min_price_density,
+-- page_low_confidence_factor, page_min_indicators (see workers/ocr/profiles.py)
+CREATE TABLE IF NOT EXISTS provider_extraction_profiles (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  provider_id UUID NOT NULL UNIQUE REFERENCES providers(id) ON DELETE CASCADE,
+  heuristic TEXT CHECK (heuristic IN ('line', 'section', 'layout')),
+  settings JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
@@ -0,0 +1,7 @@
+-- OCR result cache eviction (idempotent)
+
+-- Page cache hits refresh last_used_at like document hits do; cleanup_old_jobs
+-- removes entries of both tables that have not been used for a while
+ALTER TABLE ocr_page_cache ADD COLUMN IF NOT EXISTS last_used_at TIMESTAMPTZ DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_ocr_page_cache_last_used_at ON ocr_page_cache(last_used_at);
@@ -7,6 +7,7 @@ import Queue from 'bull';
 import redis from 'redis';
 
 let ocrQueue: Queue.Queue | null = null;
+let redisClientPromise: Promise<ReturnType<typeof redis.createClient>> | null = null;
 
 /**
  * Initialize OCR job queue
@@ -42,17 +43,35 @@ export function getOCRQueue(): Queue.Queue {
   return ocrQueue;
 }
 
+export type OCRJobSizeClass = 'small' | 'large';
+
+/**
+ * Classify an OCR job by file size (and page count when known).
+ * Thresholds match the worker's OCR_SMALL_JOB_MAX_BYTES / OCR_SMALL_JOB_MAX_PAGES.
+ */
+export function classifyOCRJob(fileSize?: number | null, pageCount?: number | null): OCRJobSizeClass {
+  const maxBytes = Number(process.env.OCR_SMALL_JOB_MAX_BYTES || 5 * 1024 * 1024);
+  const maxPages = Number(process.env.OCR_SMALL_JOB_MAX_PAGES || 40);
+
+  if (fileSize != null && fileSize > maxBytes) return 'large';
+  if (pageCount != null && pageCount > maxPages) return 'large';
+  return 'small';
+}
+
 /**
  * Add OCR job to queue
+ * Small jobs get a higher priority so they are not stuck behind large catalogs
  */
 export async function enqueueOCRJob(
   mediaid: string,
   ocrJobId: string,
   fileUrl: string,
   fileType: string = 'pdf',
-  providerId?: string
+  providerId?: string,
+  fileSize?: number | null
 ): Promise<Queue.Job> {
   const queue = getOCRQueue();
+  const sizeClass = classifyOCRJob(fileSize);
 
   const job = await queue.add(
     {
@@ -61,8 +80,12 @@ export async function enqueueOCRJob(
       fileUrl,
       fileType,
       providerId,
+      fileSize: fileSize ?? undefined,
+      sizeClass,
     },
     {
+      // Bull priorities: 1 is the highest
+      priority: sizeClass === 'small' ? 1 : 10,
       attempts: 3,
       backoff: {
         type: 'exponential',
@@ -163,6 +186,76 @@ export async function getQueueCounts(): Promise<{
   };
 }
 
+/**
+ * Shared Redis client for reads outside the Bull queue
+ *
+ * Concurrent first calls share one connection attempt. Callers fall back
+ * to Postgres, so an unreachable Redis fails fast: the first connection
+ * is not retried (the next call tries again) and commands are not queued
+ * while a dropped connection is being re-established.
+ */
+function getRedisClient(): Promise<ReturnType<typeof redis.createClient>> {
+  if (!redisClientPromise) {
+    const redisUrl = process.env.REDIS_URL || 'redis://localhost:6379';
+    let connected = false;
+    const client = redis.createClient({
+      url: redisUrl,
+      disableOfflineQueue: true,
+      socket: {
+        connectTimeout: 2000,
+        reconnectStrategy: (retries: number) =>
+          connected ? Math.min(retries * 50, 500) : new Error('Redis is unreachable'),
+      },
+    });
+    client.on('error', (err) => console.error('Redis client error:', err));
+
+    redisClientPromise = client.connect().then(
+      () => {
+        connected = true;
+        return client;
+      },
+      (err) => {
+        redisClientPromise = null;
+        throw err;
+      },
+    );
+  }
+
+  return redisClientPromise;
+}
+
+export type OCRJobProgress = {
+  status: string;
+  pagesDone: number;
+  totalPages: number | null;
+  candidates: number;
+  etaSeconds: number | null;
+  providerId: string | null;
+  updatedAt: number;
+};
+
+/**
+ * Get the progress the OCR worker publishes for a running job (null if none)
+ */
+export async function getOCRJobProgress(ocrJobId: string): Promise<OCRJobProgress | null> {
+  const client = await getRedisClient();
+  const hash = await client.hGetAll(`ocr:progress:${ocrJobId}`);
+
+  if (!hash || Object.keys(hash).length === 0) return null;
+
+  const optionalNumber = (value?: string) => (value ? Number(value) : null);
+
+  return {
+    status: hash.status,
+    pagesDone: Number(hash.pages_done || 0),
+    totalPages: optionalNumber(hash.total_pages),
+    candidates: Number(hash.candidates || 0),
+    etaSeconds: optionalNumber(hash.eta_seconds),
+    providerId: hash.provider_id || null,
+    updatedAt: Number(hash.updated_at || 0),
+  };
+}
+
 /**
  * Health check: verify Redis connection
  */
@@ -190,4 +283,12 @@ export async function closeQueue(): Promise<void> {
     await ocrQueue.close();
     ocrQueue = null;
   }
+
+  if (redisClientPromise) {
+    const client = await redisClientPromise.catch(() => null);
+    redisClientPromise = null;
+    if (client) {
+      await client.quit();
+    }
+  }
 }
@@ -91,6 +91,26 @@ export async function getPresignedUploadUrl(
   return client.presignedPutObject(bucketName, objectName, expirySeconds);
 }
 
+/**
+ * Download a byte range of an object
+ */
+export async function getObjectRange(
+  bucketName: string,
+  objectName: string,
+  offset: number,
+  length: number
+): Promise<Buffer> {
+  const client = getMinIOClient();
+  const stream = await client.getPartialObject(bucketName, objectName, offset, length);
+  const chunks: Buffer[] = [];
+
+  return new Promise((resolve, reject) => {
+    stream.on('data', (chunk: Buffer) => chunks.push(chunk));
+    stream.on('error', reject);
+    stream.on('end', () => resolve(Buffer.concat(chunks)));
+  });
+}
+
 /**
  * Delete file from MinIO
  */
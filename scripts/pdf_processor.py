@@ -1,83 +1,81 @@
-import PyPDF2
+import os
 import re
 import json
 import sys
-from typing import List, Dict, Any
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import logging
 from difflib import SequenceMatcher
 
+# Motor de extracción compartido con el worker de OCR (workers/ocr)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'workers', 'ocr'))
+import extraction
+from dedupe import DuplicateIndex
+from keywords import compile_keywords, fetch_provider_keywords, merge_keywords
+from heuristics import HEURISTICS, clean_text, page_text
+from page_classifier import PAGE_CLASSIFIER_ENABLED, PAGE_LOW, PAGE_SKIP
+from profiles import compile_profile, fetch_profile
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Backends de extracción de texto; PyMuPDF es el del worker y el más rápido
+BACKENDS = ('pymupdf', 'pypdf2')
+
 class PDFProductExtractor:
-    def __init__(self):
-        # Patrones regex para extraer información de productos
-        self.price_patterns = [
-            r'\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',  # $1.500,00 o $1500
-            r'(\d{1,3}(?:\.\d{3})*)\s*pesos',          # 1500 pesos
-            r'precio[:\s]*\$?(\d{1,3}(?:\.\d{3})*)',   # precio: $1500
-        ]
-        
-        self.product_indicators = [
-            'serum', 'crema', 'limpiador', 'mascarilla', 'tónico', 'protector',
-            'hidratante', 'antioxidante', 'vitamina', 'ácido', 'facial'
-        ]
-        
-        self.category_keywords = {
-            'serums': ['serum', 'sérum', 'suero'],
-            'cremas': ['crema', 'hidratante', 'nutritiva'],
-            'limpiadores': ['limpiador', 'gel', 'espuma', 'jabón'],
-            'mascarillas': ['mascarilla', 'máscara', 'tratamiento'],
-            'proteccion': ['protector', 'fps', 'solar', 'bloqueador'],
-            'tonicos': ['tónico', 'astringente', 'equilibrante']
-        }
+    def __init__(self, heuristic: str = 'section', backend: str = 'pymupdf',
+                 provider_keywords: List[Tuple[str, str, str]] = None, profile_settings: Dict[str, Any] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido '{backend}' (opciones: {', '.join(BACKENDS)})")
+        self.backend = backend
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extrae texto de un archivo PDF"""
+        # Perfil de extracción (patrones, umbrales y formato de precios) compilado
+        # una sola vez; la heurística de candidatos es la misma del worker
+        self.profile = compile_profile(heuristic, profile_settings)
+        self.price_patterns = self.profile.price_patterns
+        self.scanner = self.profile.section_scanner
+        self.heuristic = self.profile.heuristic
+
+        # Palabras clave por defecto más las del proveedor (filas de provider_keywords),
+        # compiladas en un solo autómata que filtra y categoriza en una pasada
+        self.product_indicators, self.category_keywords = merge_keywords(provider_keywords or [])
+        self.keywords = compile_keywords(self.product_indicators, self.category_keywords)
+
+    def extract_pages(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """Extrae el texto de cada página de un archivo PDF"""
         try:
+            if self.backend == 'pymupdf':
+                # Mismo motor que el worker: páginas en paralelo y OCR de páginas escaneadas
+                return extraction.extract_pages(pdf_path, layout=self.heuristic.needs_layout)
+
+            import PyPDF2
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-                
-                return text
+                return [
+                    {'page': page_num + 1, 'text': page.extract_text() or ''}
+                    for page_num, page in enumerate(pdf_reader.pages)
+                ]
         except Exception as e:
             logger.error(f"Error extrayendo texto del PDF: {e}")
-            return ""
+            return []
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """Extrae texto de un archivo PDF"""
+        return "\n".join(page['text'] for page in self.extract_pages(pdf_path))
 
     def clean_text(self, text: str) -> str:
         """Limpia y normaliza el texto extraído"""
-        # Remover caracteres especiales y normalizar espacios
-        text = re.sub(r'\s+', ' ', text)
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        return text.strip()
+        return clean_text(text)
 
     def extract_price(self, text: str) -> float:
         """Extrae el precio de un texto"""
-        for pattern in self.price_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                price_str = match.group(1).replace('.', '').replace(',', '.')
-                try:
-                    return float(price_str)
-                except ValueError:
-                    continue
-        return 0.0
+        return self.scanner.extract_price(text)
 
     def determine_category(self, product_name: str, description: str) -> str:
-        """Determina la categoría del producto basado en palabras clave"""
-        text = (product_name + " " + description).lower()
-        
-        for category, keywords in self.category_keywords.items():
-            for keyword in keywords:
-                if keyword in text:
-                    return category
-        
-        return 'otros'
+        """Determina la categoría del producto basado en palabras clave (sin distinguir tildes)"""
+        return self.keywords.category(product_name + " " + description)
 
     def similarity(self, a: str, b: str) -> float:
         """Calcula la similitud entre dos strings usando SequenceMatcher"""
@@ -93,102 +91,109 @@ class PDFProductExtractor:
         filtered_words = [word for word in words if word not in stop_words]
         return ' '.join(filtered_words)
 
-    def detect_duplicates_in_batch(self, products: List[Dict[str, Any]], similarity_threshold: float = 0.8) -> List[Dict[str, Any]]:
-        """Detecta duplicados dentro del mismo lote de productos extraídos"""
-        processed_products = []
+    def detect_duplicates_in_batch(self, products: List[Dict[str, Any]], similarity_threshold: float = None, mode: str = 'exact') -> List[Dict[str, Any]]:
+        """
+        Detecta duplicados dentro del mismo lote de productos extraídos
+
+        Los productos ya procesados se indexan por banda de precio (y por
+        n-gramas en modo 'ngram'), de modo que solo se comparan los pares
+        plausibles. El modo 'exact' devuelve los mismos duplicados que
+        comparar todos los pares. Umbral y tolerancia de precio vienen del perfil.
+        """
+        if similarity_threshold is None:
+            similarity_threshold = self.profile.similarity_threshold
+        index = DuplicateIndex(similarity_threshold, price_tolerance=self.profile.price_tolerance, mode=mode)
         
-        for i, product in enumerate(products):
-            is_duplicate = False
+        for product in products:
             normalized_name = self.normalize_product_name(product['name'])
             
-            # Comparar con productos ya procesados
-            for processed_product in processed_products:
-                processed_normalized = self.normalize_product_name(processed_product['name'])
-                
-                # Calcular similitud
-                name_similarity = self.similarity(normalized_name, processed_normalized)
-                
-                # Considerar duplicado si:
-                # 1. Los nombres son muy similares (>= threshold)
-                # 2. Los precios son exactamente iguales o muy similares
-                price_diff = abs(product['price'] - processed_product['price'])
-                price_similarity = price_diff <= (product['price'] * 0.05)  # 5% de diferencia
-                
-                if name_similarity >= similarity_threshold and price_similarity:
-                    is_duplicate = True
-                    logger.info(f"Duplicado detectado: '{product['name']}' similar a '{processed_product['name']}' (similitud: {name_similarity:.2f})")
-                    break
+            # Considerar duplicado si:
+            # 1. Los nombres son muy similares (>= threshold)
+            # 2. Los precios son exactamente iguales o muy similares (5% de diferencia por defecto)
+            match = index.find(normalized_name, product['price'])
+            is_duplicate = match is not None
+            if is_duplicate:
+                processed_product, name_similarity = match
+                logger.info(f"Duplicado detectado: '{product['name']}' similar a '{processed_product['name']}' (similitud: {name_similarity:.2f})")
             
             # Agregar información de duplicado
             product['duplicate'] = is_duplicate
             product['confidence'] = 1.0 - (0.3 if is_duplicate else 0.0)  # Reducir confianza si es duplicado
             
             if not is_duplicate:
-                processed_products.append(product)
+                index.add(normalized_name, product['price'], product)
         
         return products
 
+    def candidate_to_product(self, candidate: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte un candidato de la heurística en un producto"""
+        product_name = candidate['title']
+        description = candidate.get('description', '')
+
+        product = {
+            'name': product_name,
+            'description': description,
+            'price': candidate['price'],
+            # Las heurísticas ya la asignan al parsear con self.keywords
+            'category': candidate.get('category') or self.determine_category(product_name, description),
+            'sku': candidate.get('sku'),
+            'stock': 10,  # Stock por defecto
+            'is_active': True,
+            'is_flash_sale': False,
+            'is_best_seller': False,
+            'confidence': 0.9,  # Confianza inicial alta
+            'duplicate': False  # Se determinará después
+        }
+        if 'page' in candidate:
+            product['page'] = candidate['page']
+        return product
+
+    def candidates_to_products(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Productos de los candidatos con precio, sin deduplicar"""
+        return [
+            self.candidate_to_product(candidate)
+            for candidate in candidates
+            # Si no hay precio, saltar este producto
+            if candidate.get('price')
+        ]
+
+    def parse_products(self, text: str) -> List[Dict[str, Any]]:
+        """Productos con precio encontrados por la heurística en un texto, sin deduplicar"""
+        return self.candidates_to_products(self.heuristic.parse(text, self.keywords))
+
     def extract_products_from_text(self, text: str) -> List[Dict[str, Any]]:
         """Extrae productos del texto del PDF"""
-        products = []
-        
-        # Dividir el texto en secciones que podrían ser productos
-        sections = re.split(r'\n\s*\n|\.\s*(?=[A-Z])', text)
-        
-        for section in sections:
-            section = self.clean_text(section)
-            
-            # Verificar si la sección contiene indicadores de producto
-            if not any(indicator in section.lower() for indicator in self.product_indicators):
-                continue
-            
-            # Extraer nombre del producto (primera línea o frase principal)
-            lines = section.split('.')
-            product_name = lines[0].strip()
-            
-            # Si el nombre es muy corto o muy largo, intentar con la siguiente línea
-            if len(product_name) < 10 or len(product_name) > 100:
-                if len(lines) > 1:
-                    product_name = lines[1].strip()
-            
-            # Extraer precio
-            price = self.extract_price(section)
-            
-            # Si no hay precio, saltar este producto
-            if price == 0.0:
-                continue
-            
-            # Extraer descripción (resto del texto)
-            description = section.replace(product_name, '').strip()
-            if description.startswith('.'):
-                description = description[1:].strip()
-            
-            # Limitar la descripción a una longitud razonable
-            if len(description) > 300:
-                description = description[:300] + "..."
-            
-            # Determinar categoría
-            category = self.determine_category(product_name, description)
-            
-            # Crear el producto con confianza inicial
-            product = {
-                'name': product_name,
-                'description': description,
-                'price': price,
-                'category': category,
-                'stock': 10,  # Stock por defecto
-                'is_active': True,
-                'is_flash_sale': False,
-                'is_best_seller': False,
-                'confidence': 0.9,  # Confianza inicial alta
-                'duplicate': False  # Se determinará después
-            }
-            
-            products.append(product)
+        products = self.parse_products(text)
         
         # Detectar duplicados dentro del lote
-        products = self.detect_duplicates_in_batch(products)
+        return self.detect_duplicates_in_batch(products)
+
+    def extract_products_from_pages(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extrae productos página por página y detecta duplicados en todo el documento
+
+        Con el clasificador de páginas activo, cada página guarda su decisión
+        en 'classification': las portadas, condiciones y listas de ingredientes
+        ('skip') no se procesan y los productos de páginas dudosas ('low')
+        quedan con menor confianza.
+        """
+        classifier = self.profile.page_classifier if PAGE_CLASSIFIER_ENABLED else None
+        products = []
+        low_confidence = []
+        for page in pages:
+            if classifier:
+                page['classification'] = classifier.classify(page_text(page), self.keywords)
+                if page['classification']['class'] == PAGE_SKIP:
+                    continue
+            for product in self.candidates_to_products(self.heuristic.parse_page(page, self.keywords)):
+                product.setdefault('page', page['page'])
+                products.append(product)
+                if classifier and page['classification']['class'] == PAGE_LOW:
+                    low_confidence.append(product)
         
+        products = self.detect_duplicates_in_batch(products)
+        for product in low_confidence:
+            product['confidence'] = round(product['confidence'] * classifier.low_confidence_factor, 4)
         return products
 
     def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
@@ -196,8 +201,8 @@ class PDFProductExtractor:
         logger.info(f"Procesando PDF: {pdf_path}")
         
         # Extraer texto
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        pages = self.extract_pages(pdf_path)
+        if not any(page['text'].strip() for page in pages):
             return {
                 'success': False,
                 'error': 'No se pudo extraer texto del PDF',
@@ -205,7 +210,7 @@ class PDFProductExtractor:
             }
         
         # Extraer productos
-        products = self.extract_products_from_text(text)
+        products = self.extract_products_from_pages(pages)
         
         # Estadísticas
         total_products = len(products)
@@ -216,9 +221,10 @@ class PDFProductExtractor:
         logger.info(f"Productos únicos: {unique_products}")
         logger.info(f"Duplicados detectados: {duplicate_products}")
         
-        return {
+        result = {
             'success': True,
             'products': products,
+            'total_pages': len(pages),
             'total_products': total_products,
             'unique_products': unique_products,
             'duplicate_products': duplicate_products,
@@ -229,19 +235,89 @@ class PDFProductExtractor:
                 'duplicate_rate': (duplicate_products / total_products * 100) if total_products > 0 else 0
             }
         }
+        classified = [page for page in pages if 'classification' in page]
+        if classified:
+            result['skipped_pages'] = sum(1 for page in classified if page['classification']['class'] == PAGE_SKIP)
+            result['pages'] = [{'page': page['page'], **page['classification']} for page in classified]
+        return result
+
+# Extractor de cada proceso del modo por lotes
+_batch_extractor = None
+
+def _init_batch_worker(heuristic: str, backend: str, provider_keywords: List[Tuple[str, str, str]],
+                       profile_settings: Dict[str, Any]):
+    global _batch_extractor
+    # Los archivos ya se procesan en paralelo; cada proceso extrae sus páginas en serie
+    extraction.EXTRACTION_POOL_SIZE = 1
+    _batch_extractor = PDFProductExtractor(heuristic, backend, provider_keywords, profile_settings)
+
+def _process_batch_file(pdf_path: str) -> Dict[str, Any]:
+    try:
+        result = _batch_extractor.process_pdf(pdf_path)
+    except Exception as e:
+        logger.error(f"Error procesando {pdf_path}: {e}")
+        result = {'success': False, 'error': str(e), 'products': []}
+    return {'file': pdf_path, **result}
+
+def process_batch(directory: str, workers: int, heuristic: str = 'section', backend: str = 'pymupdf',
+                  provider_keywords: List[Tuple[str, str, str]] = None,
+                  profile_settings: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+    """Procesa en paralelo todos los PDF de un directorio, en orden de nombre"""
+    pdf_paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith('.pdf')
+    )
+    with ProcessPoolExecutor(max_workers=max(workers, 1), initializer=_init_batch_worker,
+                             initargs=(heuristic, backend, provider_keywords, profile_settings)) as executor:
+        yield from executor.map(_process_batch_file, pdf_paths)
+
+def load_provider_config(provider_id: str) -> Tuple[List[Tuple[str, str, str]], Optional[Tuple[Optional[str], Dict[str, Any]]]]:
+    """Lee de la base de datos las palabras clave y el perfil de extracción de un proveedor"""
+    import psycopg2
+    conn = psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
+    try:
+        return fetch_provider_keywords(conn, provider_id), fetch_profile(conn, provider_id)
+    finally:
+        conn.close()
 
 def main():
     """Función principal para usar desde línea de comandos"""
-    if len(sys.argv) != 2:
-        print("Uso: python pdf_processor.py <ruta_del_pdf>")
-        sys.exit(1)
-    
-    pdf_path = sys.argv[1]
-    extractor = PDFProductExtractor()
-    result = extractor.process_pdf(pdf_path)
-    
-    # Imprimir resultado como JSON
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    parser = argparse.ArgumentParser(description='Extrae productos de catálogos PDF')
+    parser.add_argument('pdf_path', nargs='?', help='ruta del PDF a procesar')
+    parser.add_argument('--batch', metavar='DIR', help='procesa todos los PDF del directorio y emite JSON Lines')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='procesos del modo por lotes')
+    parser.add_argument('--heuristic', choices=list(HEURISTICS),
+                        help="heurística de candidatos (por defecto la del perfil del proveedor o 'section')")
+    parser.add_argument('--backend', choices=BACKENDS, default='pymupdf')
+    parser.add_argument('--provider', metavar='PROVIDER_ID',
+                        help='usa las palabras clave y el perfil de extracción del proveedor (requiere DATABASE_URL)')
+    args = parser.parse_args()
+
+    if bool(args.pdf_path) == bool(args.batch):
+        parser.error('indique un PDF o --batch <directorio>')
+
+    provider_keywords, profile = None, None
+    if args.provider:
+        if not os.getenv('DATABASE_URL'):
+            parser.error('--provider requiere DATABASE_URL')
+        provider_keywords, profile = load_provider_config(args.provider)
+    profile_heuristic, profile_settings = profile or (None, None)
+    heuristic = args.heuristic or profile_heuristic or 'section'
+
+    try:
+        if args.batch:
+            # Una línea JSON por archivo, a medida que terminan en orden
+            for result in process_batch(args.batch, args.workers, heuristic, args.backend,
+                                        provider_keywords, profile_settings):
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+        else:
+            extractor = PDFProductExtractor(heuristic, args.backend, provider_keywords, profile_settings)
+            result = extractor.process_pdf(args.pdf_path)
+
+            # Imprimir resultado como JSON
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+    finally:
+        extraction.shutdown_executor()
 
 if __name__ == "__main__":
     main()
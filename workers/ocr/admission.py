@@ -0,0 +1,184 @@
+"""
+Admission Control
+Per-worker memory budget shared by the Celery prefork processes; jobs whose
+estimated memory would exceed it are deferred back to their queue
+"""
+
+import os
+import fcntl
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Optional
+
+from metrics import ADMISSION_BUDGET_BYTES, ADMISSION_RESERVED_BYTES
+from spool import should_spool
+
+logger = logging.getLogger(__name__)
+
+# Estimate jobs' memory and defer those that do not fit in the worker's budget
+ADMISSION_ENABLED = os.getenv('OCR_ADMISSION_ENABLED', 'true').lower() == 'true'
+
+# Memory the worker's jobs may reserve together; 0 means OCR_MEMORY_BUDGET_FRACTION
+# of the container's memory limit (or of physical memory without one)
+MEMORY_BUDGET_BYTES = int(os.getenv('OCR_MEMORY_BUDGET_BYTES', '0'))
+MEMORY_BUDGET_FRACTION = float(os.getenv('OCR_MEMORY_BUDGET_FRACTION', '0.6'))
+
+# Reservations of the worker's processes; processes share a budget when they share this directory
+ADMISSION_DIR = os.getenv('OCR_ADMISSION_DIR') or os.path.join(tempfile.gettempdir(), 'ocr-admission')
+
+# Delay before a deferred job is tried again
+ADMISSION_RETRY_SECONDS = int(os.getenv('OCR_ADMISSION_RETRY_SECONDS', '30'))
+
+# Memory estimate of a job: a fixed overhead, plus the document held in
+# memory JOB_SIZE_FACTOR times (download, PyMuPDF's copy, the extraction
+# pool's spool file) or once when it is spooled to disk, plus a per-page working set
+# (page summaries, text and candidates waiting for a flush)
+JOB_BASE_BYTES = int(os.getenv('OCR_ADMISSION_JOB_BASE_BYTES', str(64 * 1024 * 1024)))
+JOB_SIZE_FACTOR = float(os.getenv('OCR_ADMISSION_JOB_SIZE_FACTOR', '3.0'))
+JOB_PAGE_BYTES = int(os.getenv('OCR_ADMISSION_JOB_PAGE_BYTES', str(256 * 1024)))
+
+# Document bytes per page assumed when the page count is not known yet
+ESTIMATED_BYTES_PER_PAGE = int(os.getenv('OCR_ADMISSION_BYTES_PER_PAGE', str(100 * 1024)))
+
+CGROUP_MEMORY_LIMITS = (
+    '/sys/fs/cgroup/memory.max',                     # cgroup v2
+    '/sys/fs/cgroup/memory/memory.limit_in_bytes',   # cgroup v1
+)
+
+
+def memory_limit() -> int:
+    """The container's memory limit, or physical memory when there is none"""
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    for path in CGROUP_MEMORY_LIMITS:
+        try:
+            with open(path) as limit_file:
+                value = limit_file.read().strip()
+        except OSError:
+            continue
+        # 'max' or a huge v1 value mean unlimited
+        if value.isdigit() and int(value) < physical:
+            return int(value)
+    return physical
+
+
+def estimate_job_memory(file_size: Optional[int], page_count: Optional[int] = None) -> int:
+    """Bytes a job is expected to need at its peak, from its document size and page count"""
+    size = file_size or 0
+    if page_count is None:
+        page_count = size // ESTIMATED_BYTES_PER_PAGE
+    document = size if should_spool(size) else size * JOB_SIZE_FACTOR
+    return int(JOB_BASE_BYTES + document + page_count * JOB_PAGE_BYTES)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MemoryBudget:
+    """
+    Memory reservations of one worker's processes, kept as one file per pid
+
+    Reserving happens under an exclusive lock on the directory, so prefork
+    processes admitting jobs at the same time see each other's reservations.
+    Files of processes that are gone (an OOM-killed child, say) are removed
+    when reservations are read, so their bytes return to the budget. A job
+    is always admitted when nothing else is reserved, so a job bigger than
+    the whole budget still runs, alone.
+    """
+
+    def __init__(self, budget_bytes: int, directory: str = ADMISSION_DIR):
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        ADMISSION_BUDGET_BYTES.set(budget_bytes)
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, str(pid))
+
+    def _reservations(self) -> Dict[int, int]:
+        """Bytes reserved per live pid, removing the files of dead ones"""
+        reservations = {}
+        for name in os.listdir(self.directory):
+            if not name.isdigit():
+                continue
+            pid = int(name)
+            if not _alive(pid):
+                try:
+                    os.unlink(self._path(pid))
+                except FileNotFoundError:
+                    pass
+                continue
+            try:
+                with open(self._path(pid)) as reservation_file:
+                    reservations[pid] = int(reservation_file.read() or 0)
+            except (OSError, ValueError):
+                continue
+        return reservations
+
+    def try_reserve(self, cost: int) -> bool:
+        """Reserve cost bytes for this process's job if they fit; False if the job should wait"""
+        pid = os.getpid()
+        with self._locked():
+            reservations = self._reservations()
+            reservations.pop(pid, None)
+            reserved = sum(reservations.values())
+            if reserved and reserved + cost > self.budget_bytes:
+                return False
+            with open(self._path(pid), 'w') as reservation_file:
+                reservation_file.write(str(cost))
+        ADMISSION_RESERVED_BYTES.set(cost)
+        return True
+
+    def release(self):
+        """Return this process's reservation to the budget"""
+        with self._locked():
+            try:
+                os.unlink(self._path(os.getpid()))
+            except FileNotFoundError:
+                pass
+        ADMISSION_RESERVED_BYTES.set(0)
+
+    def usage(self) -> Dict[str, Any]:
+        """Current reservations, for logs and monitoring"""
+        with self._locked():
+            reservations = self._reservations()
+        return {
+            'budget_bytes': self.budget_bytes,
+            'reserved_bytes': sum(reservations.values()),
+            'jobs': len(reservations),
+        }
+
+
+_budget: Optional[MemoryBudget] = None
+
+
+def get_memory_budget() -> MemoryBudget:
+    """This worker's memory budget, created on first use"""
+    global _budget
+    if _budget is None:
+        _budget = MemoryBudget(MEMORY_BUDGET_BYTES or int(memory_limit() * MEMORY_BUDGET_FRACTION))
+    return _budget
+
+
+def estimate_batch_memory(file_sizes: Iterable[Optional[int]], prefetch_budget_bytes: int) -> int:
+    """Peak estimate of a batch: its largest job plus the documents prefetched behind it"""
+    sizes = [int(size or 0) for size in file_sizes]
+    if not sizes:
+        return 0
+    return estimate_job_memory(max(sizes)) + min(prefetch_budget_bytes, sum(sizes) - max(sizes))
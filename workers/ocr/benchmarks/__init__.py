@@ -0,0 +1 @@
+# OCR Worker Benchmarks
@@ -0,0 +1,101 @@
+"""
+Candidate Insert Benchmark
+Compares rows/sec of the product_candidates write paths against a real database
+
+Usage (from workers/ocr, with DATABASE_URL set):
+    python -m benchmarks.candidate_insert --rows 20000
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+from typing import Dict, List, Any
+
+import psycopg2
+
+import tasks
+
+
+def synthetic_candidates(count: int) -> List[Dict[str, Any]]:
+    """Build candidates shaped like extract_product_info output"""
+    candidates = []
+    for i in range(count):
+        title = f"Serum Vitamina C {i % 50 + 10}ml\tSKU AB{i:05d} $ {i % 900 + 100}.90"
+        candidates.append({
+            'title': title,
+            'price': float(i % 900 + 100) + 0.9,
+            'sku': f"AB{i:05d}",
+            'raw_line': title,
+            'confidence': 1.0,
+            'page': i // 40 + 1,
+            'position': i % 40,
+        })
+    return candidates
+
+
+def create_job(cursor) -> str:
+    """Create the media and ocr_jobs rows candidates point at"""
+    media_id = str(uuid.uuid4())
+    ocr_job_id = str(uuid.uuid4())
+    cursor.execute(
+        "INSERT INTO media (id, type, url, minio_key) VALUES (%s, 'pdf', %s, %s)",
+        (media_id, 'benchmark://catalog.pdf', 'benchmark/catalog.pdf'),
+    )
+    cursor.execute(
+        "INSERT INTO ocr_jobs (id, source_media_id, status) VALUES (%s, %s, 'processing')",
+        (ocr_job_id, media_id),
+    )
+    return ocr_job_id
+
+
+def run(rows: int, modes: List[str]) -> Dict[str, Any]:
+    """Time each write mode inside a transaction that is rolled back afterwards"""
+    conn = psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
+    candidates = synthetic_candidates(rows)
+    results = {}
+
+    try:
+        cursor = conn.cursor()
+        ocr_job_id = create_job(cursor)
+
+        for mode in modes:
+            cursor.execute("SAVEPOINT bench")
+            started = time.perf_counter()
+            tasks.insert_product_candidates(conn, ocr_job_id, candidates, commit=False, mode=mode)
+            elapsed = time.perf_counter() - started
+            cursor.execute("ROLLBACK TO SAVEPOINT bench")
+
+            results[mode] = {
+                'rows': rows,
+                'seconds': round(elapsed, 4),
+                'rows_per_sec': round(rows / elapsed, 1),
+            }
+    finally:
+        conn.rollback()
+        conn.close()
+
+    baseline = results.get('row')
+    if baseline:
+        for result in results.values():
+            result['speedup_vs_row'] = round(result['rows_per_sec'] / baseline['rows_per_sec'], 2)
+
+    return {
+        'rows': rows,
+        'batch_size': tasks.CANDIDATE_FLUSH_SIZE,
+        'modes': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--modes', default=','.join(tasks.CANDIDATE_WRITERS))
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.modes.split(',')), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Duplicate Detection Benchmark
+Compares DuplicateIndex modes against the pairwise loop of
+PDFProductExtractor.detect_duplicates_in_batch
+
+Usage (from workers/ocr):
+    python -m benchmarks.dedupe --products 1500
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+from difflib import SequenceMatcher
+from typing import Dict, List, Any
+
+from dedupe import DEDUPE_MODES, DuplicateIndex
+
+BASE_NAMES = ['Serum', 'Crema', 'Limpiador', 'Mascarilla', 'Tónico', 'Protector solar', 'Gel', 'Espuma']
+QUALIFIERS = ['hidratante', 'antioxidante', 'vitamina C', 'ácido hialurónico', 'niacinamida', 'retinol',
+              'facial', 'nocturna', 'matificante', 'calmante', 'FPS 50', 'piel grasa', 'piel seca']
+SIZES = ['30 ml', '50 ml', '100 ml', '200 gr', '15 ml']
+STOP_WORDS = ['ml', 'gr', 'gramos', 'mililitros', 'unidades', 'piezas']
+
+
+def normalize_product_name(name: str) -> str:
+    """Same normalization as PDFProductExtractor.normalize_product_name"""
+    normalized = re.sub(r'[^\w\s]', '', name.lower())
+    return ' '.join(word for word in normalized.split() if word not in STOP_WORDS)
+
+
+def synthetic_products(count: int, seed: int = 11) -> List[Dict[str, Any]]:
+    """Products where roughly a fifth are near-duplicates of earlier ones"""
+    rng = random.Random(seed)
+    products = []
+    for _ in range(count):
+        if products and rng.random() < 0.2:
+            source = rng.choice(products)
+            name = source['name'].replace(' ', '  ', 1) if rng.random() < 0.5 else source['name'] + '.'
+            price = round(source['price'] * rng.uniform(0.97, 1.03), 0)
+        else:
+            name = f"{rng.choice(BASE_NAMES)} {rng.choice(QUALIFIERS)} {rng.choice(QUALIFIERS)} {rng.choice(SIZES)}"
+            price = float(rng.randrange(3000, 60000, 10))
+        products.append({'name': name, 'price': price})
+    return products
+
+
+def pairwise_duplicates(products: List[Dict[str, Any]], threshold: float = 0.8) -> List[bool]:
+    """The O(n^2) loop detect_duplicates_in_batch used before DuplicateIndex"""
+    processed = []
+    flags = []
+    for product in products:
+        normalized_name = normalize_product_name(product['name'])
+        is_duplicate = False
+        for processed_product in processed:
+            processed_normalized = normalize_product_name(processed_product['name'])
+            name_similarity = SequenceMatcher(None, normalized_name.lower(), processed_normalized.lower()).ratio()
+            price_similarity = abs(product['price'] - processed_product['price']) <= (product['price'] * 0.05)
+            if name_similarity >= threshold and price_similarity:
+                is_duplicate = True
+                break
+        flags.append(is_duplicate)
+        if not is_duplicate:
+            processed.append(product)
+    return flags
+
+
+def indexed_duplicates(products: List[Dict[str, Any]], mode: str, threshold: float = 0.8) -> List[bool]:
+    """Duplicate flags computed through DuplicateIndex"""
+    index = DuplicateIndex(threshold, price_tolerance=0.05, mode=mode)
+    flags = []
+    for product in products:
+        normalized_name = normalize_product_name(product['name'])
+        is_duplicate = index.find(normalized_name, product['price']) is not None
+        flags.append(is_duplicate)
+        if not is_duplicate:
+            index.add(normalized_name, product['price'], product)
+    return flags
+
+
+def run(count: int, skip_pairwise: bool = False) -> Dict[str, Any]:
+    products = synthetic_products(count)
+    results = {'products': count}
+
+    baseline = None
+    if not skip_pairwise:
+        started = time.perf_counter()
+        baseline = pairwise_duplicates(products)
+        results['pairwise'] = {
+            'seconds': round(time.perf_counter() - started, 4),
+            'duplicates': sum(baseline),
+        }
+
+    for mode in DEDUPE_MODES:
+        started = time.perf_counter()
+        flags = indexed_duplicates(products, mode)
+        result = {
+            'seconds': round(time.perf_counter() - started, 4),
+            'duplicates': sum(flags),
+        }
+        if baseline is not None:
+            result['identical'] = flags == baseline
+            result['speedup'] = round(results['pairwise']['seconds'] / result['seconds'], 2)
+        results[mode] = result
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=1500)
+    parser.add_argument('--skip-pairwise', action='store_true')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.products, args.skip_pairwise), indent=2))
+
+
+if __name__ == '__main__':
+    main()
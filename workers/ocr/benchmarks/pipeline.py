@@ -0,0 +1,309 @@
+"""
+Extraction Pipeline Benchmark
+Runs the worker and scripts/pdf_processor.py over synthetic catalogs and
+records throughput, peak RSS and per-stage timings as a JSON baseline
+
+Usage (from workers/ocr; DATABASE_URL enables the database stages):
+    python -m benchmarks.pipeline --pages 10,100,1000 --kinds text,image --output baseline.json
+    python -m benchmarks.pipeline --compare baseline.json --output current.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import resource
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+# Page text is not uploaded anywhere while benchmarking
+os.environ.setdefault('OCR_PAGE_TEXT_STORAGE', 'none')
+os.environ.setdefault('OCR_PROGRESS_ENABLED', 'false')
+
+import fitz  # PyMuPDF
+import psycopg2
+
+import tasks
+from extraction import EXTRACTION_POOL_SIZE
+from benchmarks.candidate_insert import create_job
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'scripts')
+
+# Vocabulary of PDFProductExtractor.product_indicators and category_keywords
+PRODUCT_TYPES = [
+    'Serum', 'Sérum', 'Suero', 'Crema', 'Crema nutritiva', 'Limpiador', 'Gel limpiador', 'Espuma',
+    'Jabón', 'Mascarilla', 'Máscara', 'Protector solar', 'Bloqueador', 'Tónico', 'Astringente',
+]
+QUALIFIERS = [
+    'hidratante', 'antioxidante', 'vitamina C', 'ácido hialurónico', 'facial', 'FPS 50', 'equilibrante',
+    'niacinamida', 'retinol', 'calmante', 'matificante', 'nocturna', 'tratamiento intensivo',
+]
+SKIN_TYPES = ['piel grasa', 'piel seca', 'piel mixta', 'piel sensible', 'todo tipo de piel']
+SIZES = ['15 ml', '30 ml', '50 ml', '100 ml', '200 ml', '50 gr']
+BRANDS = ['Dermika', 'Lumière', 'Aqualis', 'Botánica', 'Vitalis']
+
+PRODUCTS_PER_PAGE = 8
+
+# Peak RSS is sampled this often while a stage runs
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def product_block(rng: random.Random, index: int) -> str:
+    """One catalog entry: name, description and price in the formats the extractors parse"""
+    name = f"{rng.choice(PRODUCT_TYPES)} {rng.choice(QUALIFIERS)} {rng.choice(BRANDS)} {rng.choice(SIZES)}"
+    description = f"Para {rng.choice(SKIN_TYPES)}, con {rng.choice(QUALIFIERS)}"
+    price = rng.randrange(3000, 60000, 10)
+    price_text = rng.choice([
+        f"${price // 1000}.{price % 1000:03d}",
+        f"{price // 1000}.{price % 1000:03d} pesos",
+        f"Precio: ${price // 1000}.{price % 1000:03d}",
+    ])
+    return f"{name}\n{description}. SKU AB{index:05d} {price_text}"
+
+
+def synthetic_catalog(pages: int, kind: str = 'text', seed: int = 3) -> bytes:
+    """
+    Build a catalog PDF with PRODUCTS_PER_PAGE entries per page
+
+    kind 'text' keeps the text layer; 'image' renders every page to a bitmap
+    so the pages only extract through OCR, like a scanned catalog.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Catálogo de cosmética - página {page_num + 1}", fontsize=12)
+        blocks = [product_block(rng, page_num * PRODUCTS_PER_PAGE + i) for i in range(PRODUCTS_PER_PAGE)]
+        page.insert_textbox(fitz.Rect(72, 90, 540, 780), '\n\n'.join(blocks), fontsize=10)
+
+    if kind == 'image':
+        scanned = fitz.open()
+        for page in doc:
+            pixmap = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+            target = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, pixmap=pixmap)
+        doc.close()
+        doc = scanned
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (Linux only)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class PeakRssSampler:
+    """Tracks the highest RSS seen between __enter__ and __exit__ on a background thread"""
+
+    def __init__(self):
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def measure(fn, *args) -> Tuple[Dict[str, Any], Any]:
+    """Run fn once, returning its seconds and peak RSS together with its result"""
+    with PeakRssSampler() as sampler:
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 4),
+        'peak_rss_mb': round(sampler.peak / 1024 ** 2, 1) if sampler.peak else None,
+    }, result
+
+
+def parse_pages(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """extract_product_info over every page, numbered like iter_page_candidates"""
+    candidates = []
+    for page in pages:
+        text = page.get('text', '') or page.get('ocr_text', '')
+        for position, candidate in enumerate(tasks.extract_product_info(text) if text else []):
+            candidate['page'] = page['page']
+            candidate['position'] = position
+            candidates.append(candidate)
+    return candidates
+
+
+def load_pdf_extractor():
+    """PDFProductExtractor from scripts/pdf_processor.py, or None if its dependencies are missing"""
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    try:
+        from pdf_processor import PDFProductExtractor
+    except ImportError as e:
+        print(f"Skipping process_pdf: {e}", file=sys.stderr)
+        return None
+    return PDFProductExtractor()
+
+
+def run_database_stages(data: bytes, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Time the candidate insert path and the full worker pipeline, rolling both back"""
+    conn = psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
+    stages = {}
+    try:
+        cursor = conn.cursor()
+        ocr_job_id = create_job(cursor)
+
+        cursor.execute("SAVEPOINT bench")
+        stages['db_insert'], _ = measure(
+            lambda: tasks.insert_product_candidates(conn, ocr_job_id, candidates, commit=False))
+        stages['db_insert']['rows'] = len(candidates)
+        cursor.execute("ROLLBACK TO SAVEPOINT bench")
+
+        stages['run_extraction_pipeline'], result = measure(
+            lambda: tasks.run_extraction_pipeline(conn, ocr_job_id, data, checkpoints=False))
+        stages['run_extraction_pipeline']['candidates'] = result['candidates_found']
+        stages['run_extraction_pipeline']['cached_pages'] = result['cached_pages']
+    finally:
+        conn.rollback()
+        conn.close()
+    return stages
+
+
+def run_scenario(pages: int, kind: str, extractor, with_db: bool) -> Dict[str, Any]:
+    data = synthetic_catalog(pages, kind)
+    stages = {}
+
+    stages['extract_text_from_pdf'], page_data = measure(tasks.extract_text_from_pdf, data)
+    sources = {}
+    for page in page_data:
+        source = page.get('source', 'text')
+        sources[source] = sources.get(source, 0) + 1
+
+    stages['extract_product_info'], candidates = measure(parse_pages, page_data)
+    stages['extract_product_info']['candidates'] = len(candidates)
+
+    if extractor is not None:
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+            pdf_file.write(data)
+            pdf_file.flush()
+            stages['process_pdf'], result = measure(extractor.process_pdf, pdf_file.name)
+        stages['process_pdf']['products'] = result.get('total_products', 0)
+
+    if with_db:
+        stages.update(run_database_stages(data, candidates))
+
+    for stage in stages.values():
+        stage['pages_per_sec'] = round(pages / stage['seconds'], 1) if stage['seconds'] else None
+
+    return {
+        'pages': pages,
+        'kind': kind,
+        'bytes': len(data),
+        'page_sources': sources,
+        'stages': stages,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(page_counts: List[int], kinds: List[str], with_db: bool = True) -> Dict[str, Any]:
+    extractor = load_pdf_extractor()
+    with_db = with_db and bool(os.getenv('DATABASE_URL'))
+
+    scenarios = {}
+    try:
+        for kind in kinds:
+            for pages in page_counts:
+                scenarios[f"{kind}-{pages}"] = run_scenario(pages, kind, extractor, with_db)
+    finally:
+        tasks.shutdown_executor()
+        tasks.shutdown_ocr_executor()
+
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pymupdf': fitz.VersionBind,
+        'cpus': os.cpu_count(),
+        'extraction_pool_size': EXTRACTION_POOL_SIZE,
+        'database': with_db,
+        'scenarios': scenarios,
+        # Lifetime peaks; children are the extraction pool processes
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'max_rss_children_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """One line per stage present in both runs with the change in seconds and peak RSS"""
+    lines = [f"{baseline.get('commit')} -> {current.get('commit')}"]
+    for name, scenario in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for stage, result in scenario['stages'].items():
+            before = previous['stages'].get(stage)
+            if not before or not before['seconds']:
+                continue
+            change = (result['seconds'] - before['seconds']) / before['seconds'] * 100
+            rss = ''
+            if before.get('peak_rss_mb') and result.get('peak_rss_mb'):
+                rss = f"  rss {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB"
+            lines.append(f"{name:<12} {stage:<26} {before['seconds']:>9.4f}s -> {result['seconds']:>9.4f}s "
+                         f"({change:+.1f}%){rss}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', default='10,100,1000')
+    parser.add_argument('--kinds', default='text,image')
+    parser.add_argument('--no-db', action='store_true', help='skip the stages that need DATABASE_URL')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare the results against')
+    args = parser.parse_args()
+
+    results = run([int(p) for p in args.pages.split(',')], args.kinds.split(','), with_db=not args.no_db)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            print('\n'.join(compare(json.load(baseline), results)))
+
+
+if __name__ == '__main__':
+    main()
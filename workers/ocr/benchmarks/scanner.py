@@ -0,0 +1,160 @@
+"""
+Scanner Micro-benchmark
+Compares the precompiled scanners against the per-line re.search loops they replaced
+
+Usage (from workers/ocr):
+    python -m benchmarks.scanner --lines 100000
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Any
+
+from scanner import LineCandidateScanner, SectionScanner
+
+PRODUCT_WORDS = ['Serum', 'Crema', 'Limpiador', 'Mascarilla', 'Tónico', 'Protector', 'Hidratante', 'Vitamina C']
+FILLER_WORDS = ['para', 'piel', 'grasa', 'seca', 'mixta', 'con', 'ácido', 'hialurónico', 'uso', 'diario']
+
+# scripts/pdf_processor.py defaults
+SECTION_PRICE_PATTERNS = [
+    r'\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
+    r'(\d{1,3}(?:\.\d{3})*)\s*pesos',
+    r'precio[:\s]*\$?(\d{1,3}(?:\.\d{3})*)',
+]
+PRODUCT_INDICATORS = [
+    'serum', 'crema', 'limpiador', 'mascarilla', 'tónico', 'protector',
+    'hidratante', 'antioxidante', 'vitamina', 'ácido', 'facial'
+]
+
+
+def synthetic_catalog(lines: int, seed: int = 7) -> str:
+    """Build catalog text mixing product lines, prices, SKUs and filler"""
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        kind = rng.random()
+        words = ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(2, 8)))
+        if kind < 0.25:
+            out.append(f"{rng.choice(PRODUCT_WORDS)} {words} {rng.randint(15, 200)}ml ${rng.randint(1, 99)}.{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}")
+        elif kind < 0.35:
+            out.append(f"SKU AB{rng.randint(100, 9999)} {words}")
+        elif kind < 0.45:
+            out.append(f"Precio: {rng.randint(1, 99)}.{rng.randint(0, 999):03d} pesos")
+        elif kind < 0.5:
+            out.append('')
+        else:
+            out.append(words.capitalize())
+    return '\n'.join(out)
+
+
+def legacy_extract_product_info(text: str) -> List[Dict[str, Any]]:
+    """The per-line implementation extract_product_info used before the scanner"""
+    candidates = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or len(line) < 5:
+            continue
+        price_match = re.search(r'\$?\s*(\d+[.,]\d{2})', line)
+        sku_match = re.search(r'\b([A-Z]{2,}\d{2,}|[A-Z0-9]{4,})\b', line)
+        confidence = 0.0
+        extracted_data = {'title': line, 'price': None, 'sku': None, 'raw_line': line}
+        if price_match:
+            try:
+                extracted_data['price'] = float(price_match.group(1).replace(',', '.'))
+                confidence += 0.5
+            except ValueError:
+                pass
+        if sku_match:
+            extracted_data['sku'] = sku_match.group(1)
+            confidence += 0.3
+        if len(line) > 10 and len(line) < 200:
+            confidence += 0.2
+        if confidence > 0.3:
+            extracted_data['confidence'] = min(confidence, 1.0)
+            candidates.append(extracted_data)
+    return candidates
+
+
+def legacy_section_scan(sections: List[str]) -> List[float]:
+    """The indicator filter and extract_price loop from PDFProductExtractor"""
+    prices = []
+    for section in sections:
+        if not any(indicator in section.lower() for indicator in PRODUCT_INDICATORS):
+            prices.append(None)
+            continue
+        price = 0.0
+        for pattern in SECTION_PRICE_PATTERNS:
+            match = re.search(pattern, section, re.IGNORECASE)
+            if match:
+                try:
+                    price = float(match.group(1).replace('.', '').replace(',', '.'))
+                    break
+                except ValueError:
+                    continue
+        prices.append(price)
+    return prices
+
+
+def section_scan(scanner: SectionScanner, sections: List[str]) -> List[float]:
+    """Same loop as legacy_section_scan on the precompiled scanner"""
+    return [
+        scanner.extract_price(section) if scanner.has_product_indicator(section) else None
+        for section in sections
+    ]
+
+
+def timed(fn, *args, repeat: int = 3):
+    """Return (best seconds, result) over `repeat` runs"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(lines: int) -> Dict[str, Any]:
+    text = synthetic_catalog(lines)
+    sections = text.split('\n')
+    line_scanner = LineCandidateScanner()
+    section_scanner = SectionScanner(SECTION_PRICE_PATTERNS, PRODUCT_INDICATORS)
+
+    legacy_line_s, legacy_candidates = timed(legacy_extract_product_info, text)
+    line_s, candidates = timed(line_scanner.scan, text)
+    legacy_section_s, legacy_prices = timed(legacy_section_scan, sections)
+    section_s, prices = timed(section_scan, section_scanner, sections)
+
+    return {
+        'lines': lines,
+        'line_scanner': {
+            'candidates': len(candidates),
+            'identical': candidates == legacy_candidates,
+            'legacy_seconds': round(legacy_line_s, 4),
+            'scanner_seconds': round(line_s, 4),
+            'speedup': round(legacy_line_s / line_s, 2),
+        },
+        'section_scanner': {
+            'sections': len(sections),
+            'identical': prices == legacy_prices,
+            'legacy_seconds': round(legacy_section_s, 4),
+            'scanner_seconds': round(section_s, 4),
+            'speedup': round(legacy_section_s / section_s, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.lines), indent=2))
+
+
+if __name__ == '__main__':
+    main()
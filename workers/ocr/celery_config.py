@@ -4,6 +4,9 @@ Celery Configuration
 
 import os
 from dotenv import load_dotenv
+from kombu import Queue
+
+from routing import LARGE_QUEUE, SMALL_QUEUE, route_ocr_task
 
 load_dotenv()
 
@@ -18,12 +21,34 @@ accept_content = ['json']
 timezone = 'UTC'
 enable_utc = True
 
-# Task routing
-task_routes = {
-    'tasks.process_ocr_job': {'queue': 'ocr'},
-    'tasks.cleanup_old_jobs': {'queue': 'maintenance'},
+# Acknowledge after the task finishes so a job whose worker dies is redelivered
+# and resumes from its last checkpoint
+task_acks_late = True
+task_reject_on_worker_lost = True
+
+# Unacknowledged tasks are redelivered after this long, so it must exceed the longest job
+broker_transport_options = {
+    'visibility_timeout': int(os.getenv('OCR_VISIBILITY_TIMEOUT_SECONDS', str(6 * 3600))),
 }
 
+# Queues; small and large jobs are consumed by separately sized workers
+# ('ocr' is kept so messages sent before the split are still consumed)
+task_queues = (
+    Queue(SMALL_QUEUE),
+    Queue(LARGE_QUEUE),
+    Queue('ocr'),
+    Queue('maintenance'),
+)
+task_default_queue = SMALL_QUEUE
+
+# Task routing
+task_routes = (
+    route_ocr_task,
+    {
+        'tasks.cleanup_old_jobs': {'queue': 'maintenance'},
+    },
+)
+
 # Periodic tasks (Celery Beat)
 from celery.schedules import crontab
 
@@ -0,0 +1,60 @@
+"""
+Job Checkpoints
+Committed progress of long OCR jobs so retried or redelivered tasks resume
+"""
+
+import os
+import json
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Pages processed between checkpoints (each one commits candidates and page text)
+CHECKPOINT_PAGES = int(os.getenv('OCR_CHECKPOINT_PAGES', '50'))
+
+
+def new_checkpoint(content_hash: str) -> Dict[str, Any]:
+    """Progress of a job that has not committed any pages yet"""
+    return {
+        'content_hash': content_hash,
+        'pages_done': 0,
+        'candidates_found': 0,
+        'cached_pages': 0,
+        'page_text_parts': [],
+        'page_text_bytes': 0,
+        'pages': [],
+    }
+
+
+def save_checkpoint(conn, ocr_job_id: str, checkpoint: Dict[str, Any]):
+    """Record the checkpoint and commit it together with the writes made since the last one"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE ocr_jobs SET checkpoint = %s, updated_at = NOW() WHERE id = %s",
+        (json.dumps(checkpoint), ocr_job_id),
+    )
+    conn.commit()
+    cursor.close()
+
+
+def clear_candidates_after(conn, ocr_job_id: str, pages_done: int) -> int:
+    """
+    Delete candidates the job wrote past its checkpoint
+
+    Candidates and checkpoints commit together, so this only finds rows from
+    attempts that predate checkpoints or from an abandoned checkpoint.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        DELETE FROM product_candidates
+        WHERE ocr_job_id = %s AND (page_number IS NULL OR page_number > %s)
+        """,
+        (ocr_job_id, pages_done),
+    )
+    deleted = cursor.rowcount
+    cursor.close()
+    if deleted:
+        logger.info(f"Removed {deleted} candidates past page {pages_done} of job {ocr_job_id}")
+    return deleted
@@ -0,0 +1,221 @@
+"""
+Worker Connections
+Worker-process-scoped Postgres pool, MinIO client and Redis client
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import certifi
+import psycopg2
+import redis
+import urllib3
+from minio import Minio
+from psycopg2.pool import ThreadedConnectionPool
+
+from metrics import DB_POOL_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_MIN_SIZE = int(os.getenv('OCR_DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('OCR_DB_POOL_MAX_SIZE', '4'))
+
+# Seconds to wait for a free pooled connection before giving up
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv('OCR_DB_POOL_TIMEOUT_SECONDS', '30'))
+
+# Connections idle longer than this are pinged before being handed out
+DB_HEALTH_CHECK_AFTER_SECONDS = float(os.getenv('OCR_DB_HEALTH_CHECK_AFTER_SECONDS', '30'))
+
+MINIO_POOL_MAX_SIZE = int(os.getenv('OCR_MINIO_POOL_MAX_SIZE', '10'))
+MINIO_CONNECT_TIMEOUT_SECONDS = float(os.getenv('OCR_MINIO_CONNECT_TIMEOUT_SECONDS', '5'))
+MINIO_READ_TIMEOUT_SECONDS = float(os.getenv('OCR_MINIO_READ_TIMEOUT_SECONDS', '300'))
+
+_db_pool: Optional[ThreadedConnectionPool] = None
+_db_slots: Optional[threading.BoundedSemaphore] = None
+_db_last_used: Dict[int, float] = {}
+_minio_client: Optional[Minio] = None
+_redis_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+pool_stats: Dict[str, Any] = {
+    'acquired': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+    'health_check_failures': 0,
+}
+
+
+def _reset_after_fork():
+    """
+    Forget connections inherited from the parent process
+
+    The sockets belong to the parent, so they are dropped rather than
+    closed; the child builds its own pool and client on first use.
+    """
+    global _db_pool, _db_slots, _minio_client, _redis_client, _lock
+
+    _db_pool = None
+    _db_slots = None
+    _db_last_used.clear()
+    _minio_client = None
+    _redis_client = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def init_db_pool():
+    """Create this process's Postgres pool (called on worker_process_init)"""
+    global _db_pool, _db_slots
+
+    with _lock:
+        if _db_pool is None:
+            _db_pool = ThreadedConnectionPool(
+                DB_POOL_MIN_SIZE,
+                DB_POOL_MAX_SIZE,
+                dsn=os.getenv('DATABASE_URL'),
+            )
+            _db_slots = threading.BoundedSemaphore(DB_POOL_MAX_SIZE)
+            logger.info(f"Initialised Postgres pool ({DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE} connections)")
+
+
+def close_db_pool():
+    """Close every pooled connection (called on worker_process_shutdown)"""
+    global _db_pool, _db_slots
+
+    with _lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
+            _db_slots = None
+            _db_last_used.clear()
+
+
+def _is_healthy(conn) -> bool:
+    """Whether a pooled connection is still usable"""
+    if conn.closed:
+        return False
+
+    last_used = _db_last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < DB_HEALTH_CHECK_AFTER_SECONDS:
+        return True
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def acquire_db_connection():
+    """Check out a healthy connection, waiting up to DB_POOL_TIMEOUT_SECONDS for a free one"""
+    if _db_pool is None:
+        init_db_pool()
+
+    started = time.monotonic()
+    if not _db_slots.acquire(timeout=DB_POOL_TIMEOUT_SECONDS):
+        raise TimeoutError(f"No Postgres connection free after {DB_POOL_TIMEOUT_SECONDS}s")
+
+    try:
+        conn = _db_pool.getconn()
+        while not _is_healthy(conn):
+            pool_stats['health_check_failures'] += 1
+            logger.warning("Discarding broken pooled Postgres connection")
+            _db_last_used.pop(id(conn), None)
+            _db_pool.putconn(conn, close=True)
+            conn = _db_pool.getconn()
+    except Exception:
+        _db_slots.release()
+        raise
+
+    waited = time.monotonic() - started
+    DB_POOL_WAIT_SECONDS.observe(waited)
+    pool_stats['acquired'] += 1
+    pool_stats['wait_seconds_total'] += waited
+    pool_stats['wait_seconds_max'] = max(pool_stats['wait_seconds_max'], waited)
+    return conn
+
+
+def release_db_connection(conn):
+    """Return a connection to the pool, discarding any open transaction"""
+    if _db_pool is None:
+        conn.close()
+        return
+
+    broken = bool(conn.closed)
+    if not broken:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    if broken:
+        _db_last_used.pop(id(conn), None)
+    else:
+        _db_last_used[id(conn)] = time.monotonic()
+
+    _db_pool.putconn(conn, close=broken)
+    _db_slots.release()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool wait-time metrics for this worker process"""
+    stats = dict(pool_stats)
+    stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['acquired'] if stats['acquired'] else 0.0
+    return stats
+
+
+def get_minio_client() -> Minio:
+    """Return this process's MinIO client, sharing one urllib3 connection pool"""
+    global _minio_client
+
+    if _minio_client is None:
+        with _lock:
+            if _minio_client is None:
+                http_client = urllib3.PoolManager(
+                    maxsize=MINIO_POOL_MAX_SIZE,
+                    timeout=urllib3.Timeout(
+                        connect=MINIO_CONNECT_TIMEOUT_SECONDS,
+                        read=MINIO_READ_TIMEOUT_SECONDS,
+                    ),
+                    cert_reqs='CERT_REQUIRED',
+                    ca_certs=certifi.where(),
+                    retries=urllib3.Retry(
+                        total=3,
+                        backoff_factor=0.2,
+                        status_forcelist=[500, 502, 503, 504],
+                    ),
+                )
+                _minio_client = Minio(
+                    endpoint=os.getenv('MINIO_ENDPOINT', 'minio:9000').replace('http://', '').replace('https://', ''),
+                    access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
+                    secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin'),
+                    secure=False,
+                    http_client=http_client,
+                )
+
+    return _minio_client
+
+
+def get_redis_client() -> redis.Redis:
+    """Return this process's Redis client (used for job progress, not the Celery broker)"""
+    global _redis_client
+
+    if _redis_client is None:
+        with _lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    os.getenv('REDIS_URL', 'redis://localhost:6379'),
+                    socket_timeout=2,
+                    socket_connect_timeout=2,
+                    decode_responses=True,
+                )
+
+    return _redis_client
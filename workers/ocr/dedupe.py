@@ -0,0 +1,113 @@
+"""
+Duplicate Index
+Near-duplicate product lookup with price-band and n-gram blocking
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+# 'exact' only skips pairs whose similarity provably cannot reach the
+# threshold, so it returns the same duplicates as comparing every pair.
+# 'ngram' additionally requires a shared character n-gram, which is much
+# cheaper on large batches but may miss heavily edited names.
+DEDUPE_MODES = ('exact', 'ngram')
+
+
+def name_ngrams(name: str, n: int = 3) -> set:
+    """Character n-grams of a name (the whole name when shorter than n)"""
+    if len(name) < n:
+        return {name}
+    return {name[i:i + n] for i in range(len(name) - n + 1)}
+
+
+class DuplicateIndex:
+    """
+    Kept products indexed for similarity lookups
+
+    Candidates for a new product come from the price band it may match in
+    (or from the n-gram postings in 'ngram' mode), are filtered by the
+    length and character-count upper bounds of SequenceMatcher.ratio, and
+    only the survivors are compared in full, in the order they were kept.
+    Every kept name keeps its own SequenceMatcher so its character counts
+    are computed once.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.8, price_tolerance: float = 0.05,
+                 mode: str = 'exact', ngram_size: int = 3):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"Unknown dedupe mode: {mode}")
+        self.similarity_threshold = similarity_threshold
+        self.price_tolerance = price_tolerance
+        self.mode = mode
+        self.ngram_size = ngram_size
+
+        self.items: List[Dict[str, Any]] = []
+        self.prices: List[float] = []
+        self.matchers: List[SequenceMatcher] = []
+        self.by_price: List[Tuple[float, int]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    def _price_band(self, price: float) -> List[int]:
+        """Kept ids whose price may be within tolerance of `price`"""
+        margin = abs(price * self.price_tolerance) * 1.000001 + 1e-9
+        lo = bisect_left(self.by_price, (price - margin, -1))
+        hi = bisect_right(self.by_price, (price + margin, len(self.items)))
+        return [item_id for _, item_id in self.by_price[lo:hi]]
+
+    def _ngram_candidates(self, name: str) -> set:
+        """Kept ids sharing at least one n-gram with `name`"""
+        ids = set()
+        for gram in name_ngrams(name, self.ngram_size):
+            postings = self.postings.get(gram)
+            if postings:
+                ids.update(postings)
+        return ids
+
+    def find(self, name: str, price: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return the first kept item similar to (name, price) and its similarity"""
+        name = name.lower()
+
+        if self.mode == 'ngram':
+            candidate_ids = self._ngram_candidates(name).intersection(self._price_band(price))
+        else:
+            candidate_ids = self._price_band(price)
+
+        threshold = self.similarity_threshold
+        name_len = len(name)
+
+        for item_id in sorted(candidate_ids):
+            # Same price rule as the pairwise check, relative to the new product
+            if not abs(price - self.prices[item_id]) <= (price * self.price_tolerance):
+                continue
+
+            matcher = self.matchers[item_id]
+            kept_len = len(matcher.b)
+            total = name_len + kept_len
+            # ratio() <= 2 * min(len) / total, computed the way SequenceMatcher does
+            if total and 2.0 * min(name_len, kept_len) / total < threshold:
+                continue
+
+            matcher.set_seq1(name)
+            if matcher.quick_ratio() < threshold:
+                continue
+
+            similarity = matcher.ratio()
+            if similarity >= threshold:
+                return self.items[item_id], similarity
+
+        return None
+
+    def add(self, name: str, price: float, item: Dict[str, Any]):
+        """Keep an item so later products are compared against it"""
+        name = name.lower()
+        item_id = len(self.items)
+
+        self.items.append(item)
+        self.prices.append(price)
+        self.matchers.append(SequenceMatcher(None, '', name))
+        insort(self.by_price, (price, item_id))
+
+        if self.mode == 'ngram':
+            for gram in name_ngrams(name, self.ngram_size):
+                self.postings.setdefault(gram, []).append(item_id)
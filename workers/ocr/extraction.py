@@ -0,0 +1,322 @@
+"""
+Extraction Engine
+Page-parallel text extraction for large PDF catalogs using PyMuPDF
+"""
+
+import os
+import re
+import hashlib
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Any, Optional
+
+import fitz  # PyMuPDF
+
+from ocr_engine import iter_ocr_pages, needs_ocr, rasterize_page
+from spool import PdfSource, spool_chunks
+
+logger = logging.getLogger(__name__)
+
+# Number of extraction processes per worker process (1 disables the pool); unset or 0
+# divides the CPUs between the Celery worker's processes, see set_worker_concurrency
+EXTRACTION_POOL_SIZE_SETTING = int(os.getenv('OCR_EXTRACTION_POOL_SIZE', '0'))
+
+
+def default_pool_size(worker_concurrency: int = 1) -> int:
+    """CPUs per worker process; every prefork child starts a pool of its own"""
+    return max(1, (os.cpu_count() or 1) // max(1, worker_concurrency))
+
+
+EXTRACTION_POOL_SIZE = EXTRACTION_POOL_SIZE_SETTING or default_pool_size()
+
+# Documents with fewer pages than this are extracted serially
+PARALLEL_PAGE_THRESHOLD = int(os.getenv('OCR_PARALLEL_PAGE_THRESHOLD', '40'))
+
+# Page ranges handed to each pool process; more ranges even out slow pages
+RANGES_PER_PROCESS = int(os.getenv('OCR_RANGES_PER_PROCESS', '4'))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def set_worker_concurrency(concurrency: int):
+    """Size the pool for a worker running `concurrency` processes, unless OCR_EXTRACTION_POOL_SIZE is set"""
+    global EXTRACTION_POOL_SIZE
+    if not EXTRACTION_POOL_SIZE_SETTING:
+        EXTRACTION_POOL_SIZE = default_pool_size(concurrency)
+
+
+def allow_child_processes():
+    """
+    Let a daemonic process, such as a Celery prefork child, start the extraction pool
+
+    multiprocessing refuses to start children from a daemonic process and has
+    no public switch for it, so this clears the flag on the private
+    Process._config (covered by tests/test_extraction.py). The pool does not
+    rely on daemon cleanup: it is shut down on worker_process_shutdown.
+    """
+    process = multiprocessing.current_process()
+    if process.daemon:
+        process._config['daemon'] = False
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """Return the worker-wide extraction pool, creating it on first use"""
+    global _executor
+
+    if EXTRACTION_POOL_SIZE <= 1:
+        return None
+
+    if _executor is None:
+        allow_child_processes()
+
+        # spawn keeps the Celery child's broker/DB sockets out of the pool
+        _executor = ProcessPoolExecutor(
+            max_workers=EXTRACTION_POOL_SIZE,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        logger.info(f"Started extraction pool with {EXTRACTION_POOL_SIZE} processes")
+
+    return _executor
+
+
+def shutdown_executor():
+    """Shut down the extraction pool (called on worker shutdown)"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def open_pdf(source: PdfSource):
+    """Open a PDF from bytes, or by path for spooled documents so MuPDF reads it from disk"""
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def page_count(source: PdfSource) -> int:
+    """Number of pages in a PDF"""
+    doc = open_pdf(source)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def page_layout_lines(page) -> List[list]:
+    """Text lines of a page as [x0, y0, x1, y1, text], built from PyMuPDF's word list"""
+    lines = []
+    current = None
+    for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words"):
+        if (block_no, line_no) != current:
+            current = (block_no, line_no)
+            lines.append([x0, y0, x1, y1, word])
+        else:
+            line = lines[-1]
+            line[0] = min(line[0], x0)
+            line[1] = min(line[1], y0)
+            line[2] = max(line[2], x1)
+            line[3] = max(line[3], y1)
+            line[4] += ' ' + word
+    return [[round(value, 1) for value in line[:4]] + [line[4]] for line in lines]
+
+
+def build_page_data(page_num: int, page, layout: bool = False) -> Dict[str, Any]:
+    """
+    Build the page record stored for a single PDF page
+
+    Pages without a usable text layer carry a rasterized image under
+    'raster', which iter_ocr_pages replaces with OCR text. With layout,
+    the positioned text lines are added under 'layout'.
+    """
+    text = page.get_text()
+    page_data = {
+        'page': page_num + 1,
+        'text': text,
+        'ocr_text': text,  # Text layer stands in for OCR unless the page is scanned
+        'images': [],
+        'source': 'text',
+    }
+
+    if needs_ocr(page, text):
+        page_data['raster'] = rasterize_page(page)
+    elif layout:
+        page_data['layout'] = page_layout_lines(page)
+
+    return page_data
+
+
+def extract_page_list(doc, page_numbers: List[int], layout: bool = False) -> List[Dict[str, Any]]:
+    """Extract the given 0-based pages from an open document"""
+    return [build_page_data(page_num, doc[page_num], layout) for page_num in page_numbers]
+
+
+def split_pages(page_numbers: List[int], parts: int) -> List[List[int]]:
+    """Split page numbers into at most `parts` contiguous chunks"""
+    parts = max(1, min(parts, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), parts)
+
+    chunks = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        chunks.append(page_numbers[start:stop])
+        start = stop
+
+    return chunks
+
+
+# Indirect references inside PDF object definitions, e.g. '12 0 R'
+_REFERENCE_RE = re.compile(r'\b(\d+) \d+ R\b')
+
+
+def _object_hash(doc, xref: int, memo: Dict[int, str], active: set) -> str:
+    """
+    Hash an object with everything it references, independent of xref numbers
+
+    References are replaced by the hash of the object they point to, so the
+    same font or form XObject hashes the same in every document. memo holds
+    finished hashes for the document; active breaks reference cycles.
+    """
+    if xref in memo:
+        return memo[xref]
+    if xref in active or not 0 < xref < doc.xref_length():
+        return 'ref'
+
+    active.add(xref)
+    digest = hashlib.sha256()
+    definition = doc.xref_object(xref, compressed=True)
+    digest.update(_resolve_references(doc, definition, memo, active).encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref) or b'')
+    active.discard(xref)
+
+    memo[xref] = digest.hexdigest()
+    return memo[xref]
+
+
+def _resolve_references(doc, definition: str, memo: Dict[int, str], active: set) -> str:
+    return _REFERENCE_RE.sub(lambda match: _object_hash(doc, int(match.group(1)), memo, active), definition)
+
+
+def page_resources(doc, page) -> str:
+    """The page's /Resources entry, inherited from the page tree when the page has none"""
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, 'Resources')
+        if kind != 'null':
+            return value
+        kind, parent = doc.xref_get_key(xref, 'Parent')
+        xref = int(parent.split()[0]) if kind == 'xref' else 0
+    return ''
+
+
+def page_content_hash(doc, page, memo: Dict[int, str] = None) -> str:
+    """
+    Hash what a page's text depends on without extracting it
+
+    Covers the page's content streams and every object reachable from its
+    resources: fonts, images and form XObjects with their own streams and
+    resources, however deeply nested. Pages that only draw a form XObject
+    (`q /fzFrm0 Do Q`) therefore differ whenever the form's content does.
+    """
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    digest.update(_resolve_references(doc, page_resources(doc, page), memo, set()).encode())
+    return digest.hexdigest()
+
+
+def compute_page_hashes(source: PdfSource) -> List[str]:
+    """Return the content hash of every page, in page order"""
+    doc = open_pdf(source)
+    try:
+        # Shared resources (fonts, logos) are hashed once per document
+        memo: Dict[int, str] = {}
+        return [page_content_hash(doc, page, memo) for page in doc]
+    finally:
+        doc.close()
+
+
+def _extract_file_pages(path: str, page_numbers: List[int], layout: bool = False) -> List[Dict[str, Any]]:
+    """Pool entry point: open a spooled document by path and extract a chunk of pages"""
+    doc = open_pdf(path)
+    try:
+        return extract_page_list(doc, page_numbers, layout)
+    finally:
+        doc.close()
+
+
+def iter_pages_serial(source: PdfSource, page_numbers: List[int], layout: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield pages one at a time from a single open document"""
+    doc = open_pdf(source)
+    try:
+        for page_num in page_numbers:
+            yield build_page_data(page_num, doc[page_num], layout)
+    finally:
+        doc.close()
+
+
+def iter_pages_parallel(executor: ProcessPoolExecutor, source: PdfSource, page_numbers: List[int],
+                        layout: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield pages in order while the pool extracts a bounded window of chunks ahead
+
+    Every pool process reopens the document by path; in-memory documents are
+    written to a spool file first rather than pickled into every chunk.
+    """
+    chunks = iter(split_pages(page_numbers, EXTRACTION_POOL_SIZE * RANGES_PER_PROCESS))
+
+    spooled = None if isinstance(source, str) else spool_chunks([source])
+    path = source if spooled is None else spooled.path
+    pending = deque()
+    try:
+        # Only a couple of chunks per process are in flight so extracted text cannot pile up
+        for chunk in islice(chunks, EXTRACTION_POOL_SIZE * 2):
+            pending.append(executor.submit(_extract_file_pages, path, chunk, layout))
+
+        while pending:
+            pages_data = pending.popleft().result()
+
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(_extract_file_pages, path, next_chunk, layout))
+
+            yield from pages_data
+    finally:
+        for future in pending:
+            future.cancel()
+        if spooled is not None:
+            spooled.close()
+
+
+def iter_pages(source: PdfSource, page_numbers: Optional[List[int]] = None, layout: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield pages of a PDF in order, extracting in parallel when there are enough of them
+
+    source is the PDF bytes or the path of a spooled file. page_numbers
+    restricts extraction to the given 0-based pages; by default every page
+    is extracted. layout adds each page's positioned text lines.
+    """
+    if page_numbers is None:
+        page_numbers = list(range(page_count(source)))
+
+    executor = get_executor() if len(page_numbers) >= PARALLEL_PAGE_THRESHOLD else None
+    if executor is None:
+        pages = iter_pages_serial(source, page_numbers, layout)
+    else:
+        logger.info(f"Extracting {len(page_numbers)} pages on {EXTRACTION_POOL_SIZE} processes")
+        pages = iter_pages_parallel(executor, source, page_numbers, layout)
+
+    # Scanned pages are OCR'd on a separate bounded pool, keeping page order
+    return iter_ocr_pages(pages)
+
+
+def extract_pages(source: PdfSource, layout: bool = False) -> List[Dict[str, Any]]:
+    """Extract every page of a PDF into a list"""
+    return list(iter_pages(source, layout=layout))
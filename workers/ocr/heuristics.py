@@ -0,0 +1,313 @@
+"""
+Candidate Heuristics
+Pluggable ways of turning a page of catalog text into product candidates,
+shared by the OCR worker and scripts/pdf_processor.py
+"""
+
+import os
+import re
+from typing import Dict, List, Any
+
+from keywords import DEFAULT_PRODUCT_INDICATORS, KeywordMatcher, compile_keywords
+from scanner import (
+    LENGTH_CONFIDENCE,
+    PRICE_CONFIDENCE,
+    SKU_CONFIDENCE,
+    LineCandidateScanner,
+    SectionScanner,
+    line_scanner,
+)
+
+# Heuristic the OCR worker parses pages with ('line', 'section' or 'layout')
+CANDIDATE_HEURISTIC = os.getenv('OCR_CANDIDATE_HEURISTIC', 'line')
+
+# Section-based defaults, originally from PDFProductExtractor
+DEFAULT_PRICE_PATTERNS = [
+    r'\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',  # $1.500,00 o $1500
+    r'(\d{1,3}(?:\.\d{3})*)\s*pesos',          # 1500 pesos
+    r'precio[:\s]*\$?(\d{1,3}(?:\.\d{3})*)',   # precio: $1500
+]
+
+# Blank lines, or a period followed by an uppercase letter, start a new section
+SECTION_SPLIT_RE = re.compile(r'\n\s*\n|\.\s*(?=[A-Z])')
+WHITESPACE_RE = re.compile(r'\s+')
+
+SECTION_CONFIDENCE = 0.9
+SECTION_DESCRIPTION_LENGTH = 300
+
+# Layout grouping: lines stacked above a price belong to it while the vertical gap
+# stays under this many line heights, up to LAYOUT_MAX_NAME_LINES lines
+LAYOUT_MAX_GAP_LINES = 1.5
+LAYOUT_MAX_NAME_LINES = 3
+
+
+def clean_text(text: str) -> str:
+    """Collapse whitespace, including newlines, to single spaces"""
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    return page.get('text', '') or page.get('ocr_text', '')
+
+
+def categorize(candidates: List[Dict[str, Any]], keywords: KeywordMatcher) -> List[Dict[str, Any]]:
+    """Set each candidate's 'category' from its title and description"""
+    for candidate in candidates:
+        candidate['category'] = keywords.category(f"{candidate['title']} {candidate.get('description', '')}")
+    return candidates
+
+
+class LineHeuristic:
+    """One candidate per line carrying a price or SKU (the worker's original parser)"""
+
+    name = 'line'
+    needs_layout = False
+    filters_by_keywords = False
+
+    def __init__(self, scanner: LineCandidateScanner = None):
+        self.scanner = scanner or line_scanner
+
+    def parse(self, text: str, keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        candidates = self.scanner.scan(text)
+        return categorize(candidates, keywords) if keywords else candidates
+
+    def parse_page(self, page: Dict[str, Any], keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        return self.parse(page_text(page), keywords)
+
+
+class SectionHeuristic:
+    """
+    One candidate per paragraph-like section with a product indicator and a price
+    (the parser of scripts/pdf_processor.py)
+
+    Candidates carry the section's name as 'title' plus a 'description',
+    and a 'category': one keyword scan of the section both filters it on
+    product indicators and categorizes it.
+    """
+
+    name = 'section'
+    needs_layout = False
+    filters_by_keywords = True
+
+    def __init__(self, scanner: SectionScanner = None, keywords: KeywordMatcher = None):
+        self.scanner = scanner or SectionScanner(DEFAULT_PRICE_PATTERNS, DEFAULT_PRODUCT_INDICATORS)
+        self.keywords = keywords or compile_keywords()
+
+    def parse(self, text: str, keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        keywords = keywords or self.keywords
+        candidates = []
+
+        for section in SECTION_SPLIT_RE.split(text):
+            section = clean_text(section)
+            has_indicator, category = keywords.classify(section)
+            if not has_indicator:
+                continue
+
+            # Name: the first sentence, or the second if the first is too short or long
+            lines = section.split('.')
+            name = lines[0].strip()
+            if (len(name) < 10 or len(name) > 100) and len(lines) > 1:
+                name = lines[1].strip()
+
+            price = self.scanner.extract_price(section)
+            if price == 0.0:
+                continue
+
+            description = section.replace(name, '').strip()
+            if description.startswith('.'):
+                description = description[1:].strip()
+            if len(description) > SECTION_DESCRIPTION_LENGTH:
+                description = description[:SECTION_DESCRIPTION_LENGTH] + "..."
+
+            candidates.append({
+                'title': name,
+                'description': description,
+                'price': price,
+                'sku': None,
+                'raw_line': section,
+                'confidence': SECTION_CONFIDENCE,
+                'category': category,
+            })
+
+        return candidates
+
+    def parse_page(self, page: Dict[str, Any], keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        return self.parse(page_text(page), keywords)
+
+
+def _same_row(a: list, b: list) -> bool:
+    """Whether two [x0, y0, x1, y1, text] lines share a row (their centers are within half a line)"""
+    return abs((a[1] + a[3]) - (b[1] + b[3])) / 2 <= max(a[3] - a[1], b[3] - b[1]) / 2
+
+
+def _same_column(a: list, b: list) -> bool:
+    return a[0] < b[2] and a[2] > b[0]
+
+
+class LayoutHeuristic:
+    """
+    One candidate per price, grouped with its name and SKU by position
+
+    Works on the positioned lines extraction adds under 'layout'. A price
+    takes the cells to its left on the same row (table rows) or, failing
+    that, the lines stacked right above it in its column (grid cells and
+    lists), so name and price laid out in separate columns still pair up
+    and lines without a price never become candidates of their own. A row
+    stops at lines stacked above another price, so in a grid whose cells
+    are offset a price does not take its neighbour's name, and lines that
+    look like prices are never names. Pages without positions (OCR'd
+    scans) fall back to the line heuristic.
+    """
+
+    name = 'layout'
+    needs_layout = True
+    filters_by_keywords = False
+
+    def __init__(self, scanner: SectionScanner = None, fallback: LineHeuristic = None):
+        self.scanner = scanner or SectionScanner(DEFAULT_PRICE_PATTERNS, DEFAULT_PRODUCT_INDICATORS)
+        self.fallback = fallback or LineHeuristic()
+        # Decimal prices and SKUs are read like the fallback's line scanner does
+        self.line_scanner = self.fallback.scanner
+
+    def parse(self, text: str, keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        return self.fallback.parse(text, keywords)
+
+    def parse_page(self, page: Dict[str, Any], keywords: KeywordMatcher = None) -> List[Dict[str, Any]]:
+        lines = page.get('layout')
+        if not lines:
+            return self.parse(page_text(page), keywords)
+        candidates = self.parse_lines(lines)
+        return categorize(candidates, keywords) if keywords else candidates
+
+    def price_of(self, text: str):
+        """Currency-style price first, then the line heuristic's decimal price"""
+        price = self.scanner.extract_price(text)
+        if price:
+            return price
+        match = self.line_scanner.price_re.search(text)
+        if match:
+            try:
+                return self.line_scanner.parse_price(match.group(1))
+            except ValueError:
+                pass
+        return None
+
+    def _stacked_lines(self, lines: List[list], anchor: int, taken: set) -> List[int]:
+        """Indices of the lines right above lines[anchor] in its column, top first"""
+        price_line = lines[anchor]
+        height = max(price_line[3] - price_line[1], 1.0)
+        above = sorted(
+            (i for i, line in enumerate(lines)
+             if i != anchor and line[3] <= price_line[1] + height / 2 and _same_column(line, price_line)),
+            key=lambda i: lines[i][3],
+            reverse=True,
+        )
+        stacked = []
+        top = price_line[1]
+        for i in above:
+            if i in taken or top - lines[i][3] > LAYOUT_MAX_GAP_LINES * height or len(stacked) >= LAYOUT_MAX_NAME_LINES:
+                break
+            stacked.append(i)
+            top = lines[i][1]
+        return stacked[::-1]
+
+    def _name_lines(self, lines: List[list], anchor: int, boundaries: Dict[int, int], taken: set) -> List[int]:
+        """
+        Indices of the lines that name the product priced by lines[anchor]
+
+        boundaries maps prices, and the lines stacked above them, to their
+        price; those of other prices end a row.
+        """
+        price_line = lines[anchor]
+
+        # Table row: the cells left of the price, back to the previous price or grid cell in the row
+        left_edge = max(
+            (lines[i][2] for i, owner in boundaries.items()
+             if owner != anchor and lines[i][2] <= price_line[0] and _same_row(lines[i], price_line)),
+            default=float('-inf'),
+        )
+        row = [
+            i for i, line in enumerate(lines)
+            if i not in taken and boundaries.get(i, anchor) == anchor
+            and line[2] <= price_line[0] and line[0] >= left_edge and _same_row(line, price_line)
+        ]
+        if row:
+            return sorted(row, key=lambda i: lines[i][0])
+
+        # Grid cell or list: the lines right above the price in its column
+        return self._stacked_lines(lines, anchor, taken)
+
+    def looks_like_price(self, text: str) -> bool:
+        return bool(self.scanner.price_trigger_re.search(text) or self.line_scanner.price_re.search(text))
+
+    def parse_lines(self, lines: List[list]) -> List[Dict[str, Any]]:
+        """Build candidates from [x0, y0, x1, y1, text] lines"""
+        # Reading order: top to bottom, then left to right within a row
+        lines = sorted(lines, key=lambda line: (round(line[1]), line[0]))
+        prices = {}
+        for i, line in enumerate(lines):
+            price = self.price_of(line[4])
+            if price:
+                prices[i] = price
+
+        # Lines that look like prices but did not parse as one name nothing either
+        taken = set(prices) | {i for i, line in enumerate(lines) if i not in prices and self.looks_like_price(line[4])}
+        boundaries = {i: i for i in prices}
+        for anchor in prices:
+            for i in self._stacked_lines(lines, anchor, taken):
+                boundaries.setdefault(i, anchor)
+
+        candidates = []
+        for anchor, price in prices.items():
+            name_lines = self._name_lines(lines, anchor, boundaries, taken)
+            taken.update(name_lines)
+
+            texts = [lines[i][4].strip() for i in name_lines]
+            price_text = lines[anchor][4].strip()
+            title = texts[0] if texts else ''
+            description = ' '.join(texts[1:] + [price_text]) if texts else ''
+            raw_line = ' | '.join(texts + [price_text])
+
+            sku_match = self.line_scanner.sku_re.search(raw_line)
+            confidence = PRICE_CONFIDENCE
+            if sku_match:
+                confidence += SKU_CONFIDENCE
+            min_title, max_title = self.line_scanner.title_length
+            if min_title < len(title) < max_title:
+                confidence += LENGTH_CONFIDENCE
+            if confidence <= self.line_scanner.confidence_threshold:
+                continue
+
+            group = [lines[i] for i in name_lines] + [lines[anchor]]
+            candidates.append({
+                'title': title,
+                'description': description,
+                'price': price,
+                'sku': sku_match.group(1) if sku_match else None,
+                'raw_line': raw_line,
+                'confidence': min(confidence, 1.0),
+                'bbox': [
+                    min(line[0] for line in group), min(line[1] for line in group),
+                    max(line[2] for line in group), max(line[3] for line in group),
+                ],
+            })
+
+        return candidates
+
+
+HEURISTICS = {
+    LineHeuristic.name: LineHeuristic,
+    SectionHeuristic.name: SectionHeuristic,
+    LayoutHeuristic.name: LayoutHeuristic,
+}
+
+
+def make_heuristic(name: str):
+    """Build the named heuristic with its default scanner"""
+    try:
+        return HEURISTICS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown candidate heuristic '{name}' (expected one of: {', '.join(HEURISTICS)})")
+
+
+candidate_heuristic = make_heuristic(CANDIDATE_HEURISTIC)
@@ -0,0 +1,228 @@
+"""
+Keyword Matcher
+Accent-insensitive single-pass matching of product indicators and category
+keywords, with per-provider keyword sets loaded from the database
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults, originally PDFProductExtractor.product_indicators and category_keywords
+DEFAULT_PRODUCT_INDICATORS = [
+    'serum', 'crema', 'limpiador', 'mascarilla', 'tónico', 'protector',
+    'hidratante', 'antioxidante', 'vitamina', 'ácido', 'facial'
+]
+DEFAULT_CATEGORY_KEYWORDS = {
+    'serums': ['serum', 'sérum', 'suero'],
+    'cremas': ['crema', 'hidratante', 'nutritiva'],
+    'limpiadores': ['limpiador', 'gel', 'espuma', 'jabón'],
+    'mascarillas': ['mascarilla', 'máscara', 'tratamiento'],
+    'proteccion': ['protector', 'fps', 'solar', 'bloqueador'],
+    'tonicos': ['tónico', 'astringente', 'equilibrante']
+}
+DEFAULT_CATEGORY = 'otros'
+
+# Seconds a provider's keyword set is used before checking the database for changes
+KEYWORD_REFRESH_SECONDS = int(os.getenv('OCR_KEYWORD_REFRESH_SECONDS', '300'))
+
+# Label of product indicators; categories are labelled by their position
+INDICATOR = -1
+
+_FOLD_TABLE = str.maketrans('áàâäãéèêëíìîïóòôöõúùûüñç', 'aaaaaeeeeiiiiooooouuuunc')
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip Spanish accents so 'Tónico' and 'tonico' compare equal"""
+    return text.lower().translate(_FOLD_TABLE)
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Regex for the words of a character trie with shared prefixes factored out
+
+    Matching walks the trie once per start position, whatever the number of
+    words, and the greedy optional groups make it return the longest word.
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if '' in node else body
+
+
+class KeywordMatcher:
+    """
+    Finds every indicator and category keyword in a text in one pass
+
+    Keywords are folded and compiled into a single trie-shaped regex inside
+    a lookahead, so finditer reports the longest keyword starting at every
+    position. Each keyword also carries the labels of the keywords that are
+    its prefixes, which gives the same answers as testing `keyword in text`
+    for every keyword, i.e. Aho-Corasick semantics. Categories keep their
+    priority: the first category with a keyword in the text wins.
+
+    fingerprint identifies a non-default keyword configuration, e.g. in
+    result cache versions; it is None for the built-in keywords.
+    """
+
+    def __init__(self, indicators: Iterable[str], category_keywords: Dict[str, Iterable[str]],
+                 default_category: str = DEFAULT_CATEGORY, fingerprint: str = None):
+        self.categories = list(category_keywords)
+        self.default_category = default_category
+        self.fingerprint = fingerprint
+
+        labels: Dict[str, set] = {}
+        for keyword in indicators:
+            if keyword.strip():
+                labels.setdefault(fold(keyword.strip()), set()).add(INDICATOR)
+        for position, category in enumerate(self.categories):
+            for keyword in category_keywords[category]:
+                if keyword.strip():
+                    labels.setdefault(fold(keyword.strip()), set()).add(position)
+
+        self.labels: Dict[str, FrozenSet[int]] = {
+            keyword: frozenset().union(*(labels[keyword[:end]] for end in range(1, len(keyword) + 1) if keyword[:end] in labels))
+            for keyword in labels
+        }
+
+        trie: dict = {}
+        for keyword in labels:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self.pattern = re.compile(f'(?=({_trie_pattern(trie)}))') if labels else None
+
+    def scan(self, text: str) -> FrozenSet[int]:
+        """Labels of every keyword found in the text"""
+        if self.pattern is None or not text:
+            return frozenset()
+        found = set()
+        for match in self.pattern.finditer(fold(text)):
+            found |= self.labels[match.group(1)]
+        return frozenset(found)
+
+    def _category(self, labels: FrozenSet[int]) -> str:
+        positions = [label for label in labels if label != INDICATOR]
+        return self.categories[min(positions)] if positions else self.default_category
+
+    def classify(self, text: str) -> Tuple[bool, str]:
+        """(has a product indicator, category) of a text"""
+        labels = self.scan(text)
+        return INDICATOR in labels, self._category(labels)
+
+    def has_indicator(self, text: str) -> bool:
+        return INDICATOR in self.scan(text)
+
+    def count_indicators(self, text: str) -> int:
+        """Number of distinct product indicators in a text"""
+        if self.pattern is None or not text:
+            return 0
+        return len({match.group(1) for match in self.pattern.finditer(fold(text))
+                    if INDICATOR in self.labels[match.group(1)]})
+
+    def category(self, text: str) -> str:
+        return self._category(self.scan(text))
+
+
+def _config_key(indicators: Iterable[str], category_keywords: Dict[str, Iterable[str]]) -> tuple:
+    return (
+        tuple(indicators),
+        tuple((category, tuple(keywords)) for category, keywords in category_keywords.items()),
+    )
+
+
+_compiled: Dict[tuple, KeywordMatcher] = {}
+
+_DEFAULT_KEY = _config_key(DEFAULT_PRODUCT_INDICATORS, DEFAULT_CATEGORY_KEYWORDS)
+
+
+def compile_keywords(indicators: Iterable[str] = DEFAULT_PRODUCT_INDICATORS,
+                     category_keywords: Dict[str, Iterable[str]] = None) -> KeywordMatcher:
+    """Return the matcher for a keyword configuration, compiling it once per process"""
+    if category_keywords is None:
+        category_keywords = DEFAULT_CATEGORY_KEYWORDS
+    key = _config_key(indicators, category_keywords)
+    matcher = _compiled.get(key)
+    if matcher is None:
+        fingerprint = None
+        if key != _DEFAULT_KEY:
+            fingerprint = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+        matcher = _compiled[key] = KeywordMatcher(indicators, category_keywords, fingerprint=fingerprint)
+    return matcher
+
+
+def merge_keywords(rows: Iterable[Tuple[str, str, str]]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Defaults extended with (kind, category, keyword) rows of provider_keywords
+
+    Keywords of an existing category join it; new categories rank after the
+    default ones, in name order.
+    """
+    indicators = list(DEFAULT_PRODUCT_INDICATORS)
+    categories = {category: list(keywords) for category, keywords in DEFAULT_CATEGORY_KEYWORDS.items()}
+    for kind, category, keyword in sorted(rows, key=lambda row: (row[1] not in categories, row[1], row[2])):
+        if kind == 'indicator':
+            if keyword not in indicators:
+                indicators.append(keyword)
+        elif keyword not in categories.setdefault(category, []):
+            categories[category].append(keyword)
+    return indicators, categories
+
+
+def fetch_provider_keywords(conn, provider_id: str) -> List[Tuple[str, str, str]]:
+    """(kind, category, keyword) rows of a provider"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT kind, category, keyword FROM provider_keywords WHERE provider_id = %s",
+        (provider_id,),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+class ProviderKeywords:
+    """A provider's compiled keywords, reloaded when its provider_keywords rows change"""
+
+    def __init__(self, provider_id: Optional[str]):
+        self.provider_id = provider_id
+        self.matcher = compile_keywords()
+        self.version = None
+        self.checked_at = 0.0
+
+    def refresh(self, conn):
+        if self.provider_id is None or time.monotonic() - self.checked_at < KEYWORD_REFRESH_SECONDS:
+            return
+
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*), MAX(updated_at) FROM provider_keywords WHERE provider_id = %s",
+            (self.provider_id,),
+        )
+        version = cursor.fetchone()
+        cursor.close()
+        if version != self.version:
+            self.matcher = compile_keywords(*merge_keywords(fetch_provider_keywords(conn, self.provider_id)))
+            self.version = version
+            logger.info(f"Loaded {version[0]} keywords for provider {self.provider_id}")
+        self.checked_at = time.monotonic()
+
+
+_providers: Dict[Optional[str], ProviderKeywords] = {}
+
+
+def get_keyword_matcher(conn, provider_id: Optional[str]) -> KeywordMatcher:
+    """Return this worker process's up-to-date keyword matcher for a provider"""
+    keywords = _providers.get(provider_id)
+    if keywords is None:
+        keywords = _providers[provider_id] = ProviderKeywords(provider_id)
+    keywords.refresh(conn)
+    return keywords.matcher
@@ -0,0 +1,211 @@
+"""
+Catalog Matching
+Provider-scoped in-memory index of existing products for suggesting
+resolved_product_id on extracted candidates
+"""
+
+import os
+import re
+import time
+import logging
+from collections import Counter
+from typing import Dict, Any, Optional, Set, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+# Seconds between incremental refreshes (rows changed since the last one)
+MATCH_INDEX_REFRESH_SECONDS = int(os.getenv('OCR_MATCH_INDEX_REFRESH_SECONDS', '60'))
+
+# Seconds between full reloads, which also drop deleted products
+MATCH_INDEX_RELOAD_SECONDS = int(os.getenv('OCR_MATCH_INDEX_RELOAD_SECONDS', '3600'))
+
+# Candidates scoring below this get no suggestion
+MATCH_MIN_SCORE = float(os.getenv('OCR_MATCH_MIN_SCORE', '0.5'))
+
+# Title n-grams shared by more than this share of products are ignored
+COMMON_GRAM_RATIO = 0.2
+
+STOP_WORDS = {'ml', 'gr', 'gramos', 'mililitros', 'unidades', 'piezas', 'precio', 'sku'}
+
+TITLE_WEIGHT = 0.8
+PRICE_WEIGHT = 0.2
+PRICE_BAND_MARGIN = 0.1
+
+_PRODUCT_QUERY = """
+    SELECT p.id::text AS id, p.title, p.sku, p.active,
+           COALESCE(array_agg(v.sku) FILTER (WHERE v.sku IS NOT NULL), ARRAY[]::varchar[]) AS variant_skus,
+           MIN(v.price_numeric)::float8 AS min_price,
+           MAX(v.price_numeric)::float8 AS max_price,
+           GREATEST(p.updated_at, MAX(v.updated_at)) AS changed_at
+    FROM products p
+    LEFT JOIN product_variants v ON v.product_id = p.id AND v.active
+    WHERE p.provider_id IS NOT DISTINCT FROM %(provider_id)s
+    {since_filter}
+    GROUP BY p.id
+"""
+
+_SINCE_FILTER = """
+    AND (p.updated_at >= %(since)s
+         OR p.id IN (SELECT product_id FROM product_variants WHERE updated_at >= %(since)s))
+"""
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, drop punctuation, sizes, prices and codes"""
+    words = re.sub(r'[^\w\s]', ' ', (title or '').lower()).split()
+    return ' '.join(
+        word for word in words
+        if word not in STOP_WORDS and not any(char.isdigit() for char in word)
+    )
+
+
+def title_grams(title: str, n: int = 3) -> Set[str]:
+    """Character n-grams of a normalized title, padded at word edges"""
+    padded = f' {title} '
+    if len(padded) < n:
+        return {padded} if title else set()
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class CatalogMatchIndex:
+    """
+    Existing products of one provider, indexed by SKU, title n-grams and price band
+
+    SKU matches (product or variant SKU) score 1.0. Otherwise the title
+    n-gram Dice coefficient is combined with whether the candidate price
+    falls inside the product's variant price band.
+    """
+
+    def __init__(self, provider_id: Optional[str]):
+        self.provider_id = provider_id
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.sku_map: Dict[str, str] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.watermark = None
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+
+    def _remove(self, product_id: str):
+        entry = self.products.pop(product_id, None)
+        if entry is None:
+            return
+        for sku in entry['skus']:
+            if self.sku_map.get(sku) == product_id:
+                del self.sku_map[sku]
+        for gram in entry['grams']:
+            postings = self.postings.get(gram)
+            if postings:
+                postings.discard(product_id)
+                if not postings:
+                    del self.postings[gram]
+
+    def _upsert(self, row: Dict[str, Any]):
+        self._remove(row['id'])
+        if not row['active']:
+            return
+
+        title = normalize_title(row['title'])
+        skus = {sku.strip().upper() for sku in [row['sku'], *row['variant_skus']] if sku}
+        entry = {
+            'title': title,
+            'grams': title_grams(title),
+            'skus': skus,
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+        }
+        self.products[row['id']] = entry
+        for sku in skus:
+            self.sku_map[sku] = row['id']
+        for gram in entry['grams']:
+            self.postings.setdefault(gram, set()).add(row['id'])
+
+    def load(self, conn, since=None):
+        """Load all products, or only those changed since `since`"""
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            _PRODUCT_QUERY.format(since_filter=_SINCE_FILTER if since else ''),
+            {'provider_id': self.provider_id, 'since': since},
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+
+        for row in rows:
+            self._upsert(row)
+            if row['changed_at'] and (self.watermark is None or row['changed_at'] > self.watermark):
+                self.watermark = row['changed_at']
+
+        return len(rows)
+
+    def refresh(self, conn):
+        """Bring the index up to date, fully or incrementally depending on its age"""
+        now = time.monotonic()
+
+        if self.loaded_at is None or now - self.loaded_at >= MATCH_INDEX_RELOAD_SECONDS:
+            self.products.clear()
+            self.sku_map.clear()
+            self.postings.clear()
+            self.watermark = None
+            count = self.load(conn)
+            self.loaded_at = self.refreshed_at = now
+            logger.info(f"Loaded match index for provider {self.provider_id}: {count} products")
+        elif now - self.refreshed_at >= MATCH_INDEX_REFRESH_SECONDS:
+            count = self.load(conn, since=self.watermark)
+            self.refreshed_at = now
+            if count:
+                logger.info(f"Refreshed match index for provider {self.provider_id}: {count} changed products")
+
+    def _price_score(self, entry: Dict[str, Any], price: Optional[float]) -> float:
+        if price is None or entry['min_price'] is None:
+            return 0.0
+        low = entry['min_price'] * (1 - PRICE_BAND_MARGIN)
+        high = entry['max_price'] * (1 + PRICE_BAND_MARGIN)
+        return 1.0 if low <= price <= high else 0.0
+
+    def match(self, candidate: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        """Return (product_id, score) for the best matching product, if any"""
+        if not self.products:
+            return None
+
+        sku = candidate.get('sku')
+        if sku:
+            product_id = self.sku_map.get(sku.strip().upper())
+            if product_id:
+                return product_id, 1.0
+
+        grams = title_grams(normalize_title(candidate.get('title', '')))
+        if not grams:
+            return None
+
+        common_limit = max(1, int(len(self.products) * COMMON_GRAM_RATIO))
+        shared = Counter()
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings and (len(postings) <= common_limit or len(self.products) < 50):
+                shared.update(postings)
+
+        best = None
+        price = candidate.get('price')
+        for product_id, _ in shared.most_common(20):
+            entry = self.products[product_id]
+            dice = 2.0 * len(grams & entry['grams']) / (len(grams) + len(entry['grams']))
+            score = TITLE_WEIGHT * dice + PRICE_WEIGHT * self._price_score(entry, price)
+            if best is None or score > best[1]:
+                best = (product_id, score)
+
+        if best and best[1] >= MATCH_MIN_SCORE:
+            return best[0], round(best[1], 4)
+        return None
+
+
+_indexes: Dict[Optional[str], CatalogMatchIndex] = {}
+
+
+def get_match_index(conn, provider_id: Optional[str]) -> CatalogMatchIndex:
+    """Return this worker process's up-to-date match index for a provider"""
+    index = _indexes.get(provider_id)
+    if index is None:
+        index = _indexes[provider_id] = CatalogMatchIndex(provider_id)
+    index.refresh(conn)
+    return index
@@ -0,0 +1,214 @@
+"""
+Worker Metrics
+Prometheus histograms for each OCR pipeline stage, served over HTTP per worker
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Port of the worker's /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv('OCR_METRICS_PORT', '9808'))
+
+# Prefork children write their samples here; the main process serves the aggregate
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    # Unlabelled metrics create their sample files as soon as they are defined
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+STAGES = (
+    'db_lookup', 'download', 'extract_page', 'parse_candidates',
+    'db_insert', 'checkpoint', 'result_update', 'job',
+)
+
+# (upper bound in bytes, label) for the file size label
+SIZE_BUCKETS = (
+    (1024 * 1024, 'lt_1mb'),
+    (10 * 1024 * 1024, '1_10mb'),
+    (100 * 1024 * 1024, '10_100mb'),
+)
+
+STAGE_SECONDS = Histogram(
+    'ocr_stage_seconds',
+    'Time spent in each OCR pipeline stage (per page for extract_page and parse_candidates)',
+    ['stage', 'provider', 'size_bucket'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+
+DOWNLOAD_BYTES = Histogram(
+    'ocr_download_bytes',
+    'Size of documents downloaded from MinIO',
+    ['provider', 'size_bucket'],
+    buckets=(64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3),
+)
+
+PAGES = Counter(
+    'ocr_pages_total',
+    'Pages processed, by where their text came from',
+    ['provider', 'source'],
+)
+
+PAGE_CLASSES = Counter(
+    'ocr_page_classes_total',
+    'Pages by page classifier decision (product, low or skip)',
+    ['provider', 'class'],
+)
+
+JOBS = Counter(
+    'ocr_jobs_total',
+    'Finished OCR jobs by outcome',
+    ['status'],
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    'ocr_db_pool_wait_seconds',
+    'Time spent waiting for a pooled Postgres connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+
+ADMISSION_BUDGET_BYTES = Gauge(
+    'ocr_admission_budget_bytes',
+    "Memory budget shared by the worker's jobs",
+    multiprocess_mode='max',
+)
+
+ADMISSION_RESERVED_BYTES = Gauge(
+    'ocr_admission_reserved_bytes',
+    'Estimated memory reserved by running jobs',
+    multiprocess_mode='livesum',
+)
+
+ADMISSION_DEFERRALS = Counter(
+    'ocr_admission_deferrals_total',
+    'Jobs sent back to their queue because their memory estimate did not fit the budget',
+    ['task'],
+)
+
+
+RETENTION_ROWS = Counter(
+    'ocr_retention_rows_deleted_total',
+    'Rows removed by cleanup_old_jobs',
+    ['table'],
+)
+
+RETENTION_BATCH_LOCK_SECONDS = Histogram(
+    'ocr_retention_batch_lock_seconds',
+    'Time each cleanup_old_jobs delete transaction held its locks',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+RETENTION_ARCHIVED_BYTES = Counter(
+    'ocr_retention_archived_bytes_total',
+    'Compressed bytes of jobs and candidates archived to MinIO before deletion',
+)
+
+
+def size_bucket(size: Optional[int]) -> str:
+    """Label for a document size in bytes"""
+    if size is None:
+        return 'unknown'
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return 'gte_100mb'
+
+
+class JobMetrics:
+    """
+    Stage timings of one job, labelled by provider and file size bucket
+
+    The size is only known after the download, so observations made before
+    set_file_size() are held back and labelled once it is.
+    """
+
+    def __init__(self, provider_id: Optional[str] = None, file_size: Optional[int] = None):
+        self.provider = provider_id or 'none'
+        self.bucket = size_bucket(file_size) if file_size is not None else None
+        self.held: List[Tuple[str, float]] = []
+
+    def set_file_size(self, size: int):
+        self.bucket = size_bucket(size)
+        DOWNLOAD_BYTES.labels(self.provider, self.bucket).observe(size)
+        held, self.held = self.held, []
+        for stage, seconds in held:
+            self.observe(stage, seconds)
+
+    def set_provider(self, provider_id: Optional[str]):
+        self.provider = provider_id or 'none'
+
+    def observe(self, stage: str, seconds: float):
+        if self.bucket is None:
+            self.held.append((stage, seconds))
+        else:
+            STAGE_SECONDS.labels(stage, self.provider, self.bucket).observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def timed_pages(self, pages: Iterable[dict]) -> Iterator[dict]:
+        """Time how long each page takes to arrive from the extraction pipeline"""
+        pages = iter(pages)
+        while True:
+            started = time.perf_counter()
+            page = next(pages, None)
+            if page is None:
+                return
+            self.observe('extract_page', time.perf_counter() - started)
+            PAGES.labels(self.provider, page.get('source', 'text')).inc()
+            yield page
+
+    def page_classified(self, decision: str):
+        PAGE_CLASSES.labels(self.provider, decision).inc()
+
+    def finish(self, status: str):
+        """Count the job and flush anything still held back"""
+        JOBS.labels(status).inc()
+        if self.bucket is None:
+            self.bucket = 'unknown'
+            held, self.held = self.held, []
+            for stage, seconds in held:
+                self.observe(stage, seconds)
+
+
+def start_metrics_server():
+    """
+    Serve /metrics from the Celery main process (called on worker_init)
+
+    With PROMETHEUS_MULTIPROC_DIR set, samples from every prefork child are
+    aggregated; files left by an earlier run are removed first so its dead
+    children are not counted.
+    """
+    if METRICS_PORT <= 0:
+        return
+
+    if MULTIPROC_DIR:
+        own_suffix = f"_{os.getpid()}.db"
+        for name in os.listdir(MULTIPROC_DIR):
+            if name.endswith('.db') and not name.endswith(own_suffix):
+                os.remove(os.path.join(MULTIPROC_DIR, name))
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(METRICS_PORT, registry=registry)
+    else:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set; /metrics only covers the main process")
+        start_http_server(METRICS_PORT)
+
+    logger.info(f"Serving metrics on :{METRICS_PORT}/metrics")
+
+
+def mark_process_dead():
+    """Drop a prefork child's live gauges (called on worker_process_shutdown)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,150 @@
+"""
+OCR Engine
+Tesseract fallback for PDF pages without a usable text layer
+"""
+
+import os
+import logging
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Any, Optional
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+OCR_ENABLED = os.getenv('OCR_ENABLED', 'true').lower() == 'true'
+
+# Pages whose text layer has fewer characters than this are OCR'd (if they contain images)
+OCR_MIN_TEXT_CHARS = int(os.getenv('OCR_MIN_TEXT_CHARS', '20'))
+
+# Rasterization resolution for OCR
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+
+OCR_LANGUAGE = os.getenv('OCR_LANGUAGE', 'spa')
+
+# Tesseract processes running at once per worker process
+OCR_POOL_SIZE = int(os.getenv('OCR_POOL_SIZE', '2'))
+
+# Rasterized pages waiting for or in OCR at once, bounding raster memory
+OCR_MAX_INFLIGHT = int(os.getenv('OCR_MAX_INFLIGHT', str(OCR_POOL_SIZE * 2)))
+
+# Pages OCR'd per document; the rest are recorded as skipped
+OCR_MAX_PAGES_PER_JOB = int(os.getenv('OCR_MAX_PAGES_PER_JOB', '200'))
+
+OCR_TIMEOUT_SECONDS = int(os.getenv('OCR_TIMEOUT_SECONDS', '120'))
+
+# Text-layer pages held back behind a page still being OCR'd
+OCR_MAX_QUEUED_PAGES = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_ocr_executor() -> ThreadPoolExecutor:
+    """
+    Return the worker-wide OCR pool
+
+    The work happens in tesseract child processes, so threads that wait on
+    them are enough to bound how many run at once.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=OCR_POOL_SIZE, thread_name_prefix='ocr')
+    return _executor
+
+
+def shutdown_ocr_executor():
+    """Shut down the OCR pool (called on worker shutdown)"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def needs_ocr(page, text: str) -> bool:
+    """Cheap check for scanned pages: almost no text layer but at least one image"""
+    return OCR_ENABLED and len(text.strip()) < OCR_MIN_TEXT_CHARS and bool(page.get_images())
+
+
+def rasterize_page(page) -> bytes:
+    """Render a page to grayscale PNG bytes in memory"""
+    pixmap = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+    return pixmap.tobytes("png")
+
+
+def run_ocr(image: bytes) -> str:
+    """OCR an in-memory image by piping it through tesseract's stdin/stdout"""
+    completed = subprocess.run(
+        ['tesseract', 'stdin', 'stdout', '-l', OCR_LANGUAGE, '--dpi', str(OCR_DPI)],
+        input=image,
+        capture_output=True,
+        timeout=OCR_TIMEOUT_SECONDS,
+        check=True,
+        # One thread per tesseract process; concurrency comes from the pool
+        env={**os.environ, 'OMP_THREAD_LIMIT': '1'},
+    )
+    return completed.stdout.decode('utf-8', errors='replace')
+
+
+def iter_ocr_pages(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    OCR rasterized pages on the pool and yield every page in order
+
+    Pages arrive with a 'raster' entry when extraction found no text layer.
+    Text-layer pages pass straight through unless they are queued behind a
+    page still being OCR'd.
+    """
+    executor = get_ocr_executor()
+    queue = deque()
+    inflight = 0
+    ocr_pages = 0
+
+    def finish(page: Dict[str, Any], future: Optional[Future]) -> Dict[str, Any]:
+        if future is not None:
+            try:
+                # The text layer was (nearly) empty, so the OCR output becomes the page text
+                page['text'] = page['ocr_text'] = future.result()
+                page['source'] = 'ocr'
+            except Exception as e:
+                logger.warning(f"OCR failed for page {page['page']}: {str(e)}")
+                page['source'] = 'ocr_failed'
+        return page
+
+    try:
+        for page in pages:
+            raster = page.pop('raster', None)
+            future = None
+
+            if raster is not None:
+                if ocr_pages < OCR_MAX_PAGES_PER_JOB:
+                    future = executor.submit(run_ocr, raster)
+                    ocr_pages += 1
+                    inflight += 1
+                else:
+                    page['source'] = 'ocr_skipped'
+            queue.append((page, future))
+
+            # Flush everything that is ready; block only when too much is queued
+            while queue and (
+                queue[0][1] is None
+                or queue[0][1].done()
+                or inflight >= OCR_MAX_INFLIGHT
+                or len(queue) > OCR_MAX_QUEUED_PAGES
+            ):
+                page, future = queue.popleft()
+                if future is not None:
+                    inflight -= 1
+                yield finish(page, future)
+
+        while queue:
+            yield finish(*queue.popleft())
+    finally:
+        for _, future in queue:
+            if future is not None:
+                future.cancel()
+
+    if ocr_pages:
+        logger.info(f"OCR'd {ocr_pages} pages")
@@ -0,0 +1,97 @@
+"""
+Page Classifier
+Cheap scoring of extracted pages so covers, terms and ingredient lists skip
+candidate parsing or have their candidates down-weighted
+"""
+
+import os
+import re
+from typing import Dict, List, Any
+
+from keywords import KeywordMatcher
+
+# Classify pages before candidate parsing; disabled, every page is parsed as before
+PAGE_CLASSIFIER_ENABLED = os.getenv('OCR_PAGE_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+
+# Pages with less text than this are skipped (covers, dividers, failed OCR)
+PAGE_MIN_CHARS = int(os.getenv('OCR_PAGE_MIN_CHARS', '40'))
+
+# Price tokens per 1000 characters under which a page is treated as prose
+PAGE_MIN_PRICE_DENSITY = float(os.getenv('OCR_PAGE_MIN_PRICE_DENSITY', '1.0'))
+
+# Confidence multiplier for candidates of low-scoring pages
+PAGE_LOW_CONFIDENCE_FACTOR = float(os.getenv('OCR_PAGE_LOW_CONFIDENCE_FACTOR', '0.5'))
+
+# Distinct product indicators that keep a page without prices from being skipped
+PAGE_MIN_INDICATORS = int(os.getenv('OCR_PAGE_MIN_INDICATORS', '2'))
+
+SKU_DIGIT_RE = re.compile(r'\d')
+SKU_LETTER_RE = re.compile(r'[A-Za-z]')
+
+PAGE_PRODUCT = 'product'
+PAGE_LOW = 'low'
+PAGE_SKIP = 'skip'
+
+
+class PageClassifier:
+    """
+    Sorts pages into 'product', 'low' and 'skip' from their text alone
+
+    Pages that are too short, or that have no price token and nothing
+    else that looks like a product, are skipped and never reach candidate
+    parsing. Pages without prices that do list SKU codes or several
+    product indicators (price lists sent without prices, order forms),
+    pages whose prices are sparse and pages that mention no product
+    indicator keyword are parsed, but their candidates are down-weighted.
+    Price tokens and SKUs are the matches of the heuristics' own patterns,
+    so a provider's formats count.
+    """
+
+    def __init__(self, price_patterns: List[re.Pattern], sku_pattern: re.Pattern = None,
+                 min_chars: int = PAGE_MIN_CHARS, min_price_density: float = PAGE_MIN_PRICE_DENSITY,
+                 low_confidence_factor: float = PAGE_LOW_CONFIDENCE_FACTOR,
+                 min_indicators: int = PAGE_MIN_INDICATORS):
+        self.price_patterns = price_patterns
+        self.sku_pattern = sku_pattern
+        self.min_chars = min_chars
+        self.min_price_density = min_price_density
+        self.low_confidence_factor = low_confidence_factor
+        self.min_indicators = min_indicators
+
+    def price_tokens(self, text: str) -> int:
+        # Patterns overlap on the same prices, so the best single count is used
+        return max((sum(1 for _ in pattern.finditer(text)) for pattern in self.price_patterns), default=0)
+
+    def sku_tokens(self, text: str) -> int:
+        # Codes with a digit and a letter, or long numeric ones; not years or uppercase headings
+        if self.sku_pattern is None:
+            return 0
+        return sum(
+            1 for match in self.sku_pattern.finditer(text)
+            if SKU_DIGIT_RE.search(match.group(1)) and (SKU_LETTER_RE.search(match.group(1)) or len(match.group(1)) >= 6)
+        )
+
+    def classify(self, text: str, keywords: KeywordMatcher) -> Dict[str, Any]:
+        """The page's decision ('class'), the rule that made it ('reason') and the counts it used"""
+        chars = len(text.strip())
+        if chars < self.min_chars:
+            return {'class': PAGE_SKIP, 'reason': 'short', 'chars': chars, 'price_tokens': 0}
+
+        prices = self.price_tokens(text)
+        decision = {'class': PAGE_PRODUCT, 'reason': None, 'chars': chars, 'price_tokens': prices}
+        if not prices:
+            # SKU-only price lists and order forms are still parsed
+            listed = self.sku_tokens(text) or keywords.count_indicators(text) >= self.min_indicators
+            decision.update({'class': PAGE_LOW if listed else PAGE_SKIP, 'reason': 'no_prices'})
+        elif prices * 1000 / chars < self.min_price_density:
+            decision.update({'class': PAGE_LOW, 'reason': 'sparse_prices'})
+        elif not keywords.has_indicator(text):
+            decision.update({'class': PAGE_LOW, 'reason': 'no_indicators'})
+        return decision
+
+    def down_weight(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of candidates with their confidence scaled down, leaving cached originals intact"""
+        return [
+            {**candidate, 'confidence': round(candidate.get('confidence', 0) * self.low_confidence_factor, 4)}
+            for candidate in candidates
+        ]
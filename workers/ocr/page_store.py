@@ -0,0 +1,106 @@
+"""
+Page Text Store
+Compressed per-job page text in MinIO, referenced from ocr_jobs.result
+"""
+
+import os
+import gzip
+import logging
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
+
+from minio.error import S3Error
+
+from connections import get_minio_client
+
+logger = logging.getLogger(__name__)
+
+# 'minio' keeps page text in object storage; 'none' drops it after parsing
+PAGE_TEXT_STORAGE = os.getenv('OCR_PAGE_TEXT_STORAGE', 'minio')
+
+PAGE_TEXT_BUCKET = os.getenv('OCR_PAGE_TEXT_BUCKET', os.getenv('MINIO_BUCKET', 'angebae-media'))
+PAGE_TEXT_PREFIX = os.getenv('OCR_PAGE_TEXT_PREFIX', 'ocr-pages/')
+
+# Compressed text kept in memory before the spool moves to a temp file
+PAGE_TEXT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def page_text_prefix(ocr_job_id: str) -> str:
+    """Object name prefix holding a job's page text parts"""
+    return f"{PAGE_TEXT_PREFIX}{ocr_job_id}/"
+
+
+def page_text_key(ocr_job_id: str, part: int) -> str:
+    """Object name of one part of a job's page text"""
+    return f"{page_text_prefix(ocr_job_id)}{part:04d}.gz"
+
+
+class PageTextWriter:
+    """
+    Collects a run of pages into one object of concatenated gzip members
+
+    Every page is compressed as its own gzip member, so a single page can be
+    read back with a ranged GET of (offset, length) and decompressed alone,
+    while the object as a whole is still a valid gzip stream of its pages.
+    A job writes one part per checkpoint.
+    """
+
+    def __init__(self, ocr_job_id: str, part: int = 0):
+        self.key = page_text_key(ocr_job_id, part)
+        self.spool = tempfile.SpooledTemporaryFile(max_size=PAGE_TEXT_SPOOL_BYTES)
+        self.size = 0
+        self.pages = 0
+
+    def add(self, text: str) -> Tuple[int, int]:
+        """Append one page and return its (offset, length) in the object"""
+        member = gzip.compress((text or '').encode('utf-8'), compresslevel=6, mtime=0)
+        offset = self.size
+        self.spool.write(member)
+        self.size += len(member)
+        self.pages += 1
+        return offset, len(member)
+
+    def upload(self) -> Dict[str, Any]:
+        """Write the object to MinIO and return its key and size"""
+        try:
+            self.spool.seek(0)
+            get_minio_client().put_object(
+                PAGE_TEXT_BUCKET,
+                self.key,
+                self.spool,
+                self.size,
+                content_type='application/gzip',
+            )
+        finally:
+            self.spool.close()
+
+        return {'key': self.key, 'bytes': self.size}
+
+    def close(self):
+        self.spool.close()
+
+
+def open_page_text_writer(ocr_job_id: str, part: int = 0) -> Optional[PageTextWriter]:
+    """Return a writer for one part of the job's page text, or None when page text is not kept"""
+    if PAGE_TEXT_STORAGE == 'minio':
+        return PageTextWriter(ocr_job_id, part)
+    return None
+
+
+def page_text_ref(parts: List[str], size: int) -> Optional[Dict[str, Any]]:
+    """The page_text reference stored in the job result"""
+    if not parts:
+        return None
+    return {'storage': 'minio', 'bucket': PAGE_TEXT_BUCKET, 'parts': parts, 'bytes': size}
+
+
+def discard_page_text(ocr_job_id: str):
+    """Remove every part of a job's page text (best effort, e.g. after a failed run)"""
+    if PAGE_TEXT_STORAGE != 'minio':
+        return
+    try:
+        client = get_minio_client()
+        for obj in client.list_objects(PAGE_TEXT_BUCKET, prefix=page_text_prefix(ocr_job_id), recursive=True):
+            client.remove_object(PAGE_TEXT_BUCKET, obj.object_name)
+    except S3Error as e:
+        logger.warning(f"Could not remove page text for job {ocr_job_id}: {str(e)}")
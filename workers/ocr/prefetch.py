@@ -0,0 +1,105 @@
+"""
+Object Prefetch
+Background download of upcoming documents while the current one is extracted
+"""
+
+import os
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes of downloaded-but-unprocessed documents held at once (per task)
+PREFETCH_BUDGET_BYTES = int(os.getenv('OCR_PREFETCH_BUDGET_BYTES', str(256 * 1024 * 1024)))
+
+# Documents waiting ahead of the one being processed, regardless of size
+PREFETCH_MAX_AHEAD = int(os.getenv('OCR_PREFETCH_MAX_AHEAD', '8'))
+
+
+class ObjectPrefetcher:
+    """
+    Downloads items ahead of the consumer within a byte budget
+
+    Items are (key, size, payload) tuples; size may be None when unknown, in
+    which case it is looked up with `stat`. A download is started only while
+    the bytes of documents downloading or waiting, plus its own size, fit in
+    the budget, except that the next document is always started so one
+    oversized file cannot stall the queue. An item's bytes are released when
+    the consumer asks for the following one.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Optional[int], Any]], fetch: Callable[[str], bytes],
+                 stat: Callable[[str], int] = None, concurrency: int = 4,
+                 budget_bytes: int = PREFETCH_BUDGET_BYTES, max_ahead: int = PREFETCH_MAX_AHEAD):
+        self.items = iter(items)
+        self.fetch = fetch
+        self.stat = stat
+        self.budget_bytes = budget_bytes
+        self.max_ahead = max(1, max_ahead)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='prefetch')
+        self.queue = deque()
+        self.reserved = 0
+        self.peak_reserved = 0
+        self._next = None
+
+    def _size_of(self, key: str, size: Optional[int]) -> int:
+        if size is None and self.stat is not None:
+            try:
+                size = self.stat(key)
+            except Exception as e:
+                # The download reports the real error
+                logger.debug(f"Could not stat {key}: {str(e)}")
+        return size or 0
+
+    def _fill(self):
+        while len(self.queue) < self.max_ahead:
+            if self._next is None:
+                item = next(self.items, None)
+                if item is None:
+                    return
+                key, size, payload = item
+                self._next = (key, self._size_of(key, size), payload)
+
+            key, size, payload = self._next
+            if self.queue and self.reserved + size > self.budget_bytes:
+                return
+
+            self._next = None
+            self.reserved += size
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+            self.queue.append((payload, size, self.executor.submit(self.fetch, key)))
+
+    def __iter__(self) -> Iterator[Tuple[Any, Future]]:
+        """Yield (payload, future) in input order; future.result() gives the bytes or raises"""
+        self._fill()
+        while self.queue:
+            payload, size, future = self.queue.popleft()
+            # Start the following downloads while the consumer works on this one
+            self._fill()
+            try:
+                yield payload, future
+            finally:
+                self.reserved -= size
+            self._fill()
+
+    def pending(self) -> Iterator[Any]:
+        """Payloads not handed out yet (queued or never started)"""
+        for payload, _, _ in self.queue:
+            yield payload
+        if self._next is not None:
+            yield self._next[2]
+        for _, _, payload in self.items:
+            yield payload
+
+    def close(self):
+        for _, _, future in self.queue:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,229 @@
+"""
+Extraction Profiles
+Per-provider candidate parsing settings (patterns, thresholds, heuristic and
+price format), compiled once and cached in each worker process
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from heuristics import (
+    CANDIDATE_HEURISTIC,
+    DEFAULT_PRICE_PATTERNS,
+    HEURISTICS,
+    LayoutHeuristic,
+    LineHeuristic,
+    SectionHeuristic,
+    candidate_heuristic,
+)
+from keywords import DEFAULT_PRODUCT_INDICATORS, KeywordMatcher
+from page_classifier import (
+    PAGE_LOW_CONFIDENCE_FACTOR,
+    PAGE_MIN_CHARS,
+    PAGE_MIN_INDICATORS,
+    PAGE_MIN_PRICE_DENSITY,
+    PageClassifier,
+)
+from result_cache import extractor_version
+from scanner import LineCandidateScanner, SectionScanner, line_scanner
+
+logger = logging.getLogger(__name__)
+
+# Seconds a provider's profile is used before it is read from the database again
+PROFILE_REFRESH_SECONDS = int(os.getenv('OCR_PROFILE_REFRESH_SECONDS', '300'))
+
+# Duplicate detection defaults of scripts/pdf_processor.py
+DEFAULT_PRICE_TOLERANCE = 0.05
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+
+# Settings that change parsed candidates, with the LineCandidateScanner argument they set
+LINE_SCANNER_SETTINGS = {
+    'line_price_pattern': 'price_pattern',
+    'sku_pattern': 'sku_pattern',
+    'min_line_length': 'min_line_length',
+    'title_length': 'title_length',
+    'confidence_threshold': 'confidence_threshold',
+    'decimal_separator': 'decimal_separator',
+}
+SECTION_SCANNER_SETTINGS = ('price_patterns', 'decimal_separator')
+
+# Every accepted settings key with its JSON type
+PROFILE_SETTINGS = {
+    'line_price_pattern': str,
+    'sku_pattern': str,
+    'price_patterns': list,
+    'min_line_length': int,
+    'title_length': list,
+    'confidence_threshold': (int, float),
+    'decimal_separator': str,
+    'price_tolerance': (int, float),
+    'similarity_threshold': (int, float),
+    'page_min_chars': int,
+    'page_min_price_density': (int, float),
+    'page_low_confidence_factor': (int, float),
+    'page_min_indicators': int,
+}
+
+
+def _check_pattern(name: str, pattern: str):
+    if re.compile(pattern).groups < 1:
+        raise ValueError(f"Profile setting '{name}' needs a capturing group for the value")
+
+
+def validate_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise ValueError (or re.error for a bad pattern) unless settings is a valid profile"""
+    if not isinstance(settings, dict):
+        raise ValueError("Profile settings must be a JSON object")
+    for name, value in settings.items():
+        expected = PROFILE_SETTINGS.get(name)
+        if expected is None:
+            raise ValueError(f"Unknown profile setting '{name}' (expected one of: {', '.join(PROFILE_SETTINGS)})")
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError(f"Profile setting '{name}' has the wrong type")
+
+    for name in ('line_price_pattern', 'sku_pattern'):
+        if name in settings:
+            _check_pattern(name, settings[name])
+    for pattern in settings.get('price_patterns', []):
+        _check_pattern('price_patterns', pattern)
+    if settings.get('decimal_separator', ',') not in (',', '.'):
+        raise ValueError("Profile setting 'decimal_separator' must be ',' or '.'")
+    title_length = settings.get('title_length', [0, 1])
+    if len(title_length) != 2 or not all(isinstance(n, int) for n in title_length):
+        raise ValueError("Profile setting 'title_length' must be [min, max]")
+    return settings
+
+
+class ExtractionProfile:
+    """
+    A provider's parsing settings compiled into a ready-to-use heuristic
+
+    Settings left out keep their defaults. fingerprint identifies the
+    settings that change parsed candidates and is None when there are
+    none, in which case the worker's own heuristic object is reused.
+    """
+
+    def __init__(self, heuristic: str = CANDIDATE_HEURISTIC, settings: Dict[str, Any] = None):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown candidate heuristic '{heuristic}' (expected one of: {', '.join(HEURISTICS)})")
+        self.settings = validate_settings(dict(settings or {}))
+        self.heuristic_name = heuristic
+        self.price_tolerance = self.settings.get('price_tolerance', DEFAULT_PRICE_TOLERANCE)
+        self.similarity_threshold = self.settings.get('similarity_threshold', DEFAULT_SIMILARITY_THRESHOLD)
+
+        parsing = {name: value for name, value in self.settings.items()
+                   if name in LINE_SCANNER_SETTINGS or name in SECTION_SCANNER_SETTINGS}
+        self.fingerprint = None
+        if parsing:
+            self.fingerprint = hashlib.sha1(json.dumps(parsing, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+        line_arguments = {argument: parsing[name] for name, argument in LINE_SCANNER_SETTINGS.items() if name in parsing}
+        if 'title_length' in line_arguments:
+            line_arguments['title_length'] = tuple(line_arguments['title_length'])
+        self.line_scanner = LineCandidateScanner(**line_arguments) if line_arguments else line_scanner
+        self.price_patterns = list(parsing.get('price_patterns', DEFAULT_PRICE_PATTERNS))
+        self.section_scanner = SectionScanner(self.price_patterns, DEFAULT_PRODUCT_INDICATORS,
+                                              parsing.get('decimal_separator', ','))
+
+        # Pages are classified outside the result cache, so these settings are not fingerprinted
+        self.page_classifier = PageClassifier(
+            [self.line_scanner.price_re, self.section_scanner.price_trigger_re],
+            sku_pattern=self.line_scanner.sku_re,
+            min_chars=self.settings.get('page_min_chars', PAGE_MIN_CHARS),
+            min_price_density=self.settings.get('page_min_price_density', PAGE_MIN_PRICE_DENSITY),
+            low_confidence_factor=self.settings.get('page_low_confidence_factor', PAGE_LOW_CONFIDENCE_FACTOR),
+            min_indicators=self.settings.get('page_min_indicators', PAGE_MIN_INDICATORS),
+        )
+
+        if self.fingerprint is None and heuristic == CANDIDATE_HEURISTIC:
+            self.heuristic = candidate_heuristic
+        elif heuristic == LineHeuristic.name:
+            self.heuristic = LineHeuristic(self.line_scanner)
+        elif heuristic == SectionHeuristic.name:
+            self.heuristic = SectionHeuristic(self.section_scanner)
+        else:
+            self.heuristic = LayoutHeuristic(self.section_scanner, LineHeuristic(self.line_scanner))
+
+    def cache_version(self, keywords: KeywordMatcher = None) -> str:
+        """
+        Result cache version of pages parsed with this profile
+
+        Providers without a profile share the plain heuristic version. The
+        keyword set is part of it only for heuristics that drop candidates
+        by keyword; categories are re-applied to cached pages anyway.
+        """
+        version = extractor_version(self.heuristic_name)
+        if self.fingerprint:
+            version += f"-p{self.fingerprint}"
+        if keywords is not None and keywords.fingerprint and self.heuristic.filters_by_keywords:
+            version += f"-k{keywords.fingerprint}"
+        return version
+
+
+_compiled: Dict[str, ExtractionProfile] = {}
+
+
+def compile_profile(heuristic: str = None, settings: Dict[str, Any] = None) -> ExtractionProfile:
+    """Return the compiled profile for a configuration, compiling it once per process"""
+    heuristic = heuristic or CANDIDATE_HEURISTIC
+    key = json.dumps([heuristic, settings or {}], sort_keys=True)
+    profile = _compiled.get(key)
+    if profile is None:
+        profile = _compiled[key] = ExtractionProfile(heuristic, settings)
+    return profile
+
+
+def fetch_profile(conn, provider_id: str) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """(heuristic, settings) of a provider's extraction profile, if it has one"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT heuristic, settings FROM provider_extraction_profiles WHERE provider_id = %s",
+        (provider_id,),
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return tuple(row) if row else None
+
+
+class ProviderProfile:
+    """A provider's compiled profile, re-read every PROFILE_REFRESH_SECONDS"""
+
+    def __init__(self, provider_id: Optional[str]):
+        self.provider_id = provider_id
+        self.profile = compile_profile()
+        self.row = None
+        self.checked_at = 0.0
+
+    def refresh(self, conn):
+        if self.provider_id is None or time.monotonic() - self.checked_at < PROFILE_REFRESH_SECONDS:
+            return
+
+        row = fetch_profile(conn, self.provider_id)
+        if row != self.row:
+            try:
+                self.profile = compile_profile(*row) if row else compile_profile()
+                logger.info(f"Loaded extraction profile {self.profile.fingerprint} ({self.profile.heuristic_name}) "
+                            f"for provider {self.provider_id}")
+            except (ValueError, re.error) as e:
+                # A broken profile must not fail the provider's jobs
+                logger.error(f"Invalid extraction profile for provider {self.provider_id}, using defaults: {e}")
+                self.profile = compile_profile()
+            self.row = row
+        self.checked_at = time.monotonic()
+
+
+_providers: Dict[Optional[str], ProviderProfile] = {}
+
+
+def get_extraction_profile(conn, provider_id: Optional[str]) -> ExtractionProfile:
+    """Return this worker process's compiled extraction profile for a provider"""
+    profile = _providers.get(provider_id)
+    if profile is None:
+        profile = _providers[provider_id] = ProviderProfile(provider_id)
+    profile.refresh(conn)
+    return profile.profile
@@ -0,0 +1,107 @@
+"""
+Job Progress
+Throttled progress of running OCR jobs published to a Redis hash
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from connections import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_ENABLED = os.getenv('OCR_PROGRESS_ENABLED', 'true').lower() == 'true'
+
+# Minimum seconds between progress writes for one job
+PROGRESS_INTERVAL_SECONDS = float(os.getenv('OCR_PROGRESS_INTERVAL_SECONDS', '2'))
+
+# Progress hashes expire this long after their last write
+PROGRESS_TTL_SECONDS = int(os.getenv('OCR_PROGRESS_TTL_SECONDS', '86400'))
+
+# Seconds without publishing after a Redis error, so an outage does not slow jobs down
+PROGRESS_BACKOFF_SECONDS = 30
+
+
+def progress_key(ocr_job_id: str) -> str:
+    """Redis hash holding a job's progress (read by /api/ocr/jobs/:id/progress)"""
+    return f"ocr:progress:{ocr_job_id}"
+
+
+class ProgressReporter:
+    """
+    Publishes pages done / total, candidates so far and an ETA for one job
+
+    update() is cheap to call per page: it only writes to Redis when
+    PROGRESS_INTERVAL_SECONDS have passed since the last write. The ETA
+    uses the page rate of the current attempt, so pages resumed from a
+    checkpoint do not inflate it. Redis errors are logged and ignored.
+    """
+
+    def __init__(self, ocr_job_id: str, provider_id: Optional[str] = None):
+        self.key = progress_key(ocr_job_id)
+        self.provider_id = provider_id
+        self.start_page = 0
+        self.started_at = time.time()
+        self.next_publish_at = 0.0
+        self.state: Dict[str, Any] = {'pages_done': 0, 'total_pages': None, 'candidates': 0}
+
+    def resume_from(self, pages_done: int, candidates: int):
+        """Start counting from a checkpoint of an earlier attempt"""
+        self.start_page = pages_done
+        self.state['pages_done'] = pages_done
+        self.state['candidates'] = candidates
+
+    def _publish(self, status: str):
+        now = time.time()
+        self.next_publish_at = time.monotonic() + PROGRESS_INTERVAL_SECONDS
+
+        pages_done = self.state['pages_done']
+        total_pages = self.state['total_pages']
+        eta_seconds = ''
+        done_this_attempt = pages_done - self.start_page
+        if total_pages and done_this_attempt > 0:
+            rate = done_this_attempt / max(now - self.started_at, 1e-6)
+            eta_seconds = round((total_pages - pages_done) / rate, 1)
+
+        try:
+            pipe = get_redis_client().pipeline()
+            pipe.hset(self.key, mapping={
+                'status': status,
+                'pages_done': pages_done,
+                'total_pages': total_pages if total_pages is not None else '',
+                'candidates': self.state['candidates'],
+                'eta_seconds': eta_seconds,
+                'provider_id': self.provider_id or '',
+                'started_at': round(self.started_at, 3),
+                'updated_at': round(now, 3),
+            })
+            pipe.expire(self.key, PROGRESS_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not publish progress for {self.key}: {str(e)}")
+            self.next_publish_at = time.monotonic() + PROGRESS_BACKOFF_SECONDS
+
+    def update(self, pages_done: int, candidates: int, total_pages: Optional[int] = None):
+        """Record progress, publishing it if the throttle interval has passed"""
+        self.state['pages_done'] = pages_done
+        self.state['candidates'] = candidates
+        if total_pages is not None:
+            self.state['total_pages'] = total_pages
+
+        if time.monotonic() >= self.next_publish_at:
+            self._publish('processing')
+
+    def finish(self, status: str):
+        """Publish the final state regardless of the throttle"""
+        if status == 'done' and self.state['total_pages'] is not None:
+            self.state['pages_done'] = self.state['total_pages']
+        self._publish(status)
+
+
+def open_progress_reporter(ocr_job_id: str, provider_id: Optional[str] = None) -> Optional[ProgressReporter]:
+    """Return a reporter for the job, or None when progress reporting is disabled"""
+    if PROGRESS_ENABLED:
+        return ProgressReporter(ocr_job_id, provider_id)
+    return None
@@ -0,0 +1,154 @@
+"""
+Result Cache
+Content-addressed reuse of extracted page text and candidates across uploads
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from heuristics import CANDIDATE_HEURISTIC
+from spool import SPOOL_CHUNK_BYTES, PdfSource
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever page extraction or candidate parsing changes its output
+EXTRACTOR_BASE_VERSION = '6'
+
+
+def extractor_version(heuristic: str) -> str:
+    """Cache version of a heuristic; candidates of other heuristics than 'line' are cached apart"""
+    return EXTRACTOR_BASE_VERSION if heuristic == 'line' else f"{EXTRACTOR_BASE_VERSION}-{heuristic}"
+
+
+EXTRACTOR_VERSION = extractor_version(CANDIDATE_HEURISTIC)
+
+RESULT_CACHE_ENABLED = os.getenv('OCR_RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Cached pages fetched per query while streaming a document
+CACHE_FETCH_SIZE = int(os.getenv('OCR_RESULT_CACHE_FETCH_SIZE', '50'))
+
+
+def document_hash(source: PdfSource) -> str:
+    """Hash the raw PDF bytes, reading spooled files in chunks"""
+    if not isinstance(source, str):
+        return hashlib.sha256(source).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(source, 'rb') as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(SPOOL_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lookup_document(conn, content_hash: str, version: str = EXTRACTOR_VERSION) -> Optional[List[str]]:
+    """Return the page hashes of a previously processed document, if any"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE ocr_document_cache SET last_used_at = NOW()
+        WHERE content_hash = %s AND extractor_version = %s
+        RETURNING page_hashes
+        """,
+        (content_hash, version),
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return list(row[0]) if row else None
+
+
+def find_cached_pages(conn, page_hashes: List[str], version: str = EXTRACTOR_VERSION) -> Set[str]:
+    """Return which of the given page hashes are present in the page cache, marking them used"""
+    if not page_hashes:
+        return set()
+
+    # Stale entries are marked used first, so eviction cannot remove them before
+    # iter_cached_pages reads them. Fresh or locked rows are left alone: the job
+    # holds these row locks until it commits, and concurrent jobs share pages.
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE ocr_page_cache SET last_used_at = NOW()
+        WHERE (page_hash, extractor_version) IN (
+            SELECT page_hash, extractor_version FROM ocr_page_cache
+            WHERE extractor_version = %s AND page_hash = ANY(%s) AND last_used_at < NOW() - INTERVAL '1 hour'
+            FOR UPDATE SKIP LOCKED
+        )
+        """,
+        (version, list(set(page_hashes))),
+    )
+    cursor.execute(
+        "SELECT page_hash FROM ocr_page_cache WHERE extractor_version = %s AND page_hash = ANY(%s)",
+        (version, list(set(page_hashes))),
+    )
+    found = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return found
+
+
+def iter_cached_pages(conn, page_hashes: List[str], page_numbers: List[int],
+                      version: str = EXTRACTOR_VERSION) -> Iterator[Dict[str, Any]]:
+    """Yield cached pages for the given 0-based page numbers, in order"""
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(page_numbers), CACHE_FETCH_SIZE):
+            chunk = page_numbers[start:start + CACHE_FETCH_SIZE]
+            cursor.execute(
+                """
+                SELECT page_hash, text, candidates FROM ocr_page_cache
+                WHERE extractor_version = %s AND page_hash = ANY(%s)
+                """,
+                (version, list({page_hashes[page_num] for page_num in chunk})),
+            )
+            rows = {page_hash: (text, candidates) for page_hash, text, candidates in cursor.fetchall()}
+
+            for page_num in chunk:
+                text, candidates = rows[page_hashes[page_num]]
+                yield {
+                    'page': page_num + 1,
+                    'text': text,
+                    'ocr_text': text,
+                    'images': [],
+                    'page_hash': page_hashes[page_num],
+                    'candidates': candidates,
+                    'cached': True,
+                }
+    finally:
+        cursor.close()
+
+
+def store_pages(conn, entries: List[Tuple[str, str, List[Dict[str, Any]]]], version: str = EXTRACTOR_VERSION):
+    """Add (page_hash, text, candidates) entries to the page cache"""
+    if not entries:
+        return
+
+    cursor = conn.cursor()
+    execute_values(
+        cursor,
+        """
+        INSERT INTO ocr_page_cache (page_hash, extractor_version, text, candidates)
+        VALUES %s
+        ON CONFLICT (page_hash, extractor_version) DO NOTHING
+        """,
+        [(page_hash, version, text, json.dumps(candidates)) for page_hash, text, candidates in entries],
+    )
+    cursor.close()
+
+
+def store_document(conn, content_hash: str, page_hashes: List[str], version: str = EXTRACTOR_VERSION):
+    """Record the page hashes of a processed document"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO ocr_document_cache (content_hash, extractor_version, page_hashes)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (content_hash, extractor_version)
+        DO UPDATE SET page_hashes = EXCLUDED.page_hashes, last_used_at = NOW()
+        """,
+        (content_hash, version, page_hashes),
+    )
+    cursor.close()
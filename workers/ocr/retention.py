@@ -0,0 +1,298 @@
+"""
+Job Retention
+Batched deletion of old OCR jobs and their candidates, optionally archived to MinIO first,
+and eviction of unused result cache entries
+"""
+
+import os
+import gzip
+import time
+import logging
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from psycopg2 import errors
+
+from connections import get_minio_client
+from metrics import RETENTION_ARCHIVED_BYTES, RETENTION_BATCH_LOCK_SECONDS, RETENTION_ROWS
+from page_store import discard_page_text
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs older than this many days are removed
+RETENTION_DAYS = int(os.getenv('OCR_RETENTION_DAYS', '30'))
+
+RETENTION_STATUSES = ('done', 'failed')
+
+# Jobs removed per transaction, together with all of their candidates
+RETENTION_BATCH_SIZE = int(os.getenv('OCR_RETENTION_BATCH_SIZE', '200'))
+
+# Pause between batches so replication and autovacuum keep up
+RETENTION_PAUSE_SECONDS = float(os.getenv('OCR_RETENTION_PAUSE_SECONDS', '0.5'))
+
+# Result cache entries not used for this many days are evicted (0 keeps them)
+RESULT_CACHE_RETENTION_DAYS = int(os.getenv('OCR_RESULT_CACHE_RETENTION_DAYS', '90'))
+
+# No new batch is started after this long; the rest waits for the next run
+RETENTION_MAX_SECONDS = float(os.getenv('OCR_RETENTION_MAX_SECONDS', '3600'))
+
+# A batch gives up rather than queue behind other transactions' locks for longer
+RETENTION_LOCK_TIMEOUT_MS = int(os.getenv('OCR_RETENTION_LOCK_TIMEOUT_MS', '2000'))
+
+# Archive jobs and candidates as gzipped JSON Lines in MinIO before deleting them
+RETENTION_ARCHIVE = os.getenv('OCR_RETENTION_ARCHIVE', 'false').lower() == 'true'
+RETENTION_ARCHIVE_BUCKET = os.getenv('OCR_RETENTION_ARCHIVE_BUCKET', os.getenv('MINIO_BUCKET', 'angebae-media'))
+RETENTION_ARCHIVE_PREFIX = os.getenv('OCR_RETENTION_ARCHIVE_PREFIX', 'ocr-archive/')
+
+# Compressed archive kept in memory before the spool moves to a temp file
+ARCHIVE_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Candidate rows fetched per round trip while archiving
+ARCHIVE_FETCH_SIZE = 2000
+
+
+def select_batch(conn, status: str, cutoff: datetime, after: Optional[Tuple[datetime, str]],
+                 batch_size: int) -> List[Tuple[str, datetime, bool]]:
+    """
+    Next (id, created_at, has_page_text) rows to remove, in (created_at, id) order
+
+    Failed jobs count as having page text: they keep their checkpointed
+    parts for a retry and have no result referencing them.
+
+    Walks idx_ocr_jobs_status_created_at by key range from `after`, so each
+    batch starts where the previous one ended instead of rescanning.
+    """
+    query = """
+        SELECT id::text, created_at, status = 'failed' OR result->>'page_text' IS NOT NULL
+        FROM ocr_jobs
+        WHERE status = %s AND created_at < %s
+    """
+    params = [status, cutoff]
+    if after is not None:
+        query += " AND (created_at, id) > (%s, %s::uuid)"
+        params.extend(after)
+    query += " ORDER BY created_at, id LIMIT %s"
+    params.append(batch_size)
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def archive_batch(conn, job_ids: List[str], key: str) -> int:
+    """Write the jobs and their candidates to one gzipped JSON Lines object; returns its size"""
+    spool = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+    try:
+        with gzip.GzipFile(fileobj=spool, mode='wb', compresslevel=6, mtime=0) as archive:
+            cursor = conn.cursor()
+            cursor.execute("SELECT row_to_json(j)::text FROM ocr_jobs j WHERE id = ANY(%s::uuid[]) ORDER BY created_at, id", (job_ids,))
+            for (row,) in cursor:
+                archive.write(f'{{"table": "ocr_jobs", "row": {row}}}\n'.encode('utf-8'))
+            cursor.close()
+
+            # Streamed with a server-side cursor; a batch can hold many candidates
+            cursor = conn.cursor(name='ocr_retention_archive')
+            cursor.itersize = ARCHIVE_FETCH_SIZE
+            cursor.execute("SELECT row_to_json(c)::text FROM product_candidates c WHERE ocr_job_id = ANY(%s::uuid[])", (job_ids,))
+            for (row,) in cursor:
+                archive.write(f'{{"table": "product_candidates", "row": {row}}}\n'.encode('utf-8'))
+            cursor.close()
+
+        size = spool.tell()
+        spool.seek(0)
+        get_minio_client().put_object(
+            RETENTION_ARCHIVE_BUCKET,
+            key,
+            spool,
+            size,
+            content_type='application/gzip',
+        )
+    finally:
+        spool.close()
+
+    RETENTION_ARCHIVED_BYTES.inc(size)
+    return size
+
+
+def delete_batch(conn, job_ids: List[str], cutoff: datetime) -> Optional[Tuple[List[str], int, float]]:
+    """
+    Delete the jobs and their candidates in one short transaction
+
+    Status and age are re-checked by the delete itself, and only the jobs it
+    removed lose their candidates, so a job retried since it was selected is
+    kept whole. Returns (ids of the deleted jobs, candidates, seconds the
+    transaction held locks), or None when the lock timeout was hit and the
+    batch was left for the next run.
+    """
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    try:
+        cursor.execute("SET LOCAL lock_timeout = %s", (f"{RETENTION_LOCK_TIMEOUT_MS}ms",))
+        cursor.execute(
+            """
+            WITH deleted_jobs AS (
+                DELETE FROM ocr_jobs
+                WHERE id = ANY(%s::uuid[]) AND status IN %s AND created_at < %s
+                RETURNING id
+            ), deleted_candidates AS (
+                DELETE FROM product_candidates
+                WHERE ocr_job_id IN (SELECT id FROM deleted_jobs)
+                RETURNING 1
+            )
+            SELECT id::text, (SELECT COUNT(*) FROM deleted_candidates) FROM deleted_jobs
+            """,
+            (job_ids, RETENTION_STATUSES, cutoff),
+        )
+        rows = cursor.fetchall()
+        conn.commit()
+    except errors.LockNotAvailable:
+        conn.rollback()
+        logger.warning(f"Retention batch of {len(job_ids)} jobs hit the lock timeout, skipped")
+        return None
+    finally:
+        cursor.close()
+
+    deleted_ids = [row[0] for row in rows]
+    candidates = rows[0][1] if rows else 0
+    lock_seconds = time.perf_counter() - started
+    RETENTION_BATCH_LOCK_SECONDS.observe(lock_seconds)
+    RETENTION_ROWS.labels('product_candidates').inc(candidates)
+    RETENTION_ROWS.labels('ocr_jobs').inc(len(deleted_ids))
+    return deleted_ids, candidates, lock_seconds
+
+
+def evict_cache_batch(conn, table: str, key_columns: str, cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete up to batch_size entries of a result cache table last used before cutoff
+
+    Rows locked by a job that is marking them used are skipped rather than waited for.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            DELETE FROM {table} WHERE ({key_columns}) IN (
+                SELECT {key_columns} FROM {table}
+                WHERE last_used_at < %s
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            """,
+            (cutoff, batch_size),
+        )
+        deleted = cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+
+    RETENTION_ROWS.labels(table).inc(deleted)
+    return deleted
+
+
+def purge_old_jobs(conn, days: int = None, archive: bool = None, batch_size: int = None,
+                   pause_seconds: float = None, max_seconds: float = None,
+                   cache_days: int = None) -> Dict[str, Any]:
+    """
+    Remove finished jobs older than `days` in bounded batches
+
+    Every batch is archived first when archive is on (a failed upload stops
+    the run before anything unarchived is deleted), then deleted in its own
+    transaction, then its page text is removed from MinIO. Result cache
+    entries unused for `cache_days` are evicted afterwards, documents first.
+    """
+    days = RETENTION_DAYS if days is None else days
+    archive = RETENTION_ARCHIVE if archive is None else archive
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    pause_seconds = RETENTION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    max_seconds = max_seconds or RETENTION_MAX_SECONDS
+    cache_days = RESULT_CACHE_RETENTION_DAYS if cache_days is None else cache_days
+
+    started = time.perf_counter()
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    stats = {
+        'jobs_deleted': 0,
+        'candidates_deleted': 0,
+        'batches': 0,
+        'skipped_batches': 0,
+        'archived_objects': 0,
+        'archived_bytes': 0,
+        'cache_documents_deleted': 0,
+        'cache_pages_deleted': 0,
+        'lock_seconds_total': 0.0,
+        'lock_seconds_max': 0.0,
+        'complete': True,
+    }
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT (NOW() - %s * INTERVAL '1 day')::timestamp, NOW() - %s * INTERVAL '1 day'", (days, cache_days))
+    cutoff, cache_cutoff = cursor.fetchone()
+    cursor.close()
+    conn.commit()
+
+    for status in RETENTION_STATUSES:
+        after = None
+        while True:
+            if time.perf_counter() - started > max_seconds:
+                stats['complete'] = False
+                break
+
+            rows = select_batch(conn, status, cutoff, after, batch_size)
+            if not rows:
+                conn.commit()
+                break
+            after = (rows[-1][1], rows[-1][0])
+            job_ids = [row[0] for row in rows]
+
+            if archive:
+                key = f"{RETENTION_ARCHIVE_PREFIX}{run_id}/{stats['batches']:05d}.jsonl.gz"
+                stats['archived_bytes'] += archive_batch(conn, job_ids, key)
+                stats['archived_objects'] += 1
+            # Ends the read transaction so no snapshot is held across the pause
+            conn.commit()
+
+            deleted = delete_batch(conn, job_ids, cutoff)
+            stats['batches'] += 1
+            if deleted is None:
+                stats['skipped_batches'] += 1
+            else:
+                deleted_ids, candidates, lock_seconds = deleted
+                stats['jobs_deleted'] += len(deleted_ids)
+                stats['candidates_deleted'] += candidates
+                stats['lock_seconds_total'] += lock_seconds
+                stats['lock_seconds_max'] = max(stats['lock_seconds_max'], lock_seconds)
+
+                # Jobs the delete kept (retried meanwhile) keep their page text too
+                deleted_ids = set(deleted_ids)
+                for job_id, _, has_page_text in rows:
+                    if has_page_text and job_id in deleted_ids:
+                        discard_page_text(job_id)
+
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause_seconds)
+
+    if cache_days > 0:
+        for table, key_columns, stat in (
+            ('ocr_document_cache', 'content_hash, extractor_version', 'cache_documents_deleted'),
+            ('ocr_page_cache', 'page_hash, extractor_version', 'cache_pages_deleted'),
+        ):
+            while True:
+                if time.perf_counter() - started > max_seconds:
+                    stats['complete'] = False
+                    break
+                deleted = evict_cache_batch(conn, table, key_columns, cache_cutoff, batch_size)
+                stats[stat] += deleted
+                if deleted < batch_size:
+                    break
+                time.sleep(pause_seconds)
+
+    seconds = time.perf_counter() - started
+    rows_deleted = stats['jobs_deleted'] + stats['candidates_deleted']
+    stats['seconds'] = round(seconds, 3)
+    stats['rows_per_sec'] = round(rows_deleted / seconds, 1) if seconds else None
+    stats['lock_seconds_total'] = round(stats['lock_seconds_total'], 3)
+    stats['lock_seconds_max'] = round(stats['lock_seconds_max'], 3)
+    return stats
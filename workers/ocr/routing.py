@@ -0,0 +1,39 @@
+"""
+Job Routing
+Size-aware queue selection for OCR tasks, applied when a task is sent
+"""
+
+import os
+from typing import Dict, Any, Optional
+
+SMALL_QUEUE = 'ocr-small'
+LARGE_QUEUE = 'ocr-large'
+
+# Jobs up to both limits go to the small queue; unknown sizes count as small
+SMALL_JOB_MAX_BYTES = int(os.getenv('OCR_SMALL_JOB_MAX_BYTES', str(5 * 1024 * 1024)))
+SMALL_JOB_MAX_PAGES = int(os.getenv('OCR_SMALL_JOB_MAX_PAGES', '40'))
+
+
+def classify_job(file_size: Optional[int] = None, page_count: Optional[int] = None) -> str:
+    """Return 'small' or 'large' for a document of the given byte size and page count"""
+    if file_size is not None and file_size > SMALL_JOB_MAX_BYTES:
+        return 'large'
+    if page_count is not None and page_count > SMALL_JOB_MAX_PAGES:
+        return 'large'
+    return 'small'
+
+
+def route_ocr_task(name: str, args, kwargs: Dict[str, Any], options: Dict[str, Any], task=None, **kw):
+    """
+    Celery router: send each OCR job to the queue for its size class
+
+    process_ocr_job is classified from its file_size / expected_pages keyword
+    arguments; batches always go to the large queue. Other tasks fall
+    through to the remaining routes.
+    """
+    if name == 'tasks.process_ocr_job':
+        size_class = classify_job(kwargs.get('file_size'), kwargs.get('expected_pages'))
+        return {'queue': LARGE_QUEUE if size_class == 'large' else SMALL_QUEUE}
+    if name == 'tasks.process_ocr_batch':
+        return {'queue': LARGE_QUEUE}
+    return None
@@ -0,0 +1,151 @@
+"""
+Candidate Scanner
+Precompiled scanning of catalog text for prices, SKUs and product indicators,
+shared by the OCR worker and scripts/pdf_processor.py
+"""
+
+import re
+from typing import Dict, List, Any, Iterable
+
+# Line-based heuristic used by the OCR worker. These are the original
+# r'\$?\s*(\d+[.,]\d{2})' and r'\b([A-Z]{2,}\d{2,}|[A-Z0-9]{4,})\b' with the parts
+# that never change the captured group removed: the optional '$ ' prefix can
+# only precede the leftmost digits anyway, and every match of the first SKU
+# branch is also a match of the second with the same span.
+LINE_PRICE_PATTERN = r'(\d+[.,]\d{2})'
+LINE_SKU_PATTERN = r'\b([A-Z0-9]{4,})\b'
+
+PRICE_CONFIDENCE = 0.5
+SKU_CONFIDENCE = 0.3
+LENGTH_CONFIDENCE = 0.2
+CONFIDENCE_THRESHOLD = 0.3
+
+
+def parse_amount(amount: str, decimal_separator: str = ',') -> float:
+    """Convert a matched price, e.g. '1.500,00', whose other separator groups thousands"""
+    thousands_separator = '.' if decimal_separator == ',' else ','
+    return float(amount.replace(thousands_separator, '').replace(decimal_separator, '.'))
+
+
+class LineCandidateScanner:
+    """
+    Finds product candidates line by line in a page of text
+
+    Each pattern is run once over the whole page with finditer and its
+    matches are bucketed by line, instead of two re.search calls per line.
+    A line can only pass the confidence threshold with a price or a SKU
+    match, so lines without either are never looked at.
+
+    Without a decimal_separator either ',' or '.' is read as the decimal
+    point, which suits the default pattern's single separator.
+    """
+
+    def __init__(self, price_pattern: str = LINE_PRICE_PATTERN, sku_pattern: str = LINE_SKU_PATTERN,
+                 min_line_length: int = 5, title_length: tuple = (10, 200),
+                 confidence_threshold: float = CONFIDENCE_THRESHOLD, decimal_separator: str = None):
+        self.price_re = re.compile(price_pattern)
+        self.sku_re = re.compile(sku_pattern)
+        self.min_line_length = min_line_length
+        self.title_length = title_length
+        self.confidence_threshold = confidence_threshold
+        self.decimal_separator = decimal_separator
+
+    def parse_price(self, amount: str) -> float:
+        if self.decimal_separator is None:
+            return float(amount.replace(',', '.'))
+        return parse_amount(amount, self.decimal_separator)
+
+    def _first_match_per_line(self, pattern: re.Pattern, text: str, lines: Dict[int, list], slot: int):
+        """Record the first match of `pattern` on every line that has one"""
+        for match in pattern.finditer(text):
+            line_start = text.rfind('\n', 0, match.start(1)) + 1
+            entry = lines.get(line_start)
+            if entry is None:
+                entry = lines[line_start] = [None, None]
+            if entry[slot] is None:
+                entry[slot] = match
+
+    def scan(self, text: str) -> List[Dict[str, Any]]:
+        """Extract product candidates from a page of text"""
+        lines = {}
+        self._first_match_per_line(self.price_re, text, lines, 0)
+        self._first_match_per_line(self.sku_re, text, lines, 1)
+
+        min_title, max_title = self.title_length
+        candidates = []
+
+        for line_start in sorted(lines):
+            line_end = text.find('\n', line_start)
+            line = text[line_start:line_end if line_end != -1 else len(text)].strip()
+            if len(line) < self.min_line_length:
+                continue
+
+            price_match, sku_match = lines[line_start]
+            confidence = 0.0
+            extracted_data = {
+                'title': line,
+                'price': None,
+                'sku': None,
+                'raw_line': line,
+            }
+
+            if price_match:
+                try:
+                    extracted_data['price'] = self.parse_price(price_match.group(1))
+                    confidence += PRICE_CONFIDENCE
+                except ValueError:
+                    pass
+
+            if sku_match:
+                extracted_data['sku'] = sku_match.group(1)
+                confidence += SKU_CONFIDENCE
+
+            if min_title < len(line) < max_title:  # Reasonable product name length
+                confidence += LENGTH_CONFIDENCE
+
+            if confidence > self.confidence_threshold:
+                extracted_data['confidence'] = min(confidence, 1.0)
+                candidates.append(extracted_data)
+
+        return candidates
+
+
+class SectionScanner:
+    """
+    Price and product-indicator matching for section-based extraction
+
+    Price patterns keep their priority order (the first pattern that matches
+    anywhere wins). A combined alternation of every pattern first rejects, in
+    one pass, the sections that none of them can match.
+    """
+
+    def __init__(self, price_patterns: List[str], product_indicators: Iterable[str], decimal_separator: str = ','):
+        self.decimal_separator = decimal_separator
+        self.price_res = [re.compile(pattern, re.IGNORECASE) for pattern in price_patterns]
+        self.price_trigger_re = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in price_patterns),
+            re.IGNORECASE,
+        )
+        indicators = sorted(set(product_indicators), key=len, reverse=True)
+        self.indicator_re = re.compile('|'.join(re.escape(indicator) for indicator in indicators)) if indicators else None
+
+    def extract_price(self, text: str) -> float:
+        """Return the price found by the highest priority pattern, or 0.0"""
+        if not self.price_trigger_re.search(text):
+            return 0.0
+
+        for pattern in self.price_res:
+            match = pattern.search(text)
+            if match:
+                try:
+                    return parse_amount(match.group(1), self.decimal_separator)
+                except ValueError:
+                    continue
+        return 0.0
+
+    def has_product_indicator(self, text: str) -> bool:
+        """Whether the lowercased text contains any product indicator"""
+        return bool(self.indicator_re and self.indicator_re.search(text.lower()))
+
+
+line_scanner = LineCandidateScanner()
@@ -0,0 +1,92 @@
+"""
+Document Spool
+Large downloads streamed to scratch files that PyMuPDF opens by path
+"""
+
+import os
+import logging
+import tempfile
+import weakref
+from typing import Iterable, Union
+
+logger = logging.getLogger(__name__)
+
+# Objects at least this large are spooled to disk instead of held in memory (0 disables)
+SPOOL_THRESHOLD_BYTES = int(os.getenv('OCR_SPOOL_THRESHOLD_BYTES', str(32 * 1024 * 1024)))
+
+# Scratch directory for spool files, e.g. a tmpfs mount; defaults to the system temp dir
+SPOOL_DIR = os.getenv('OCR_SPOOL_DIR') or None
+
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledPdf:
+    """
+    A downloaded PDF living in a scratch file
+
+    The file is removed by close(), when the object is garbage collected,
+    or at interpreter exit, whichever comes first.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._finalizer = weakref.finalize(self, _unlink, path)
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# What the extractor accepts: raw bytes or the path of a spooled file
+PdfSource = Union[bytes, str]
+
+Download = Union[bytes, SpooledPdf]
+
+
+def should_spool(size: int) -> bool:
+    return SPOOL_THRESHOLD_BYTES > 0 and size is not None and size >= SPOOL_THRESHOLD_BYTES
+
+
+def spool_chunks(chunks: Iterable[bytes]) -> SpooledPdf:
+    """Write chunks to a new spool file, removing it again if writing fails"""
+    fd, path = tempfile.mkstemp(prefix='ocr-', suffix='.pdf', dir=SPOOL_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as spool_file:
+            for chunk in chunks:
+                spool_file.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        _unlink(path)
+        raise
+
+    return SpooledPdf(path, size)
+
+
+def pdf_source(download: Download) -> PdfSource:
+    """The bytes or path to hand to the extractor"""
+    return download.path if isinstance(download, SpooledPdf) else download
+
+
+def download_size(download: Download) -> int:
+    """Size in bytes of a download, spooled or not"""
+    return download.size if isinstance(download, SpooledPdf) else len(download)
+
+
+def release_download(download: Download):
+    """Remove a download's spool file, if it has one"""
+    if isinstance(download, SpooledPdf):
+        download.close()
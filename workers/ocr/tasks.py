@@ -4,44 +4,101 @@ Celery tasks for processing PDFs with OCR and extracting product information
 """
 
 import os
-import re
+import time
+import heapq
 import logging
-import tempfile
-from io import BytesIO
+from io import StringIO
 
-import fitz  # PyMuPDF
-from PIL import Image
 from celery import Celery, Task
-from minio import Minio
-from minio.error import S3Error
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import requests
+from celery.exceptions import Retry
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 import json
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, Tuple
+
+from connections import (
+    acquire_db_connection,
+    close_db_pool,
+    get_minio_client,
+    get_pool_stats,
+    init_db_pool,
+    release_db_connection,
+)
+from extraction import (
+    compute_page_hashes,
+    extract_pages,
+    iter_pages,
+    page_count,
+    set_worker_concurrency,
+    shutdown_executor,
+)
+from ocr_engine import shutdown_ocr_executor
+from matching import CatalogMatchIndex, get_match_index
+from heuristics import candidate_heuristic, categorize, page_text
+from keywords import KeywordMatcher, compile_keywords, get_keyword_matcher
+from page_classifier import PAGE_CLASSIFIER_ENABLED, PAGE_LOW, PAGE_SKIP
+from profiles import ExtractionProfile, compile_profile, get_extraction_profile
+from page_store import discard_page_text, open_page_text_writer, page_text_ref
+from progress import ProgressReporter, open_progress_reporter
+from metrics import ADMISSION_DEFERRALS, JobMetrics, mark_process_dead, start_metrics_server
+from retention import purge_old_jobs
+from checkpoints import CHECKPOINT_PAGES, clear_candidates_after, new_checkpoint, save_checkpoint
+from prefetch import PREFETCH_BUDGET_BYTES, ObjectPrefetcher
+from admission import (
+    ADMISSION_ENABLED,
+    ADMISSION_RETRY_SECONDS,
+    estimate_batch_memory,
+    estimate_job_memory,
+    get_memory_budget,
+)
+from spool import (
+    SPOOL_CHUNK_BYTES,
+    SPOOL_THRESHOLD_BYTES,
+    Download,
+    PdfSource,
+    download_size,
+    pdf_source,
+    release_download,
+    spool_chunks,
+)
+from result_cache import (
+    CACHE_FETCH_SIZE,
+    EXTRACTOR_VERSION,
+    RESULT_CACHE_ENABLED,
+    document_hash,
+    find_cached_pages,
+    iter_cached_pages,
+    lookup_document,
+    store_document,
+    store_pages,
+)
 
 # Load environment variables
 load_dotenv()
 
+# Candidates buffered in memory before being written to product_candidates
+CANDIDATE_FLUSH_SIZE = int(os.getenv('OCR_CANDIDATE_FLUSH_SIZE', '1000'))
+
+# Candidate write path: 'copy' (COPY FROM STDIN), 'values' (execute_values) or 'row'
+CANDIDATE_WRITE_MODE = os.getenv('OCR_CANDIDATE_WRITE_MODE', 'copy')
+
+# Suggest resolved_product_id for candidates from the provider's existing catalog
+CATALOG_MATCHING_ENABLED = os.getenv('OCR_CATALOG_MATCHING_ENABLED', 'true').lower() == 'true'
+
+# Downloads running at once in process_ocr_batch (bytes held ahead are capped by OCR_PREFETCH_BUDGET_BYTES)
+BATCH_DOWNLOAD_CONCURRENCY = int(os.getenv('OCR_BATCH_DOWNLOAD_CONCURRENCY', '4'))
+
+# Finished batch jobs whose statuses are written (and committed) together
+BATCH_STATUS_FLUSH_SIZE = int(os.getenv('OCR_BATCH_STATUS_FLUSH_SIZE', '20'))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Celery
-app = Celery(
-    'ocr_worker',
-    broker=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
-    backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/1'),
-)
-
-app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
-    timezone='UTC',
-    enable_utc=True,
-)
+# Initialize Celery (broker, serialization, queues and routes live in celery_config)
+app = Celery('ocr_worker')
+app.config_from_object('celery_config')
 
 
 class DatabaseContextTask(Task):
@@ -53,116 +110,142 @@ class DatabaseContextTask(Task):
             return super().__call__(*args, **kwargs)
         finally:
             if self.db_conn:
-                self.db_conn.close()
+                release_db_connection(self.db_conn)
+                self.db_conn = None
     
     def get_db_connection(self):
         if not self.db_conn:
-            self.db_conn = psycopg2.connect(
-                dsn=os.getenv('DATABASE_URL')
-            )
+            # Borrowed from the worker-process pool and returned after the task
+            self.db_conn = acquire_db_connection()
         return self.db_conn
 
 
 app.Task = DatabaseContextTask
 
 
-def get_minio_client() -> Minio:
-    """Initialize MinIO client"""
-    return Minio(
-        endpoint=os.getenv('MINIO_ENDPOINT', 'minio:9000').replace('http://', '').replace('https://', ''),
-        access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
-        secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin'),
-        secure=False,
-    )
+@worker_init.connect
+def init_worker_metrics(**kwargs):
+    """Serve the worker's /metrics endpoint from the main process"""
+    start_metrics_server()
+
+
+@worker_init.connect
+def size_extraction_pool(sender=None, **kwargs):
+    """Divide the CPUs between the extraction pools of the worker's prefork processes"""
+    set_worker_concurrency(getattr(sender, 'concurrency', None) or 1)
+
 
+@worker_process_init.connect
+def init_worker_connections(**kwargs):
+    """Open this worker process's Postgres pool after fork"""
+    init_db_pool()
 
-def download_file_from_minio(bucket: str, object_name: str) -> bytes:
-    """Download file from MinIO"""
+
+@worker_process_shutdown.connect
+def shutdown_extraction_pool(**kwargs):
+    """Stop the page extraction and OCR pools and close pooled connections"""
+    shutdown_executor()
+    shutdown_ocr_executor()
+    logger.info(f"Postgres pool stats: {get_pool_stats()}")
+    close_db_pool()
+    mark_process_dead()
+
+
+def download_file_from_minio(bucket: str, object_name: str, spool_threshold: int = None) -> Download:
+    """
+    Download file from MinIO
+    
+    Objects of at least spool_threshold bytes (OCR_SPOOL_THRESHOLD_BYTES by
+    default) are streamed in chunks to a spool file and returned as a
+    SpooledPdf; smaller ones are returned as bytes.
+    """
     client = get_minio_client()
     response = client.get_object(bucket, object_name)
-    data = response.read()
-    response.close()
-    return data
+    try:
+        size = int(response.headers.get('Content-Length') or 0)
+        threshold = SPOOL_THRESHOLD_BYTES if spool_threshold is None else spool_threshold
+        if threshold > 0 and size >= threshold:
+            logger.info(f"Spooling {object_name} ({size} bytes) to disk")
+            return spool_chunks(response.stream(SPOOL_CHUNK_BYTES))
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
 
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+def extract_text_from_pdf(source: PdfSource) -> List[Dict[str, Any]]:
     """Extract text from PDF using PyMuPDF and OCR"""
-    pages_data = []
-    
     try:
-        # Open PDF from bytes
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_data = {
-                'page': page_num + 1,
-                'text': '',
-                'ocr_text': '',
-                'images': [],
-            }
-            
-            # Extract text directly from PDF using PyMuPDF
-            text = page.get_text()
-            page_data['text'] = text
-            page_data['ocr_text'] = text  # Use extracted text as OCR result
-            
-            pages_data.append(page_data)
-        
-        doc.close()
-        return pages_data
+        # Large documents are split into page ranges and extracted on a process pool
+        return extract_pages(source)
     
     except Exception as e:
         logger.error(f"PDF extraction error: {str(e)}")
         raise
 
 
-def extract_product_info(text: str) -> List[Dict[str, Any]]:
-    """Extract product information from OCR text using regex and heuristics"""
-    candidates = []
-    
-    # Split text into lines
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line or len(line) < 5:
-            continue
-        
-        # Look for patterns that might indicate product info
-        # Pattern 1: Lines with $ (price indicator)
-        price_match = re.search(r'\$?\s*(\d+[.,]\d{2})', line)
-        
-        # Pattern 2: SKU/product codes (alphanumeric combinations)
-        sku_match = re.search(r'\b([A-Z]{2,}\d{2,}|[A-Z0-9]{4,})\b', line)
-        
-        confidence = 0.0
-        extracted_data = {
-            'title': line,
-            'price': None,
-            'sku': None,
-            'raw_line': line,
-        }
-        
-        if price_match:
-            try:
-                price_str = price_match.group(1).replace(',', '.')
-                extracted_data['price'] = float(price_str)
-                confidence += 0.5
-            except:
-                pass
-        
-        if sku_match:
-            extracted_data['sku'] = sku_match.group(1)
-            confidence += 0.3
-        
-        if len(line) > 10 and len(line) < 200:  # Reasonable product name length
-            confidence += 0.2
-        
-        if confidence > 0.3:  # Only include if confidence is above threshold
-            extracted_data['confidence'] = min(confidence, 1.0)
-            candidates.append(extracted_data)
+def iter_page_candidates(pages: Iterable[Dict[str, Any]], metrics: JobMetrics = None, keywords: KeywordMatcher = None,
+                         profile: ExtractionProfile = None) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Yield each page together with the product candidates parsed from it
     
+    With the page classifier on, each page's decision is recorded under
+    'classification' first: skipped pages are never parsed and yield no
+    candidates, low-scoring pages yield down-weighted copies. page['parsed']
+    keeps what the result cache stores, the heuristic's own candidates or
+    None for a page that was not parsed. Candidates are categorized with
+    keywords if given.
+    """
+    classifier = (profile or compile_profile()).page_classifier if PAGE_CLASSIFIER_ENABLED else None
+    indicators = keywords or compile_keywords()
+    for page in pages:
+        decision = classifier.classify(page_text(page), indicators) if classifier else None
+        if decision:
+            page['classification'] = decision
+            if metrics:
+                metrics.page_classified(decision['class'])
+        
+        if decision and decision['class'] == PAGE_SKIP:
+            parsed = page.get('candidates')
+            candidates = []
+            page.pop('layout', None)
+        elif page.get('candidates') is not None:
+            # Reused from the result cache, which is shared by all providers
+            parsed = candidates = page['candidates']
+            if keywords:
+                categorize(candidates, keywords)
+        else:
+            # New pages, and cached pages that were skipped when they were cached
+            if metrics:
+                with metrics.time('parse_candidates'):
+                    parsed = candidates = extract_page_candidates(page, keywords, profile)
+            else:
+                parsed = candidates = extract_page_candidates(page, keywords, profile)
+        
+        if decision and decision['class'] == PAGE_LOW:
+            candidates = classifier.down_weight(candidates)
+        page['parsed'] = parsed
+        for position, candidate in enumerate(candidates):
+            # (page, position) identifies the candidate across retries
+            candidate['page'] = page['page']
+            candidate['position'] = position
+        yield page, candidates
+
+
+def extract_product_info(text: str, profile: ExtractionProfile = None) -> List[Dict[str, Any]]:
+    """Extract product information from OCR text using regex and heuristics"""
+    # Chosen by the provider's profile or OCR_CANDIDATE_HEURISTIC; without positions 'layout' parses like 'line'
+    heuristic = profile.heuristic if profile else candidate_heuristic
+    return heuristic.parse(text)
+
+
+def extract_page_candidates(page: Dict[str, Any], keywords: KeywordMatcher = None,
+                            profile: ExtractionProfile = None) -> List[Dict[str, Any]]:
+    """Extract product candidates from an extracted page, using its text positions when it has them"""
+    heuristic = profile.heuristic if profile else candidate_heuristic
+    candidates = heuristic.parse_page(page, keywords)
+    # Positions are only needed for parsing; drop them before the page moves on
+    page.pop('layout', None)
     return candidates
 
 
@@ -170,61 +253,358 @@ def update_ocr_job_status(conn, job_id: str, status: str, result: dict = None, e
     """Update OCR job status in database"""
     cursor = conn.cursor()
     
-    update_data = {
-        'status': status,
-        'updated_at': 'NOW()',
-    }
+    set_clauses = ['status = %s', 'updated_at = NOW()']
+    values = [status]
     
     if status == 'done':
-        update_data['completed_at'] = 'NOW()'
-    
-    set_clause = ', '.join([f"{k} = {v if v == 'NOW()' else '%s'}" for k, v in update_data.items()])
-    
-    query = f"UPDATE ocr_jobs SET {set_clause} WHERE id = %s"
-    values = [v for v in update_data.values() if v != 'NOW()'] + [job_id]
+        # The result now holds everything the checkpoint did
+        set_clauses.append('completed_at = NOW()')
+        set_clauses.append('checkpoint = NULL')
     
     if result:
-        query = query.replace('WHERE', 'SET result = %s WHERE')
-        values.insert(list(update_data.values()).index('NOW()'), json.dumps(result))
+        set_clauses.append('result = %s')
+        values.append(json.dumps(result))
     
     if error:
-        query = query.replace('WHERE', 'SET error_message = %s WHERE')
-        values.insert(0, error)
+        set_clauses.append('error_message = %s')
+        values.append(error)
+    
+    query = f"UPDATE ocr_jobs SET {', '.join(set_clauses)} WHERE id = %s"
+    values.append(job_id)
     
     cursor.execute(query, values)
     conn.commit()
     cursor.close()
 
 
-def insert_product_candidates(conn, ocr_job_id: str, candidates: List[Dict], provider_id: str = None):
-    """Insert product candidates into database"""
-    cursor = conn.cursor()
+def update_ocr_job_statuses(conn, updates: List[Tuple[str, str, dict, str]]):
+    """Update many OCR jobs at once from (job_id, status, result, error) tuples"""
+    if not updates:
+        return
     
-    for candidate in candidates:
-        query = """
-            INSERT INTO product_candidates 
-            (id, ocr_job_id, raw_json, confidence, extracted_title, extracted_price, extracted_sku, provider_id)
-            VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s)
+    cursor = conn.cursor()
+    execute_values(
+        cursor,
         """
-        
-        values = (
-            ocr_job_id,
-            json.dumps(candidate),
-            candidate.get('confidence', 0),
-            candidate.get('title', ''),
-            candidate.get('price'),
-            candidate.get('sku'),
-            provider_id,
-        )
-        
-        cursor.execute(query, values)
-    
+        UPDATE ocr_jobs AS j SET
+            status = v.status,
+            result = COALESCE(v.result::jsonb, j.result),
+            error_message = COALESCE(v.error, j.error_message),
+            completed_at = CASE WHEN v.status = 'done' THEN NOW() ELSE j.completed_at END,
+            checkpoint = CASE WHEN v.status = 'done' THEN NULL ELSE j.checkpoint END,
+            updated_at = NOW()
+        FROM (VALUES %s) AS v(id, status, result, error)
+        WHERE j.id = v.id::uuid
+        """,
+        [
+            (job_id, status, json.dumps(result) if result else None, error)
+            for job_id, status, result, error in updates
+        ],
+    )
     conn.commit()
     cursor.close()
 
 
+def load_batch_jobs(conn, jobs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Resolve provider and MinIO key for (media_id, ocr_job_id) pairs in one query, keeping their order"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(
+        """
+        SELECT pairs.media_id::text AS media_id,
+               pairs.ocr_job_id::text AS ocr_job_id,
+               j.provider_id::text AS provider_id,
+               m.minio_key,
+               m.file_size
+        FROM unnest(%s::uuid[], %s::uuid[]) WITH ORDINALITY AS pairs(media_id, ocr_job_id, position)
+        LEFT JOIN ocr_jobs j ON j.id = pairs.ocr_job_id
+        LEFT JOIN media m ON m.id = pairs.media_id
+        ORDER BY pairs.position
+        """,
+        ([media_id for media_id, _ in jobs], [ocr_job_id for _, ocr_job_id in jobs]),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+CANDIDATE_COLUMNS = (
+    'ocr_job_id', 'raw_json', 'confidence', 'extracted_title',
+    'extracted_price', 'extracted_sku', 'provider_id',
+    'resolved_product_id', 'match_score', 'page_number', 'page_position',
+)
+
+
+def candidate_row(ocr_job_id: str, candidate: Dict, provider_id: str = None, match_index: CatalogMatchIndex = None) -> tuple:
+    """Build the product_candidates column values for one candidate"""
+    # Suggested catalog product; `resolved` stays false until someone confirms it
+    match = match_index.match(candidate) if match_index else None
+    
+    return (
+        ocr_job_id,
+        json.dumps(candidate),
+        candidate.get('confidence', 0),
+        candidate.get('title', ''),
+        candidate.get('price'),
+        candidate.get('sku'),
+        provider_id,
+        match[0] if match else None,
+        match[1] if match else None,
+        candidate.get('page'),
+        candidate.get('position'),
+    )
+
+
+def _copy_text_value(value) -> str:
+    """Encode a value for COPY ... FROM STDIN text format"""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_candidate_rows(cursor, rows: List[tuple]):
+    """Stream rows into product_candidates with COPY FROM STDIN"""
+    buffer = StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_text_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    
+    cursor.copy_expert(
+        f"COPY product_candidates ({', '.join(CANDIDATE_COLUMNS)}) FROM STDIN",
+        buffer,
+    )
+
+
+def insert_candidate_rows(cursor, rows: List[tuple]):
+    """Insert rows into product_candidates with multi-row VALUES statements"""
+    execute_values(
+        cursor,
+        f"INSERT INTO product_candidates ({', '.join(CANDIDATE_COLUMNS)}) VALUES %s ON CONFLICT DO NOTHING",
+        rows,
+        page_size=CANDIDATE_FLUSH_SIZE,
+    )
+
+
+def insert_candidate_rows_one_by_one(cursor, rows: List[tuple]):
+    """Insert rows into product_candidates with one INSERT per row"""
+    query = f"""
+        INSERT INTO product_candidates ({', '.join(CANDIDATE_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(CANDIDATE_COLUMNS))})
+        ON CONFLICT DO NOTHING
+    """
+    for row in rows:
+        cursor.execute(query, row)
+
+
+CANDIDATE_WRITERS = {
+    'copy': copy_candidate_rows,
+    'values': insert_candidate_rows,
+    'row': insert_candidate_rows_one_by_one,
+}
+
+
+def insert_product_candidates(conn, ocr_job_id: str, candidates: List[Dict], provider_id: str = None, commit: bool = True, mode: str = None, match_index: CatalogMatchIndex = None):
+    """
+    Insert product candidates into database
+    
+    mode selects the write path ('copy', 'values' or 'row') and defaults to
+    OCR_CANDIDATE_WRITE_MODE. Candidates are written in batches of
+    CANDIDATE_FLUSH_SIZE. With a match_index, each candidate also gets a
+    suggested resolved_product_id and match_score.
+    
+    'values' and 'row' skip candidates the job already wrote for the same
+    (page, position); COPY cannot, and relies on the pipeline clearing
+    rows past the checkpoint before it resumes.
+    """
+    writer = CANDIDATE_WRITERS[mode or CANDIDATE_WRITE_MODE]
+    cursor = conn.cursor()
+    
+    for start in range(0, len(candidates), CANDIDATE_FLUSH_SIZE):
+        batch = candidates[start:start + CANDIDATE_FLUSH_SIZE]
+        writer(cursor, [candidate_row(ocr_job_id, candidate, provider_id, match_index) for candidate in batch])
+    
+    if commit:
+        conn.commit()
+    cursor.close()
+
+
+def iter_job_pages(conn, source: PdfSource, stats: Dict[str, Any], content_hash: str, start_page: int = 0,
+                   layout: bool = candidate_heuristic.needs_layout, version: str = EXTRACTOR_VERSION) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a document's pages in order, reusing cached pages where possible
+    
+    A known document hash gives the page hashes without opening the PDF;
+    otherwise they are computed from the page content streams. Only pages
+    missing from the page cache (under the given cache version) are
+    extracted. Pages before start_page (0-based) are skipped.
+    """
+    if not RESULT_CACHE_ENABLED:
+        stats['total_pages'] = page_count(source)
+        yield from iter_pages(source, list(range(start_page, stats['total_pages'])), layout=layout)
+        return
+    
+    page_hashes = lookup_document(conn, content_hash, version) or compute_page_hashes(source)
+    stats['total_pages'] = len(page_hashes)
+    cached = find_cached_pages(conn, page_hashes, version)
+    
+    remaining = range(start_page, len(page_hashes))
+    reused = [page_num for page_num in remaining if page_hashes[page_num] in cached]
+    missing = [page_num for page_num in remaining if page_hashes[page_num] not in cached]
+    stats['cached_pages'] = len(reused)
+    logger.info(f"Result cache: {len(reused)} of {len(remaining)} pages reused")
+    
+    def extracted_pages():
+        if not missing:
+            return
+        for page in iter_pages(source, missing, layout=layout):
+            page['page_hash'] = page_hashes[page['page'] - 1]
+            yield page
+    
+    yield from heapq.merge(
+        extracted_pages(),
+        iter_cached_pages(conn, page_hashes, reused, version),
+        key=lambda page: page['page'],
+    )
+    
+    store_document(conn, content_hash, page_hashes, version)
+
+
+def run_extraction_pipeline(conn, ocr_job_id: str, source: PdfSource, provider_id: str = None,
+                            checkpoint: Dict[str, Any] = None, checkpoints: bool = True,
+                            progress: ProgressReporter = None, metrics: JobMetrics = None) -> Dict[str, Any]:
+    """
+    Stream pages through candidate parsing and flush candidates in batches
+    
+    Each page is released as soon as its candidates are buffered, and the
+    buffer is written out every CANDIDATE_FLUSH_SIZE candidates, so memory
+    stays bounded by the PDF itself rather than by the extracted text.
+    Newly extracted pages are added to the result cache alongside.
+    
+    Page text is not kept in the result: it goes to compressed objects in
+    MinIO and each page summary records the [part, offset, length] of its
+    text there, so the admin UI can fetch single pages on demand.
+    
+    With checkpoints, every CHECKPOINT_PAGES pages the buffered writes and a
+    page text part are committed together with a checkpoint of the job's
+    progress. Given the checkpoint of an earlier attempt on the same
+    document, processing resumes after its last page. Without checkpoints
+    writes are left uncommitted; the final job status update commits them.
+    
+    A progress reporter, if given, is updated after every page; it
+    throttles its own writes. metrics, if given, receives per-page
+    extraction and parsing times and the time spent writing.
+    """
+    content_hash = document_hash(source)
+    if checkpoint and checkpoint.get('content_hash') != content_hash:
+        logger.warning(f"Document of job {ocr_job_id} changed since its checkpoint; starting over")
+        checkpoint = None
+    state = checkpoint or new_checkpoint(content_hash)
+    if state['pages_done']:
+        logger.info(f"Resuming job {ocr_job_id} after page {state['pages_done']}")
+    if progress:
+        progress.resume_from(state['pages_done'], state['candidates_found'])
+    clear_candidates_after(conn, ocr_job_id, state['pages_done'])
+    
+    stats = {}
+    match_index = get_match_index(conn, provider_id) if CATALOG_MATCHING_ENABLED else None
+    keywords = get_keyword_matcher(conn, provider_id)
+    # Compiled once per provider and re-read on a TTL, not queried per job
+    profile = get_extraction_profile(conn, provider_id)
+    cache_version = profile.cache_version(keywords)
+    page_summaries = state['pages']
+    text_parts = state['page_text_parts']
+    text_writer = open_page_text_writer(ocr_job_id, len(text_parts))
+    pending = []
+    pending_cache = []
+    
+    def flush():
+        nonlocal pending, pending_cache
+        started = time.perf_counter()
+        insert_product_candidates(conn, ocr_job_id, pending, provider_id, commit=False, match_index=match_index)
+        store_pages(conn, pending_cache, cache_version)
+        if metrics:
+            metrics.observe('db_insert', time.perf_counter() - started)
+        state['candidates_found'] += len(pending)
+        pending = []
+        pending_cache = []
+    
+    def close_text_part():
+        nonlocal text_writer
+        if text_writer and text_writer.pages:
+            part = text_writer.upload()
+            text_parts.append(part['key'])
+            state['page_text_bytes'] += part['bytes']
+            text_writer = open_page_text_writer(ocr_job_id, len(text_parts))
+    
+    cached_before = state['cached_pages']
+    try:
+        pages = iter_job_pages(conn, source, stats, content_hash, start_page=state['pages_done'],
+                               layout=profile.heuristic.needs_layout, version=cache_version)
+        if metrics:
+            pages = metrics.timed_pages(pages)
+        for page, candidates in iter_page_candidates(pages, metrics, keywords, profile):
+            text = page.get('text', '')
+            summary = {
+                'page': page['page'],
+                'chars': len(text),
+                'source': page.get('source', 'text'),
+                'candidates': len(candidates),
+            }
+            if 'classification' in page:
+                summary['class'] = page['classification']['class']
+                if page['classification']['reason']:
+                    summary['class_reason'] = page['classification']['reason']
+            if text_writer:
+                summary['text_range'] = [len(text_parts), *text_writer.add(text)]
+            page_summaries.append(summary)
+            pending.extend(candidates)
+            # Skipped or failed OCR is retried on the next upload rather than cached
+            if 'page_hash' in page and not page.get('cached') and page.get('source') in ('text', 'ocr'):
+                pending_cache.append((page['page_hash'], text, page['parsed']))
+            
+            if len(pending) >= CANDIDATE_FLUSH_SIZE or len(pending_cache) >= CACHE_FETCH_SIZE:
+                flush()
+            
+            if progress:
+                progress.update(page['page'], state['candidates_found'] + len(pending), stats.get('total_pages'))
+            
+            if checkpoints and page['page'] - state['pages_done'] >= CHECKPOINT_PAGES:
+                flush()
+                close_text_part()
+                state['pages_done'] = page['page']
+                state['cached_pages'] = cached_before + stats.get('cached_pages', 0)
+                started = time.perf_counter()
+                save_checkpoint(conn, ocr_job_id, state)
+                if metrics:
+                    metrics.observe('checkpoint', time.perf_counter() - started)
+        
+        flush()
+        close_text_part()
+    finally:
+        if text_writer:
+            text_writer.close()
+    
+    return {
+        'total_pages': len(page_summaries),
+        'candidates_found': state['candidates_found'],
+        'content_hash': content_hash,
+        'cached_pages': cached_before + stats.get('cached_pages', 0),
+        'page_text': page_text_ref(text_parts, state['page_text_bytes']),
+        'extraction_profile': profile.fingerprint,
+        'skipped_pages': sum(1 for summary in page_summaries if summary.get('class') == PAGE_SKIP),
+        'pages': page_summaries,
+    }
+
+
 @app.task(bind=True)
-def process_ocr_job(self, media_id: str, ocr_job_id: str, file_url: str, file_type: str = 'pdf', provider_id: str = None):
+def process_ocr_job(self, media_id: str, ocr_job_id: str, file_url: str, file_type: str = 'pdf', provider_id: str = None,
+                    file_size: int = None, expected_pages: int = None):
     """
     Main OCR processing task
     
@@ -233,23 +613,33 @@ def process_ocr_job(self, media_id: str, ocr_job_id: str, file_url: str, file_ty
         ocr_job_id: UUID of the OCR job
         file_url: Presigned URL or path to the file
         file_type: Type of file (pdf, image)
+        file_size, expected_pages: Known document size, used to pick the queue and estimate memory
+    
+    Jobs whose memory estimate does not fit the worker's budget are sent
+    back to the queue still pending, and tried again after
+    OCR_ADMISSION_RETRY_SECONDS.
     """
+    progress = None
+    budget = None
+    metrics = JobMetrics(provider_id, file_size)
+    job_started = time.perf_counter()
     try:
         logger.info(f"Starting OCR job {ocr_job_id} for media {media_id}")
         
         # Get database connection
         conn = self.get_db_connection()
 
-        # Load provider_id from DB if not passed
-        if provider_id is None:
+        # Load provider_id from DB if not passed, and any checkpoint of an earlier attempt
+        with metrics.time('db_lookup'):
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT provider_id FROM ocr_jobs WHERE id = %s", (ocr_job_id,))
+            cursor.execute("SELECT provider_id, checkpoint FROM ocr_jobs WHERE id = %s", (ocr_job_id,))
             job_row = cursor.fetchone()
             cursor.close()
+        if provider_id is None:
             provider_id = job_row.get("provider_id") if job_row else None
-        
-        # Update job status to processing
-        update_ocr_job_status(conn, ocr_job_id, 'processing')
+            metrics.set_provider(provider_id)
+        checkpoint = job_row.get("checkpoint") if job_row else None
+        progress = open_progress_reporter(ocr_job_id, provider_id)
         
         # Download file from MinIO
         bucket = os.getenv('MINIO_BUCKET', 'angebae-media')
@@ -257,86 +647,238 @@ def process_ocr_job(self, media_id: str, ocr_job_id: str, file_url: str, file_ty
         minio_key = file_url.split('/')[-1] if 'minio_key' not in file_url else file_url
         
         # Get the media info from DB to find minio_key
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT minio_key FROM media WHERE id = %s", (media_id,))
-        media_row = cursor.fetchone()
-        cursor.close()
+        with metrics.time('db_lookup'):
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute("SELECT minio_key, file_size FROM media WHERE id = %s", (media_id,))
+            media_row = cursor.fetchone()
+            cursor.close()
         
         if not media_row:
             update_ocr_job_status(conn, ocr_job_id, 'failed', error='Media not found')
+            metrics.finish('failed')
             return {'status': 'failed', 'error': 'Media not found'}
         
         minio_key = media_row['minio_key']
         
+        # Reserve the job's estimated memory before anything is loaded, or defer it
+        if ADMISSION_ENABLED:
+            if file_size is None:
+                file_size = media_row['file_size'] or get_minio_client().stat_object(bucket, minio_key).size
+            cost = estimate_job_memory(file_size, expected_pages)
+            if not get_memory_budget().try_reserve(cost):
+                ADMISSION_DEFERRALS.labels('process_ocr_job').inc()
+                logger.info(f"Deferring OCR job {ocr_job_id}: needs ~{cost} bytes, "
+                            f"budget usage {get_memory_budget().usage()}")
+                raise self.retry(countdown=ADMISSION_RETRY_SECONDS, max_retries=None)
+            budget = get_memory_budget()
+        
+        # Update job status to processing
+        update_ocr_job_status(conn, ocr_job_id, 'processing')
+        
         # Download file
         logger.info(f"Downloading {minio_key} from MinIO")
-        file_bytes = download_file_from_minio(bucket, minio_key)
+        with metrics.time('download'):
+            download = download_file_from_minio(bucket, minio_key)
+        metrics.set_file_size(download_size(download))
         
-        # Extract text from PDF
+        # Stream pages through extraction, candidate parsing and batched inserts
         logger.info(f"Extracting text from {file_type} file")
-        pages = extract_text_from_pdf(file_bytes)
-        
-        # Extract product candidates from all pages
-        all_candidates = []
-        for page in pages:
-            text = page.get('text', '') or page.get('ocr_text', '')
-            if text:
-                candidates = extract_product_info(text)
-                all_candidates.extend(candidates)
-        
-        logger.info(f"Found {len(all_candidates)} product candidates")
-        
-        # Save candidates to database
-        if all_candidates:
-            insert_product_candidates(conn, ocr_job_id, all_candidates, provider_id)
+        try:
+            result = run_extraction_pipeline(conn, ocr_job_id, pdf_source(download), provider_id,
+                                             checkpoint=checkpoint, progress=progress, metrics=metrics)
+        finally:
+            release_download(download)
+            del download
         
-        # Update job result
-        result = {
-            'total_pages': len(pages),
-            'candidates_found': len(all_candidates),
-            'pages': pages,
-            'candidates': all_candidates,
-        }
+        logger.info(f"Found {result['candidates_found']} product candidates")
         
-        update_ocr_job_status(conn, ocr_job_id, 'done', result=result)
+        with metrics.time('result_update'):
+            update_ocr_job_status(conn, ocr_job_id, 'done', result=result)
+        if progress:
+            progress.finish('done')
+        metrics.observe('job', time.perf_counter() - job_started)
+        metrics.finish('done')
         
         logger.info(f"OCR job {ocr_job_id} completed successfully")
-        return {'status': 'done', 'candidates': len(all_candidates)}
+        return {'status': 'done', 'candidates': result['candidates_found']}
         
+    except Retry:
+        raise
+    
     except Exception as e:
         logger.error(f"OCR job {ocr_job_id} failed: {str(e)}", exc_info=True)
         
         try:
             conn = self.get_db_connection()
+            # Discard writes since the last checkpoint; a retry resumes from it
+            conn.rollback()
             update_ocr_job_status(conn, ocr_job_id, 'failed', error=str(e))
         except Exception as db_err:
             logger.error(f"Failed to update job status: {str(db_err)}")
         
+        if progress:
+            progress.finish('failed')
+        metrics.finish('failed')
+        
         raise
+    
+    finally:
+        if budget:
+            budget.release()
 
 
-# Celery beat task for cleanup (optional)
-@app.task
-def cleanup_old_jobs():
-    """Clean up old OCR jobs (older than 30 days)"""
+@app.task(bind=True)
+def process_ocr_batch(self, jobs: List[Tuple[str, str]]):
+    """
+    Process many OCR jobs in one task
+    
+    Args:
+        jobs: (media_id, ocr_job_id) pairs
+    
+    Providers and MinIO keys are resolved in one query and all jobs are
+    marked processing in one UPDATE. Upcoming documents download in the
+    background while the current one is extracted, within the prefetch
+    byte budget. Each job runs inside its own savepoint, so a failing job
+    only rolls back its own candidates; finished statuses are written in
+    bulk every BATCH_STATUS_FLUSH_SIZE jobs. The batch reserves memory for
+    its largest document plus the prefetch budget, and is deferred as a
+    whole when that does not fit the worker's budget.
+    """
+    conn = self.get_db_connection()
+    bucket = os.getenv('MINIO_BUCKET', 'angebae-media')
+    rows = load_batch_jobs(conn, jobs)
+    logger.info(f"Starting OCR batch of {len(rows)} jobs")
+    
+    runnable = [row for row in rows if row['minio_key']]
+    outcomes = {row['ocr_job_id']: 'failed' for row in rows}
+    pending_updates = [
+        (row['ocr_job_id'], 'failed', None, 'Media not found')
+        for row in rows if not row['minio_key']
+    ]
+    
+    budget = None
+    if ADMISSION_ENABLED and runnable:
+        cost = estimate_batch_memory([row['file_size'] for row in runnable], PREFETCH_BUDGET_BYTES)
+        if not get_memory_budget().try_reserve(cost):
+            ADMISSION_DEFERRALS.labels('process_ocr_batch').inc()
+            logger.info(f"Deferring OCR batch of {len(rows)} jobs: needs ~{cost} bytes, "
+                        f"budget usage {get_memory_budget().usage()}")
+            raise self.retry(countdown=ADMISSION_RETRY_SECONDS, max_retries=None)
+        budget = get_memory_budget()
+    
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE ocr_jobs SET status = 'processing', updated_at = NOW() WHERE id = ANY(%s::uuid[])",
+        ([row['ocr_job_id'] for row in runnable],),
+    )
+    conn.commit()
+    
+    client = get_minio_client()
+    prefetcher = ObjectPrefetcher(
+        [(row['minio_key'], row['file_size'], row) for row in runnable],
+        fetch=lambda key: download_file_from_minio(bucket, key),
+        stat=lambda key: client.stat_object(bucket, key).size,
+        concurrency=BATCH_DOWNLOAD_CONCURRENCY,
+    )
+    
+    # Final progress is published once the status it reports is committed
+    unpublished = []
+    
+    def flush_statuses():
+        nonlocal pending_updates
+        update_ocr_job_statuses(conn, pending_updates)
+        pending_updates = []
+        for reporter, status in unpublished:
+            reporter.finish(status)
+        unpublished.clear()
+    
     try:
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            DELETE FROM ocr_jobs 
-            WHERE created_at < NOW() - INTERVAL '30 days'
-            AND status IN ('done', 'failed')
-        """
-        
-        cursor.execute(query)
-        conn.commit()
+        with prefetcher:
+            for row, download in prefetcher:
+                ocr_job_id = row['ocr_job_id']
+                progress = open_progress_reporter(ocr_job_id, row['provider_id'])
+                metrics = JobMetrics(row['provider_id'], row['file_size'])
+                job_started = time.perf_counter()
+                
+                cursor.execute("SAVEPOINT batch_job")
+                try:
+                    document = download.result()
+                    metrics.set_file_size(download_size(document))
+                    try:
+                        # Commits would release the batch's savepoints, so batch jobs are not checkpointed
+                        result = run_extraction_pipeline(conn, ocr_job_id, pdf_source(document), row['provider_id'],
+                                                         checkpoints=False, progress=progress, metrics=metrics)
+                    finally:
+                        release_download(document)
+                        del document
+                    cursor.execute("RELEASE SAVEPOINT batch_job")
+                    pending_updates.append((ocr_job_id, 'done', result, None))
+                    outcomes[ocr_job_id] = 'done'
+                    logger.info(f"OCR job {ocr_job_id} found {result['candidates_found']} product candidates")
+                except Exception as e:
+                    logger.error(f"OCR job {ocr_job_id} failed: {str(e)}", exc_info=True)
+                    pending_updates.append((ocr_job_id, 'failed', None, str(e)))
+                    # Discard only this job's candidates
+                    cursor.execute("ROLLBACK TO SAVEPOINT batch_job")
+                    try:
+                        discard_page_text(ocr_job_id)
+                    except Exception as storage_err:
+                        logger.error(f"Failed to remove page text: {str(storage_err)}")
+                
+                if progress:
+                    unpublished.append((progress, outcomes[ocr_job_id]))
+                metrics.observe('job', time.perf_counter() - job_started)
+                metrics.finish(outcomes[ocr_job_id])
+                
+                if len(pending_updates) >= BATCH_STATUS_FLUSH_SIZE:
+                    flush_statuses()
+            
+            logger.info(f"Prefetch peak: {prefetcher.peak_reserved} bytes held ahead")
         
-        deleted = cursor.rowcount
+        flush_statuses()
+    
+    except Exception as e:
+        # Lost the connection or a status flush failed: mark unflushed jobs failed
+        logger.error(f"OCR batch failed: {str(e)}", exc_info=True)
+        try:
+            conn.rollback()
+            unfinished = {job_id for job_id, *_ in pending_updates}
+            unfinished.update(row['ocr_job_id'] for row in prefetcher.pending())
+            update_ocr_job_statuses(conn, [(job_id, 'failed', None, str(e)) for job_id in unfinished])
+        except Exception as db_err:
+            logger.error(f"Failed to update job statuses: {str(db_err)}")
+        raise
+    finally:
         cursor.close()
+        if budget:
+            budget.release()
+    
+    done = sum(1 for status in outcomes.values() if status == 'done')
+    logger.info(f"OCR batch finished: {done} done, {len(outcomes) - done} failed")
+    return {'status': 'done', 'done': done, 'failed': len(outcomes) - done, 'jobs': outcomes}
+
+
+# Celery beat task for cleanup (optional)
+@app.task(bind=True)
+def cleanup_old_jobs(self, days: int = None, archive: bool = None):
+    """
+    Clean up finished OCR jobs older than the retention period (30 days by default)
+    
+    Jobs and their candidates are deleted in bounded batches, archived to
+    MinIO first when OCR_RETENTION_ARCHIVE is on, and result cache entries
+    unused for OCR_RESULT_CACHE_RETENTION_DAYS are evicted; see retention.py.
+    """
+    try:
+        conn = self.get_db_connection()
+        stats = purge_old_jobs(conn, days=days, archive=archive)
         
-        logger.info(f"Cleaned up {deleted} old OCR jobs")
-        return {'deleted': deleted}
+        logger.info(
+            f"Cleaned up {stats['jobs_deleted']} old OCR jobs and {stats['candidates_deleted']} candidates, "
+            f"evicted {stats['cache_documents_deleted']} cached documents and {stats['cache_pages_deleted']} cached pages "
+            f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/s, {stats['batches']} batches, "
+            f"locks held {stats['lock_seconds_total']}s, longest {stats['lock_seconds_max']}s)"
+        )
+        return stats
         
     except Exception as e:
         logger.error(f"Cleanup job failed: {str(e)}")
@@ -0,0 +1,44 @@
+"""
+OCR Worker Tests
+The worker's modules import each other as top-level modules, as in the container's /app
+
+Tests that need Postgres use OCR_TEST_DATABASE_URL (a database with db/migrations
+applied that the tests may write to and purge) and are skipped without it.
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db_conn():
+    psycopg2 = pytest.importorskip('psycopg2')
+    dsn = os.getenv('OCR_TEST_DATABASE_URL')
+    if not dsn:
+        pytest.skip('OCR_TEST_DATABASE_URL is not set')
+    conn = psycopg2.connect(dsn)
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def media_id(db_conn):
+    """A media row for test jobs; its jobs and candidates are removed with it"""
+    media_id = str(uuid.uuid4())
+    cursor = db_conn.cursor()
+    cursor.execute(
+        "INSERT INTO media (id, type, url, minio_key) VALUES (%s, 'pdf', 'test', 'test.pdf')",
+        (media_id,),
+    )
+    db_conn.commit()
+    yield media_id
+    db_conn.rollback()
+    cursor.execute("DELETE FROM media WHERE id = %s", (media_id,))
+    db_conn.commit()
+    cursor.close()
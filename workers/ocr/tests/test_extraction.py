@@ -0,0 +1,81 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+import spool
+from extraction import (
+    PARALLEL_PAGE_THRESHOLD,
+    allow_child_processes,
+    compute_page_hashes,
+    iter_pages_parallel,
+    iter_pages_serial,
+)
+
+
+def form_xobject_pdf(text: str) -> bytes:
+    """A one-page PDF whose content stream only draws a form XObject holding the text"""
+    source = fitz.open()
+    source.new_page().insert_text((72, 72), text)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.show_pdf_page(page.rect, source, 0)
+    assert page.read_contents().split() == [b'q', b'/fzFrm0', b'Do', b'Q']
+    return doc.tobytes()
+
+
+def test_form_xobject_pages_with_different_text_hash_differently():
+    first = compute_page_hashes(form_xobject_pdf('Serum Vitamina C $ 12.990'))
+    second = compute_page_hashes(form_xobject_pdf('Crema Hidratante $ 9.990'))
+    assert first != second
+
+
+def test_same_page_hashes_the_same_across_documents():
+    assert compute_page_hashes(form_xobject_pdf('Serum Vitamina C $ 12.990')) == \
+        compute_page_hashes(form_xobject_pdf('Serum Vitamina C $ 12.990'))
+
+
+def test_font_change_changes_the_hash():
+    hashes = []
+    for font in ('helv', 'cour'):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), 'Serum Vitamina C', fontname=font)
+        hashes.append(compute_page_hashes(doc.tobytes()))
+    assert hashes[0] != hashes[1]
+
+
+def test_parallel_extraction_of_in_memory_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, 'SPOOL_DIR', str(tmp_path))
+    doc = fitz.open()
+    for number in range(PARALLEL_PAGE_THRESHOLD):
+        doc.new_page().insert_text((72, 72), f'Producto {number} $ {number}.990')
+    source = doc.tobytes()
+    page_numbers = list(range(len(doc)))
+
+    executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pages = list(iter_pages_parallel(executor, source, page_numbers))
+    finally:
+        executor.shutdown(wait=True)
+
+    assert pages == list(iter_pages_serial(source, page_numbers))
+    assert list(tmp_path.iterdir()) == []
+
+
+def _start_pool_from_daemon(results):
+    allow_child_processes()
+    executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        results.put(executor.submit(len, 'pool').result())
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_daemonic_process_can_start_the_pool():
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    process = context.Process(target=_start_pool_from_daemon, args=(results,), daemon=True)
+    process.start()
+    assert results.get(timeout=60) == 4
+    process.join(timeout=60)
+    assert process.exitcode == 0
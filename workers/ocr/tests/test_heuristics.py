@@ -0,0 +1,43 @@
+from heuristics import LayoutHeuristic
+
+
+def names_by_price(lines):
+    return {candidate['price']: candidate['title'] for candidate in LayoutHeuristic().parse_lines(lines)}
+
+
+def test_offset_grid_cells_keep_their_own_names():
+    # The right cell is shorter, so its price shares a row with the left cell's second line
+    lines = [
+        [50, 100, 160, 110, 'Gel Limpiador Facial'],
+        [50, 112, 150, 122, 'piel grasa 50 ml'],
+        [50, 124, 90, 134, '$ 7.990'],
+        [300, 100, 420, 110, 'Crema Hidratante'],
+        [300, 112, 340, 122, '$ 5.490'],
+    ]
+    candidates = LayoutHeuristic().parse_lines(lines)
+    assert {c['price']: c['title'] for c in candidates} == {
+        5490.0: 'Crema Hidratante',
+        7990.0: 'Gel Limpiador Facial',
+    }
+    assert 'piel grasa 50 ml' in next(c for c in candidates if c['price'] == 7990.0)['raw_line']
+
+
+def test_table_rows_take_the_name_cell_across_the_gap():
+    lines = [
+        [50, 80, 110, 90, 'Producto'],
+        [450, 80, 490, 90, 'Precio'],
+        [50, 100, 170, 110, 'Serum Vitamina C'],
+        [450, 100, 495, 110, '$ 12.990'],
+        [50, 112, 170, 122, 'Crema Hidratante'],
+        [450, 112, 490, 122, '$ 9.990'],
+    ]
+    assert names_by_price(lines) == {12990.0: 'Serum Vitamina C', 9990.0: 'Crema Hidratante'}
+
+
+def test_stacked_list_and_price_only_lines():
+    lines = [
+        [50, 100, 170, 110, 'Tónico Equilibrante'],
+        [50, 112, 95, 122, '$ 6.490'],
+        [50, 160, 95, 170, '$ 3.990'],
+    ]
+    assert names_by_price(lines) == {6490.0: 'Tónico Equilibrante', 3990.0: ''}
@@ -0,0 +1,36 @@
+from keywords import compile_keywords
+from page_classifier import PAGE_LOW, PAGE_SKIP
+from profiles import compile_profile
+from tasks import iter_page_candidates
+
+SKU_ONLY_PAGE = """Formulario de pedido - precios según lista vigente
+AB1001 Crema hidratante facial 50 ml
+AB1002 Serum vitamina C 30 ml
+CS2203 Limpiador espuma piel grasa
+"""
+
+COVER_PAGE = """CATÁLOGO OTOÑO 2024
+Cosmética natural hecha en Chile, desde nuestro laboratorio a tu casa
+"""
+
+TERMS_PAGE = """CONDICIONES GENERALES DE VENTA
+Los pedidos se despachan dentro de los cinco días hábiles siguientes a su
+confirmación. Las devoluciones se aceptan con la boleta original.
+"""
+
+
+def classify(text):
+    return compile_profile('line').page_classifier.classify(text, compile_keywords())
+
+
+def test_sku_only_page_is_parsed_not_skipped():
+    assert classify(SKU_ONLY_PAGE)['class'] == PAGE_LOW
+
+    page = {'page': 1, 'text': SKU_ONLY_PAGE, 'ocr_text': SKU_ONLY_PAGE, 'images': []}
+    (_, candidates), = iter_page_candidates([page], profile=compile_profile('line'))
+    assert {candidate['sku'] for candidate in candidates} >= {'AB1001', 'AB1002', 'CS2203'}
+
+
+def test_pages_without_prices_or_products_are_still_skipped():
+    assert classify(COVER_PAGE)['class'] == PAGE_SKIP
+    assert classify(TERMS_PAGE)['class'] == PAGE_SKIP
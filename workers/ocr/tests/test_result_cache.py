@@ -0,0 +1,29 @@
+import uuid
+
+from result_cache import find_cached_pages, store_pages
+from retention import evict_cache_batch
+
+
+def test_unused_cache_entries_are_evicted_and_hits_are_kept(db_conn):
+    version = f"test-{uuid.uuid4().hex[:8]}"
+    store_pages(db_conn, [('hit', 'text', []), ('unused', 'text', [])], version)
+    cursor = db_conn.cursor()
+    cursor.execute(
+        "UPDATE ocr_page_cache SET last_used_at = NOW() - INTERVAL '100 days' WHERE extractor_version = %s",
+        (version,),
+    )
+    db_conn.commit()
+
+    assert find_cached_pages(db_conn, ['hit'], version) == {'hit'}
+    db_conn.commit()
+
+    cursor.execute("SELECT NOW() - INTERVAL '90 days'")
+    cutoff = cursor.fetchone()[0]
+    while evict_cache_batch(db_conn, 'ocr_page_cache', 'page_hash, extractor_version', cutoff, 500):
+        pass
+
+    cursor.execute("SELECT page_hash FROM ocr_page_cache WHERE extractor_version = %s", (version,))
+    assert [row[0] for row in cursor.fetchall()] == ['hit']
+    cursor.execute("DELETE FROM ocr_page_cache WHERE extractor_version = %s", (version,))
+    db_conn.commit()
+    cursor.close()
@@ -0,0 +1,60 @@
+import retention
+from retention import purge_old_jobs
+
+
+def add_job(conn, media_id: str, status: str, days_old: int, candidates: int) -> str:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO ocr_jobs (source_media_id, status, result, created_at)
+        VALUES (%s, %s, '{"page_text": {}}', NOW() - %s * INTERVAL '1 day')
+        RETURNING id::text
+        """,
+        (media_id, status, days_old),
+    )
+    job_id = cursor.fetchone()[0]
+    for i in range(candidates):
+        cursor.execute(
+            "INSERT INTO product_candidates (ocr_job_id, raw_json, extracted_title) VALUES (%s, '{}', %s)",
+            (job_id, f"Producto {i}"),
+        )
+    conn.commit()
+    cursor.close()
+    return job_id
+
+
+def count(conn, query: str, job_id: str) -> int:
+    cursor = conn.cursor()
+    cursor.execute(query, (job_id,))
+    value = cursor.fetchone()[0]
+    cursor.close()
+    return value
+
+
+def test_job_retried_after_selection_keeps_candidates_and_page_text(db_conn, media_id, monkeypatch):
+    expired = add_job(db_conn, media_id, 'done', 60, 2)
+    retried = add_job(db_conn, media_id, 'done', 60, 3)
+
+    select_batch = retention.select_batch
+
+    def select_then_retry(conn, *args):
+        rows = select_batch(conn, *args)
+        if any(row[0] == retried for row in rows):
+            # The job is re-queued between selection and deletion
+            cursor = conn.cursor()
+            cursor.execute("UPDATE ocr_jobs SET status = 'pending' WHERE id = %s", (retried,))
+            cursor.close()
+        return rows
+
+    discarded = []
+    monkeypatch.setattr(retention, 'select_batch', select_then_retry)
+    monkeypatch.setattr(retention, 'discard_page_text', discarded.append)
+
+    stats = purge_old_jobs(db_conn, days=30, pause_seconds=0, cache_days=0)
+
+    assert count(db_conn, "SELECT COUNT(*) FROM ocr_jobs WHERE id = %s", expired) == 0
+    assert count(db_conn, "SELECT COUNT(*) FROM ocr_jobs WHERE id = %s", retried) == 1
+    assert count(db_conn, "SELECT COUNT(*) FROM product_candidates WHERE ocr_job_id = %s", retried) == 3
+    assert expired in discarded
+    assert retried not in discarded
+    assert stats['jobs_deleted'] >= 1